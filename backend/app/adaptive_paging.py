@@ -1,5 +1,8 @@
 """OpenClaw-style adaptive paging: cap tool output to 20% of model context window.
 
+Tools page their own output in chars (offsets stay char-based); the handler's
+safety net caps each result in tokens of the model (``fit_page_chars``).
+
 Reference: openclaw/src/agents/pi-tools.read.ts → resolveAdaptiveReadMaxBytes
 """
 from __future__ import annotations
@@ -12,6 +15,12 @@ MAX_PAGE_CHARS = 512_000
 CONTEXT_SHARE = 0.20
 # Conservative chars-per-token estimate (OpenClaw uses 4)
 CHARS_PER_TOKEN = 4
+# Token budget for models with an unknown window (DEFAULT_PAGE_CHARS in tokens), and the floor
+# and ceiling for known ones. The floor stays below every known window so small models still
+# have room for the prompt and the reply.
+DEFAULT_PAGE_TOKENS = DEFAULT_PAGE_CHARS // CHARS_PER_TOKEN
+MIN_PAGE_TOKENS = 512
+MAX_PAGE_TOKENS = MAX_PAGE_CHARS // CHARS_PER_TOKEN
 
 # Known model context windows (tokens).
 # Keyed on substrings that appear in the model name/id (matched in order, first wins).
@@ -105,6 +114,37 @@ def compute_page_chars(
     return max(DEFAULT_PAGE_CHARS, min(raw, MAX_PAGE_CHARS))
 
 
+def compute_page_tokens(
+    model: str | None = None,
+    provider: str | None = None,
+    context_tokens: int | None = None,
+) -> int:
+    """Return the adaptive tool-output budget in tokens.
+
+    Same priority as ``compute_page_chars``, but the share is taken of the window in tokens
+    and clamped in tokens (no 50k-char floor), so an 8k model gets ~1.6k tokens, not 12.5k:
+        page_tokens = clamp(context_tokens * CONTEXT_SHARE, MIN_PAGE_TOKENS, MAX_PAGE_TOKENS)
+    """
+    tokens = context_tokens
+    if tokens is None or tokens <= 0:
+        tokens = _lookup_context_tokens(model, provider)
+    if tokens is None or tokens <= 0:
+        return DEFAULT_PAGE_TOKENS
+
+    raw = int(tokens * CONTEXT_SHARE)
+    return max(MIN_PAGE_TOKENS, min(raw, MAX_PAGE_TOKENS))
+
+
+def fit_page_chars(
+    content: str,
+    model: str | None = None,
+    provider: str | None = None,
+) -> int:
+    """Return how many leading chars of ``content`` fit in the model's tool-output token budget."""
+    from app.tokenizer import get_tokenizer
+    return get_tokenizer(model, provider).cut_index(content, compute_page_tokens(model, provider))
+
+
 def truncate_with_offset_hint(
     content: str,
     *,
@@ -5,13 +5,12 @@ When conversation history exceeds a token threshold, the oldest messages
 are summarized into a compact digest to stay within context limits.
 """
 from __future__ import annotations
+import json
 import logging
 from app.providers.base import BaseProvider, Message
 
 logger = logging.getLogger(__name__)
 
-# Rough estimate: ~1.3 tokens per word for English text
-TOKENS_PER_WORD = 1.3
 # Minimum messages before we consider compacting (don't compact tiny histories)
 MIN_MESSAGES_TO_COMPACT = 6
 # Fraction of the model's context window to use as the compaction threshold.
@@ -23,16 +22,44 @@ DEFAULT_MAX_TOKENS = 4_000
 COMPACTION_FLOOR_TOKENS = 1_000
 # Ceiling: never compact above 80k tokens (large-context models don't need it often)
 COMPACTION_CEILING_TOKENS = 80_000
-
-
-def estimate_tokens(text: str) -> int:
-    """Rough token estimate from word count. Good enough for budget decisions."""
-    return max(1, int(len(text.split()) * TOKENS_PER_WORD))
-
-
-def estimate_messages_tokens(messages: list[Message]) -> int:
-    """Total estimated tokens across all messages."""
-    return sum(estimate_tokens(m.get("content") or "") + 4 for m in messages)  # +4 for role/formatting overhead
+# Share of the context window the tool loop's messages may fill before old rounds are compacted
+TOOL_LOOP_CONTEXT_SHARE = 0.60
+# Tool-loop budget for models with an unknown context window (tokens)
+DEFAULT_TOOL_LOOP_TOKENS = 32_000
+# Role/formatting overhead per message (tokens)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str, model: str | None = None, provider: str | None = None) -> int:
+    """Token count of ``text`` for the model (real tokenizer when available, heuristic otherwise)."""
+    from app.tokenizer import count_tokens
+    return max(1, count_tokens(text, model=model, provider=provider))
+
+
+def _message_text(message: Message) -> str:
+    content = message.get("content") or ""
+    if not isinstance(content, str):
+        # Multimodal content blocks: count the text parts.
+        content = "\n".join(
+            str(block.get("text") or "") for block in content if isinstance(block, dict)
+        )
+    for tc in message.get("tool_calls") or []:
+        fn = tc.get("function") or {}
+        args = fn.get("arguments") or ""
+        content += f"\n{fn.get('name') or ''}{args if isinstance(args, str) else json.dumps(args)}"
+    return content
+
+
+def estimate_messages_tokens(
+    messages: list[Message],
+    model: str | None = None,
+    provider: str | None = None,
+) -> int:
+    """Total tokens across all messages, including tool-call arguments."""
+    return sum(
+        estimate_tokens(_message_text(m), model, provider) + MESSAGE_OVERHEAD_TOKENS
+        for m in messages
+    )
 
 
 def compact_tool_rounds(
@@ -50,8 +77,6 @@ def compact_tool_rounds(
     Returns:
         (compacted_messages, did_compact)
     """
-    import json as _json
-
     # Find indices of all assistant messages that started a tool round
     tool_round_starts = [
         i for i, m in enumerate(messages)
@@ -78,7 +103,7 @@ def compact_tool_rounds(
                 name = fn.get("name", "tool")
                 args_raw = fn.get("arguments") or "{}"
                 try:
-                    args = _json.loads(args_raw) if isinstance(args_raw, str) else args_raw
+                    args = json.loads(args_raw) if isinstance(args_raw, str) else args_raw
                     main_arg = (
                         args.get("query") or args.get("url") or args.get("path") or
                         args.get("command") or args.get("action") or ""
@@ -119,6 +144,48 @@ def compact_tool_rounds(
     return compacted_preamble + list(to_keep), True
 
 
+def _compute_tool_loop_budget(model: str | None = None, provider: str | None = None) -> int:
+    """Token budget for the tool loop's messages: a share of the model's context window."""
+    from app.adaptive_paging import _lookup_context_tokens
+    tokens = _lookup_context_tokens(model, provider)
+    if tokens and tokens > 0:
+        return int(tokens * TOOL_LOOP_CONTEXT_SHARE)
+    return DEFAULT_TOOL_LOOP_TOKENS
+
+
+def compact_tool_rounds_to_budget(
+    messages: list[dict],
+    model: str | None = None,
+    provider: str | None = None,
+    keep_recent_rounds: int = 8,
+) -> tuple[list[dict], bool]:
+    """Compact old tool rounds when the messages exceed the model's tool-loop token budget.
+
+    Keeps halving ``keep_recent_rounds`` (down to 1) until the messages fit.
+
+    Returns:
+        (compacted_messages, did_compact)
+    """
+    budget = _compute_tool_loop_budget(model, provider)
+    total = estimate_messages_tokens(messages, model, provider)
+    if total <= budget:
+        return messages, False
+    did_compact = False
+    keep = keep_recent_rounds
+    while keep >= 1:
+        messages, compacted = compact_tool_rounds(messages, keep_recent_rounds=keep)
+        did_compact = did_compact or compacted
+        if compacted and estimate_messages_tokens(messages, model, provider) <= budget:
+            break
+        keep //= 2
+    if did_compact:
+        logger.info(
+            "Tool rounds compacted: %d tokens over budget %d → %d tokens",
+            total, budget, estimate_messages_tokens(messages, model, provider),
+        )
+    return messages, did_compact
+
+
 def _compute_compaction_budget(
     model: str | None = None,
     provider: str | None = None,
@@ -165,7 +232,7 @@ async def compact_history(
         return messages
 
     budget = _compute_compaction_budget(model, provider_name, max_tokens)
-    total = estimate_messages_tokens(messages)
+    total = estimate_messages_tokens(messages, model, provider_name)
     if total <= budget:
         return messages
 
@@ -206,7 +273,7 @@ async def compact_history(
 
     logger.info(
         "Compacted %d messages (%d tokens, budget=%d) → summary + %d recent messages",
-        len(old_msgs), estimate_messages_tokens(old_msgs), budget, len(recent_msgs),
+        len(old_msgs), estimate_messages_tokens(old_msgs, model, provider_name), budget, len(recent_msgs),
     )
 
     # Return compacted history
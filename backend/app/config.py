@@ -228,6 +228,15 @@ class Settings(BaseSettings):
     asta_subagents_max_depth: int = 1  # Maximum nesting depth for subagents (1 = no nesting)
     asta_subagents_max_children: int = 5  # Maximum concurrent children per agent
     asta_subagents_archive_after_minutes: int = 60
+    # Provider hedging: if the primary has not answered after this many ms, start the next healthy
+    # fallback concurrently and keep whichever succeeds first. 0 = off (fallbacks only after failure).
+    asta_provider_hedge_ms: int = 0
+    # Read-only tool calls (web_search, read_file, memory_search, ...) in one tool round run
+    # concurrently, at most this many at a time. 1 = strictly one after another.
+    asta_tool_concurrency: int = 4
+    # Per-skill deadline (seconds) for the skill execute() stage before the first model call.
+    # A skill that runs over is skipped for this turn. 0 = no deadline.
+    asta_skill_timeout_s: float = 8.0
     # Vision pipeline:
     # - preprocess=True: run a low-cost vision model first, then pass analysis to the main agent model.
     # - provider order: first configured provider in this list is used.
@@ -10,8 +10,11 @@ logger = logging.getLogger(__name__)
 
 # Default user id when not in a multi-user setup
 DEFAULT_USER_ID = "default"
+# Per-message cap for the recent conversation section, in tokens of the turn's model
+RECENT_MESSAGE_MAX_TOKENS = 125
 
 from app.context_helpers import _is_error_reply, _is_time_reply
+from app.providers.base import PromptContext
 
 async def build_context(
     db: "Db",
@@ -20,9 +23,20 @@ async def build_context(
     extra: dict | None = None,
     skills_in_use: set[str] | None = None,
     user_role: str = "admin",
-) -> str:
-    """Build a context string the AI can use. If skills_in_use is set, only include those skill sections (saves tokens)."""
+    skill_toggles: dict[str, bool] | None = None,
+    model: str | None = None,
+    provider_name: str | None = None,
+) -> PromptContext:
+    """Build a context string the AI can use. If skills_in_use is set, only include those skill sections (saves tokens).
+    skill_toggles is the turn's bulk toggle map; loaded with one query when not passed.
+    model/provider_name pick the tokenizer used to cap recent messages.
+
+    Sections that only change with configuration (workspace files, policy, tone, tool and skill guidance)
+    come first and form the PromptContext's stable prefix, which Claude caches across turns and tool
+    rounds; per-turn sections (recent chat, state, routed skill data, project files) follow it."""
     extra = extra or {}
+    if skill_toggles is None:
+        skill_toggles = await _load_skill_toggles(db, user_id)
     
     parts = []
     
@@ -47,17 +61,10 @@ async def build_context(
     # 1. System instruction & Tone
     parts.extend(_get_system_header(extra.get("mood")))
 
-    # 2. Recent Conversation
-    if conversation_id:
-        parts.extend(await _get_recent_conversation(db, conversation_id, skills_in_use))
-
-    # 3. Connected Channels & State
-    parts.extend(await _get_state_section(db, user_id, extra))
-
     # 3a. Exec (OpenClaw-style): when enabled, use the exec tool to run allowlisted commands. Model calls the tool; we run and return output.
     # Admin-only: non-admin users should not know about exec capabilities.
     from app.exec_tool import get_effective_exec_bins
-    effective_bins = await get_effective_exec_bins(db, user_id)
+    effective_bins = await get_effective_exec_bins(db, user_id, skill_toggles=skill_toggles)
     from app.config import get_settings
     exec_mode = get_settings().exec_security
     if user_role == "admin" and exec_mode != "deny" and (exec_mode == "full" or effective_bins):
@@ -72,21 +79,9 @@ async def build_context(
         )
         parts.append("")
 
-    # 3a1. Files tools: list/read/allow/delete for allowed paths
-    if skills_in_use and "files" in skills_in_use:
-        parts.append(
-            "[FILES] You have list_directory, read_file, write_file, allow_path, delete_file, and delete_matching_files tools. "
-            "When the user asks 'what files on my desktop', 'list my desktop', 'what do I have on desktop', or similar: call allow_path(\"~/Desktop\") to request access, then list_directory(\"~/Desktop\") to list the files. Do not say you cannot run ls — use these tools instead. "
-            "If the path is already allowed, list_directory works directly. "
-            "For save/create requests (e.g. shopping list), call write_file with a sensible workspace path and exact content. "
-            "For deleting one file use delete_file(path). For multiple similar files (like screenshots) use delete_matching_files(directory, glob_pattern). "
-            "Only paths under the user's home can be added via allow_path."
-        )
-        parts.append("")
-
     # 3a2. Reminders tool (one-shot)
     # Keep guidance whenever reminders are enabled since the tool is available globally.
-    if await db.get_skill_enabled(user_id, "reminders"):
+    if skill_toggles.get("reminders", True):
         parts.append(
             "[REMINDERS] Use the reminders tool for one-time reminders. "
             "Use action='add' with natural text (e.g. 'remind me in 30 min to call mom', 'wake me up tomorrow at 7am'). "
@@ -112,10 +107,34 @@ async def build_context(
         skills_in_use,
         agent_skill_filter=_resolve_selected_agent_skill_filter(extra),
         user_role=user_role,
+        skill_toggles=skill_toggles,
     )
     if skills_prompt:
         parts.append(skills_prompt)
 
+    # Everything below changes from turn to turn.
+    stable = "\n".join(parts) + "\n"
+    parts = []
+
+    # 2. Recent Conversation
+    if conversation_id:
+        parts.extend(await _get_recent_conversation(db, conversation_id, skills_in_use, model, provider_name))
+
+    # 3. Connected Channels & State
+    parts.extend(await _get_state_section(db, user_id, extra))
+
+    # 3a1. Files tools: list/read/allow/delete for allowed paths
+    if skills_in_use and "files" in skills_in_use:
+        parts.append(
+            "[FILES] You have list_directory, read_file, write_file, allow_path, delete_file, and delete_matching_files tools. "
+            "When the user asks 'what files on my desktop', 'list my desktop', 'what do I have on desktop', or similar: call allow_path(\"~/Desktop\") to request access, then list_directory(\"~/Desktop\") to list the files. Do not say you cannot run ls — use these tools instead. "
+            "If the path is already allowed, list_directory works directly. "
+            "For save/create requests (e.g. shopping list), call write_file with a sensible workspace path and exact content. "
+            "For deleting one file use delete_file(path). For multiple similar files (like screenshots) use delete_matching_files(directory, glob_pattern). "
+            "Only paths under the user's home can be added via allow_path."
+        )
+        parts.append("")
+
     # 4. Skill Sections
     from app.skills.registry import get_all_skills
     from app.skills.markdown_skill import MarkdownSkill
@@ -127,8 +146,8 @@ async def build_context(
         # Do not preload SKILL.md bodies into context.
         if isinstance(skill, MarkdownSkill):
             continue
-        # Check if enabled for user
-        is_enabled = await db.get_skill_enabled(user_id, skill.name)
+        # Check if enabled for user (no toggle row = enabled)
+        is_enabled = skill_toggles.get(skill.name, True)
         if not is_enabled and not skill.is_always_enabled:
              continue
              
@@ -157,7 +176,7 @@ async def build_context(
             logger.debug("Project context load failed: %s", e)
 
     parts.append("Answer using the above context when relevant. Be concise and helpful.")
-    return "\n".join(parts)
+    return PromptContext.from_parts(stable, "\n".join(parts))
 
 
 def _get_system_header(mood: str | None) -> list[str]:
@@ -212,14 +231,26 @@ _ADMIN_ONLY_SKILLS = frozenset({
 })
 
 
+async def _load_skill_toggles(db: "Db", user_id: str) -> dict[str, bool]:
+    """All of the user's skill toggles in one query; {} (everything enabled) on failure."""
+    try:
+        return await db.get_all_skill_toggles(user_id)
+    except Exception as e:
+        logger.debug("Failed to load skill toggles (treating all as enabled): %s", e)
+        return {}
+
+
 async def _get_available_skills_prompt(
     db: "Db",
     user_id: str,
     skills_in_use: set[str] | None,
     agent_skill_filter: list[str] | None = None,
     user_role: str = "admin",
+    skill_toggles: dict[str, bool] | None = None,
 ) -> str:
     """OpenClaw-style list of workspace skills with name/description/location."""
+    if skill_toggles is None:
+        skill_toggles = await _load_skill_toggles(db, user_id)
     from app.skills.registry import get_all_skills
     from app.skills.markdown_skill import MarkdownSkill
 
@@ -228,10 +259,7 @@ async def _get_available_skills_prompt(
     markdown_skill_names: set[str] = set()
     allowed = set(agent_skill_filter) if agent_skill_filter is not None else None
     for skill in get_all_skills():
-        try:
-            enabled = await db.get_skill_enabled(user_id, skill.name)
-        except Exception:
-            enabled = True
+        enabled = skill_toggles.get(skill.name, True)
         if not enabled and not getattr(skill, "is_always_enabled", False):
             continue
         if not isinstance(skill, MarkdownSkill):
@@ -282,8 +310,15 @@ async def _get_available_skills_prompt(
     return "\n".join(lines)
 
 
-async def _get_recent_conversation(db: "Db", conversation_id: str, skills_in_use: set[str] | None) -> list[str]:
+async def _get_recent_conversation(
+    db: "Db",
+    conversation_id: str,
+    skills_in_use: set[str] | None,
+    model: str | None = None,
+    provider_name: str | None = None,
+) -> list[str]:
     """Get recent messages, skipping error replies and stale time checks."""
+    from app.tokenizer import truncate_to_tokens
     parts = []
     try:
         recent = await db.get_recent_messages(conversation_id, limit=10)
@@ -296,7 +331,8 @@ async def _get_recent_conversation(db: "Db", conversation_id: str, skills_in_use
                 if skip_time_replies and m["role"] == "assistant" and _is_time_reply(m["content"]):
                     continue  # Don't show old time answers — use live value from Time section
                 role = "User" if m["role"] == "user" else "Assistant"
-                parts.append(f"{role}: {m['content'][:500]}")
+                content = truncate_to_tokens(m["content"], RECENT_MESSAGE_MAX_TOKENS, model=model, provider=provider_name)
+                parts.append(f"{role}: {content}")
             parts.append("")
     except Exception:
         pass
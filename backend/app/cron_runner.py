@@ -1,6 +1,5 @@
 """Claw-style cron: recurring jobs (5-field cron expr). Fire message through handler and notify user."""
 from __future__ import annotations
-import asyncio
 import logging
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
@@ -27,8 +26,9 @@ def _fire_cron_job_sync(
     trigger: str = "schedule",
     run_mode: str = "due",
 ) -> None:
-    """Called by scheduler (sync). Run async fire."""
-    asyncio.run(_fire_cron_job_async(cron_job_id, trigger=trigger, run_mode=run_mode))
+    """Called by scheduler (sync). Run async fire on the API event loop."""
+    from app.tasks.scheduler import run_on_main_loop
+    run_on_main_loop(_fire_cron_job_async(cron_job_id, trigger=trigger, run_mode=run_mode))
 
 
 async def _fire_cron_job_async(
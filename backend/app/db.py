@@ -2,17 +2,49 @@
 from __future__ import annotations
 import asyncio
 import aiosqlite
+import json
 import os
 import sqlite3
-from datetime import datetime, timezone
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 from uuid import uuid4
 
-from app.provider_flow import DEFAULT_MAIN_PROVIDER, MAIN_PROVIDER_CHAIN
-from app.db_schema import init_schema as _db_init_schema
+from app.provider_flow import (
+    DEFAULT_MAIN_PROVIDER,
+    MAIN_PROVIDER_CHAIN,
+    normalize_provider_flow_mode,
+    update_call_stats,
+)
+from app.db_schema import (
+    CONVERSATION_SNIPPET_CHARS,
+    CONVERSATION_SUMMARY_REFRESH_SQL,
+    init_schema as _db_init_schema,
+)
+from app.db_pool import RoutedConnection, open_readers
+from app.db_writes import WriteBatcher
 
 DB_PATH = os.environ.get("ASTA_DB_PATH", str(Path(__file__).resolve().parent.parent / "asta.db"))
+try:
+    # Read-only WAL connections used for SELECTs; writes always go through one writer.
+    DB_READ_POOL_SIZE = max(0, int(os.environ.get("ASTA_DB_READ_POOL_SIZE", "3") or 3))
+except ValueError:
+    DB_READ_POOL_SIZE = 3
+try:
+    # Group-commit window for add_message/record_usage/set_conversation_title; 0 = commit each write.
+    DB_WRITE_BATCH_MS = max(0.0, float(os.environ.get("ASTA_DB_WRITE_BATCH_MS", "5") or 5))
+except ValueError:
+    DB_WRITE_BATCH_MS = 5.0
+try:
+    # Usage retention: raw usage_stats rows and hourly rollups older than this are deleted; daily rollups are kept.
+    USAGE_RAW_RETENTION_DAYS = int(os.environ.get("ASTA_USAGE_RAW_RETENTION_DAYS", "30") or 30)
+except ValueError:
+    USAGE_RAW_RETENTION_DAYS = 30
+try:
+    USAGE_HOURLY_RETENTION_DAYS = int(os.environ.get("ASTA_USAGE_HOURLY_RETENTION_DAYS", "90") or 90)
+except ValueError:
+    USAGE_HOURLY_RETENTION_DAYS = 90
 THINK_LEVELS = ("off", "minimal", "low", "medium", "high", "xhigh")
 FINAL_MODES = ("off", "strict")
 
@@ -107,9 +139,34 @@ def validate_cron_expression(expr: str, tz: str | None = None) -> tuple[bool, st
         return False, str(e)
 
 
+@dataclass(frozen=True)
+class UserSettingsSnapshot:
+    """Per-turn view of a user's settings, provider models and skill toggles (one query)."""
+    user_id: str
+    mood: str = "normal"
+    default_ai: str = DEFAULT_MAIN_PROVIDER
+    thinking_level: str = "off"
+    reasoning_mode: str = "off"
+    final_mode: str = "off"
+    provider_flow_mode: str = "fixed"
+    provider_models: dict[str, str] = field(default_factory=dict)
+    skill_toggles: dict[str, bool] = field(default_factory=dict)
+
+    def provider_model(self, provider: str) -> str | None:
+        return self.provider_models.get(provider) or None
+
+    def skill_enabled(self, skill_id: str) -> bool:
+        # Same default as get_skill_enabled: never toggled → ON.
+        return self.skill_toggles.get(skill_id, True)
+
+
 class Db:
     def __init__(self) -> None:
-        self._conn: aiosqlite.Connection | None = None
+        # Writer + read pool behind one facade; see app.db_pool for routing rules.
+        self._conn: RoutedConnection | None = None
+        self._writes: WriteBatcher | None = None
+        # user_id -> snapshot; dropped by every setter that touches a snapshot field.
+        self._settings_cache: dict[str, UserSettingsSnapshot] = {}
         self._connect_lock = asyncio.Lock()
         import logging
         self.logger = logging.getLogger(__name__)
@@ -137,7 +194,8 @@ class Db:
                     await conn.execute("PRAGMA synchronous = NORMAL")
                 except Exception:
                     pass
-                self._conn = conn
+                self._conn = RoutedConnection(conn)
+                self._writes = WriteBatcher(self._conn, DB_WRITE_BATCH_MS)
                 schema_error: Exception | None = None
                 for attempt in range(4):
                     try:
@@ -154,6 +212,8 @@ class Db:
                         "Skipping SQLite schema init due lock; reusing existing DB schema: %s",
                         schema_error,
                     )
+                # Readers are opened after schema init so they never race DDL.
+                self._conn.attach_readers(await open_readers(DB_PATH, DB_READ_POOL_SIZE))
             except Exception:
                 if conn is not None:
                     try:
@@ -161,12 +221,18 @@ class Db:
                     except Exception:
                         pass
                 self._conn = None
+                self._writes = None
                 raise
 
+    async def flush_writes(self) -> None:
+        """Commit queued message/usage/title writes now (reads of those tables call this first)."""
+        if self._writes is not None:
+            await self._writes.flush()
+
     async def _init_schema(self) -> None:
         if not self._conn:
             return
-        await _db_init_schema(self._conn, self.logger)
+        await _db_init_schema(self._conn.writer, self.logger)
 
     async def get_or_create_conversation(self, user_id: str, channel: str) -> str:
         if not self._conn:
@@ -196,12 +262,14 @@ class Db:
         """List conversations ordered by most recent activity. Uses AI-generated title when available, falls back to first user message."""
         if not self._conn:
             await self.connect()
+        await self.flush_writes()
         if channel:
             where_clause = "WHERE c.user_id = ? AND c.channel = ?"
             params: tuple = (user_id, channel, limit)
         else:
             where_clause = "WHERE c.user_id = ?"
             params = (user_id, limit)
+        # Summary columns are maintained by add_message/truncate; no per-row message scans.
         cursor = await self._conn.execute(
             f"""
             SELECT
@@ -209,17 +277,14 @@ class Db:
                 c.created_at,
                 c.folder_id,
                 c.title AS ai_title,
-                (SELECT content FROM messages WHERE conversation_id = c.id AND role = 'user' ORDER BY id ASC LIMIT 1) AS first_msg,
-                (SELECT created_at FROM messages WHERE conversation_id = c.id ORDER BY id DESC LIMIT 1) AS last_active,
-                (SELECT COUNT(*) FROM messages WHERE conversation_id = c.id) AS message_count,
-                (SELECT COALESCE(SUM(LENGTH(content)), 0) FROM messages WHERE conversation_id = c.id) / 4 AS approx_tokens
+                c.first_user_snippet AS first_msg,
+                c.last_active_at AS last_active,
+                c.message_count,
+                c.approx_chars / 4 AS approx_tokens
             FROM conversations c
             {where_clause}
-              AND EXISTS (SELECT 1 FROM messages WHERE conversation_id = c.id)
-            ORDER BY COALESCE(
-                (SELECT created_at FROM messages WHERE conversation_id = c.id ORDER BY id DESC LIMIT 1),
-                c.created_at
-            ) DESC
+              AND c.message_count > 0
+            ORDER BY c.last_active_at DESC
             LIMIT ?
             """,
             params,
@@ -241,20 +306,20 @@ class Db:
             })
         return result
 
-    async def set_conversation_title(self, conversation_id: str, title: str) -> None:
-        """Store an AI-generated title for a conversation."""
+    async def set_conversation_title(self, conversation_id: str, title: str, durable: bool = False) -> None:
+        """Store an AI-generated title for a conversation (group-committed; durable=True waits for the commit)."""
         if not self._conn:
             await self.connect()
-        await self._conn.execute(
-            "UPDATE conversations SET title = ? WHERE id = ?",
-            (title, conversation_id),
+        await self._writes.submit(
+            [("UPDATE conversations SET title = ? WHERE id = ?", (title, conversation_id))],
+            durable=durable,
         )
-        await self._conn.commit()
 
     async def get_conversation_title(self, conversation_id: str) -> str | None:
         """Return the stored AI title, or None if not yet generated."""
         if not self._conn:
             await self.connect()
+        await self.flush_writes()
         cursor = await self._conn.execute(
             "SELECT title FROM conversations WHERE id = ?",
             (conversation_id,),
@@ -342,18 +407,40 @@ class Db:
 
     # ── Messages ──────────────────────────────────────────────────────────
 
-    async def add_message(self, conversation_id: str, role: str, content: str, provider_used: str | None = None) -> None:
+    async def add_message(
+        self,
+        conversation_id: str,
+        role: str,
+        content: str,
+        provider_used: str | None = None,
+        durable: bool = False,
+    ) -> None:
+        """Queue a message for the next group commit; durable=True waits until it is committed."""
         if not self._conn:
             await self.connect()
-        await self._conn.execute(
-            "INSERT INTO messages (conversation_id, role, content, provider_used, created_at) VALUES (?, ?, ?, ?, datetime('now'))",
-            (conversation_id, role, content, provider_used),
+        await self._writes.submit(
+            [
+                (
+                    "INSERT INTO messages (conversation_id, role, content, provider_used, created_at) VALUES (?, ?, ?, ?, datetime('now'))",
+                    (conversation_id, role, content, provider_used),
+                ),
+                (
+                    """UPDATE conversations SET
+                           last_active_at = datetime('now'),
+                           message_count = message_count + 1,
+                           approx_chars = approx_chars + ?,
+                           first_user_snippet = COALESCE(first_user_snippet, CASE WHEN ? = 'user' THEN ? END)
+                       WHERE id = ?""",
+                    (len(content or ""), role, (content or "")[:CONVERSATION_SNIPPET_CHARS], conversation_id),
+                ),
+            ],
+            durable=durable,
         )
-        await self._conn.commit()
 
     async def get_recent_messages(self, conversation_id: str, limit: int = 10) -> list[dict[str, Any]]:
         if not self._conn:
             await self.connect()
+        await self.flush_writes()
         cursor = await self._conn.execute(
             "SELECT role, content FROM messages WHERE conversation_id = ? ORDER BY id DESC LIMIT ?",
             (conversation_id, limit),
@@ -362,16 +449,57 @@ class Db:
         out = [{"role": r["role"], "content": r["content"]} for r in reversed(rows)]
         return out
 
+    async def get_messages_page(
+        self,
+        conversation_id: str,
+        limit: int = 50,
+        before_id: int | None = None,
+        after_id: int | None = None,
+    ) -> tuple[list[dict[str, Any]], bool]:
+        """Keyset page of messages (oldest-first) plus whether more exist in the paging direction.
+
+        No cursor: newest ``limit`` messages. ``before_id``: the ``limit`` messages just older
+        than that id. ``after_id``: the ``limit`` messages just newer. Each page is one index
+        range scan on (conversation_id, id), so cost does not grow with scroll depth.
+        """
+        if not self._conn:
+            await self.connect()
+        await self.flush_writes()
+        limit = max(1, int(limit))
+        cols = "id, role, content, provider_used, created_at"
+        if after_id is not None:
+            cursor = await self._conn.execute(
+                f"SELECT {cols} FROM messages WHERE conversation_id = ? AND id > ? ORDER BY id ASC LIMIT ?",
+                (conversation_id, int(after_id), limit + 1),
+            )
+            rows = list(await cursor.fetchall())
+        else:
+            if before_id is not None:
+                sql = f"SELECT {cols} FROM messages WHERE conversation_id = ? AND id < ? ORDER BY id DESC LIMIT ?"
+                params: tuple = (conversation_id, int(before_id), limit + 1)
+            else:
+                sql = f"SELECT {cols} FROM messages WHERE conversation_id = ? ORDER BY id DESC LIMIT ?"
+                params = (conversation_id, limit + 1)
+            cursor = await self._conn.execute(sql, params)
+            rows = list(await cursor.fetchall())
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if after_id is None:
+            rows.reverse()
+        return [dict(r) for r in rows], has_more
+
     async def truncate_conversation_messages(self, conversation_id: str, keep_count: int) -> int:
         """Delete messages after the first ``keep_count`` rows (oldest-first)."""
         if not self._conn:
             await self.connect()
+        await self.flush_writes()
         keep = max(0, int(keep_count or 0))
         if keep == 0:
             cursor = await self._conn.execute(
                 "DELETE FROM messages WHERE conversation_id = ?",
                 (conversation_id,),
             )
+            await self._refresh_conversation_summary(conversation_id)
             await self._conn.commit()
             return int(cursor.rowcount or 0)
 
@@ -387,12 +515,18 @@ class Db:
             "DELETE FROM messages WHERE conversation_id = ? AND id >= ?",
             (conversation_id, cutoff_id),
         )
+        await self._refresh_conversation_summary(conversation_id)
         await self._conn.commit()
         return int(cursor.rowcount or 0)
 
+    async def _refresh_conversation_summary(self, conversation_id: str) -> None:
+        """Recompute one conversation's summary columns (caller commits)."""
+        await self._conn.execute(CONVERSATION_SUMMARY_REFRESH_SQL + " WHERE id = ?", (conversation_id,))
+
     async def delete_conversation(self, conversation_id: str) -> None:
         if not self._conn:
             await self.connect()
+        await self.flush_writes()
         await self._conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
         await self._conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
         await self._conn.commit()
@@ -542,6 +676,49 @@ class Db:
         await self._conn.commit()
         return int(cursor.rowcount or 0)
 
+    def _invalidate_user_settings(self, user_id: str) -> None:
+        self._settings_cache.pop(user_id, None)
+
+    async def get_user_settings_snapshot(self, user_id: str) -> UserSettingsSnapshot:
+        """Settings used on every turn, loaded with a single query and cached until a setter changes them."""
+        cached = self._settings_cache.get(user_id)
+        if cached is not None:
+            return cached
+        if not self._conn:
+            await self.connect()
+        try:
+            cursor = await self._conn.execute(
+                """SELECT s.mood, s.default_ai_provider, s.thinking_level, s.reasoning_mode,
+                          s.final_mode, s.provider_flow_mode,
+                          (SELECT json_group_object(provider, model) FROM provider_models WHERE user_id = u.id) AS models_json,
+                          (SELECT json_group_object(skill_id, enabled) FROM skill_toggles WHERE user_id = u.id) AS toggles_json
+                   FROM (SELECT ? AS id) u
+                   LEFT JOIN user_settings s ON s.user_id = u.id""",
+                (user_id,),
+            )
+            row = await cursor.fetchone()
+        except Exception as e:
+            self.logger.exception("Failed to load user settings snapshot: %s", e)
+            return UserSettingsSnapshot(user_id=user_id)
+        thinking_level = (row["thinking_level"] or "off").strip().lower()
+        reasoning_mode = (row["reasoning_mode"] or "off").strip().lower()
+        final_mode = (row["final_mode"] or "off").strip().lower()
+        models = json.loads(row["models_json"] or "{}")
+        toggles = json.loads(row["toggles_json"] or "{}")
+        snapshot = UserSettingsSnapshot(
+            user_id=user_id,
+            mood=row["mood"] or "normal",
+            default_ai=row["default_ai_provider"] or DEFAULT_MAIN_PROVIDER,
+            thinking_level=thinking_level if thinking_level in THINK_LEVELS else "off",
+            reasoning_mode=reasoning_mode if reasoning_mode in ("off", "on", "stream") else "off",
+            final_mode=final_mode if final_mode in FINAL_MODES else "off",
+            provider_flow_mode=normalize_provider_flow_mode(row["provider_flow_mode"]),
+            provider_models={k: v for k, v in models.items() if v},
+            skill_toggles={k: bool(v) for k, v in toggles.items()},
+        )
+        self._settings_cache[user_id] = snapshot
+        return snapshot
+
     async def get_user_mood(self, user_id: str) -> str:
         if not self._conn:
             await self.connect()
@@ -560,6 +737,7 @@ class Db:
             (user_id, mood, mood),
         )
         await self._conn.commit()
+        self._invalidate_user_settings(user_id)
 
     async def get_user_default_ai(self, user_id: str) -> str:
         if not self._conn:
@@ -583,6 +761,7 @@ class Db:
             (user_id, provider, provider),
         )
         await self._conn.commit()
+        self._invalidate_user_settings(user_id)
 
     async def get_user_thinking_level(self, user_id: str) -> str:
         if not self._conn:
@@ -615,6 +794,7 @@ class Db:
             (user_id, normalized, normalized),
         )
         await self._conn.commit()
+        self._invalidate_user_settings(user_id)
 
     async def get_user_reasoning_mode(self, user_id: str) -> str:
         if not self._conn:
@@ -647,6 +827,7 @@ class Db:
             (user_id, normalized, normalized),
         )
         await self._conn.commit()
+        self._invalidate_user_settings(user_id)
 
     async def get_user_final_mode(self, user_id: str) -> str:
         if not self._conn:
@@ -679,6 +860,23 @@ class Db:
             (user_id, normalized, normalized),
         )
         await self._conn.commit()
+        self._invalidate_user_settings(user_id)
+
+    async def get_user_provider_flow_mode(self, user_id: str) -> str:
+        return (await self.get_user_settings_snapshot(user_id)).provider_flow_mode
+
+    async def set_user_provider_flow_mode(self, user_id: str, mode: str) -> None:
+        if not self._conn:
+            await self.connect()
+        normalized = normalize_provider_flow_mode(mode)
+        await self._conn.execute(
+            f"""INSERT INTO user_settings (user_id, mood, default_ai_provider, provider_flow_mode, updated_at)
+               VALUES (?, 'normal', '{DEFAULT_MAIN_PROVIDER}', ?, datetime('now'))
+               ON CONFLICT(user_id) DO UPDATE SET provider_flow_mode = ?, updated_at = datetime('now')""",
+            (user_id, normalized, normalized),
+        )
+        await self._conn.commit()
+        self._invalidate_user_settings(user_id)
 
     async def get_user_location(self, user_id: str) -> dict[str, Any] | None:
         if not self._conn:
@@ -745,6 +943,7 @@ class Db:
             (user_id, skill_id, 1 if enabled else 0, 1 if enabled else 0),
         )
         await self._conn.commit()
+        self._invalidate_user_settings(user_id)
 
     async def get_allowed_paths(self, user_id: str) -> list[str]:
         """Paths the user has allowed for file access (OpenClaw-style; merged with env ASTA_ALLOWED_PATHS in files router)."""
@@ -817,6 +1016,7 @@ class Db:
                 (user_id, provider, model.strip(), model.strip()),
             )
         await self._conn.commit()
+        self._invalidate_user_settings(user_id)
 
     async def add_reminder(
         self, user_id: str, channel: str, channel_target: str, message: str, run_at: str, tlg_call: bool = False
@@ -1375,6 +1575,8 @@ class Db:
                 (key_name, value.strip(), value.strip()),
             )
         await self._conn.commit()
+        from app.keys import notify_api_key_changed
+        notify_api_key_changed(key_name, value.strip())
 
     async def get_api_keys(self, user_id: str | None = None) -> dict[str, str]:
         """Return all stored API keys as {key_name: value}."""
@@ -1578,7 +1780,9 @@ class Db:
         placeholders = ",".join("?" for _ in deduped)
         cursor = await self._conn.execute(
             f"""
-            SELECT provider, enabled, auto_disabled, disabled_reason, updated_at
+            SELECT provider, enabled, auto_disabled, disabled_reason, hedge_wins, hedge_losses,
+                   stats_model, calls, error_rate, latency_ewma_ms, latency_p50_ms, latency_p95_ms,
+                   ttft_ewma_ms, last_call_at, updated_at
             FROM provider_runtime_state
             WHERE user_id = ? AND provider IN ({placeholders})
             """,
@@ -1593,6 +1797,16 @@ class Db:
                 "enabled": bool(row["enabled"]) if row else True,
                 "auto_disabled": bool(row["auto_disabled"]) if row else False,
                 "disabled_reason": str(row["disabled_reason"] or "").strip() if row else "",
+                "hedge_wins": int(row["hedge_wins"] or 0) if row else 0,
+                "hedge_losses": int(row["hedge_losses"] or 0) if row else 0,
+                "stats_model": str(row["stats_model"] or "") if row else "",
+                "calls": int(row["calls"] or 0) if row else 0,
+                "error_rate": row["error_rate"] if row else None,
+                "latency_ewma_ms": row["latency_ewma_ms"] if row else None,
+                "latency_p50_ms": row["latency_p50_ms"] if row else None,
+                "latency_p95_ms": row["latency_p95_ms"] if row else None,
+                "ttft_ewma_ms": row["ttft_ewma_ms"] if row else None,
+                "last_call_at": str(row["last_call_at"] or "") if row else "",
                 "updated_at": str(row["updated_at"] or "").strip() if row else "",
             }
         return out
@@ -1676,6 +1890,84 @@ class Db:
         )
         await self._conn.commit()
 
+    async def record_provider_hedge_outcome(self, user_id: str, winner: str, loser: str) -> None:
+        """Count a hedged request: ``winner`` answered first, ``loser`` was cancelled or failed."""
+        if not self._conn:
+            await self.connect()
+        for provider, won in ((winner, 1), (loser, 0)):
+            provider_key = str(provider or "").strip().lower()
+            if not provider_key:
+                continue
+            await self._conn.execute(
+                """
+                INSERT INTO provider_runtime_state (
+                    user_id, provider, enabled, auto_disabled, disabled_reason,
+                    hedge_wins, hedge_losses, updated_at
+                ) VALUES (?, ?, 1, 0, '', ?, ?, datetime('now'))
+                ON CONFLICT(user_id, provider) DO UPDATE SET
+                    hedge_wins = hedge_wins + excluded.hedge_wins,
+                    hedge_losses = hedge_losses + excluded.hedge_losses,
+                    updated_at = datetime('now')
+                """,
+                (user_id, provider_key, won, 1 - won),
+            )
+        await self._conn.commit()
+
+    async def record_provider_call(
+        self,
+        user_id: str,
+        provider: str,
+        *,
+        model: str = "",
+        ok: bool,
+        latency_ms: float | None = None,
+        ttft_ms: float | None = None,
+    ) -> None:
+        """Fold one LLM call into the provider's rolling latency/error stats (see provider_flow.update_call_stats)."""
+        if not self._conn:
+            await self.connect()
+        provider_key = str(provider or "").strip().lower()
+        if not provider_key:
+            return
+        # Read-modify-write in one IMMEDIATE transaction on the held writer, so concurrent calls
+        # for the same provider cannot fold into the same old row and lose an update.
+        async with self._conn.exclusive_writer() as writer:
+            if not writer.in_transaction:
+                await writer.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = await writer.execute(
+                    """
+                    SELECT stats_model, calls, error_rate, latency_ewma_ms, ttft_ewma_ms, latency_window
+                    FROM provider_runtime_state WHERE user_id = ? AND provider = ?
+                    """,
+                    (user_id, provider_key),
+                )
+                row = await cursor.fetchone()
+                stats = update_call_stats(
+                    dict(row) if row else None,
+                    model=str(model or ""),
+                    ok=ok,
+                    latency_ms=latency_ms,
+                    ttft_ms=ttft_ms,
+                )
+                columns = list(stats)
+                await writer.execute(
+                    f"""
+                    INSERT INTO provider_runtime_state (
+                        user_id, provider, enabled, auto_disabled, disabled_reason,
+                        {", ".join(columns)}, last_call_at, updated_at
+                    ) VALUES (?, ?, 1, 0, '', {", ".join("?" for _ in columns)}, datetime('now'), datetime('now'))
+                    ON CONFLICT(user_id, provider) DO UPDATE SET
+                        {", ".join(f"{c} = excluded.{c}" for c in columns)},
+                        last_call_at = datetime('now'),
+                        updated_at = datetime('now')
+                    """,
+                    (user_id, provider_key, *stats.values()),
+                )
+                await writer.commit()
+            except BaseException:
+                await writer.rollback()
+                raise
 
     async def get_system_config(self, key: str) -> str | None:
         """Get a global system setting."""
@@ -1794,43 +2086,107 @@ class Db:
         input_tokens: int,
         output_tokens: int,
         user_id: str = "default",
+        durable: bool = False,
+        cache_read_tokens: int = 0,
+        cache_write_tokens: int = 0,
     ) -> None:
-        """Record token usage for a provider call."""
-        if not self._conn:
-            await self.connect()
-        now = datetime.now(timezone.utc).isoformat()
-        await self._conn.execute(
-            "INSERT INTO usage_stats (user_id, provider, model, input_tokens, output_tokens, created_at) VALUES (?, ?, ?, ?, ?, ?)",
-            (user_id, provider, model or "", input_tokens or 0, output_tokens or 0, now),
-        )
-        await self._conn.commit()
+        """Record token usage for a provider call (group-committed; durable=True waits for the commit).
+        Also bumps the hourly and daily usage_rollups rows that get_usage_stats reads.
+        cache_read/write_tokens are prompt-cache tokens, billed apart from input_tokens."""
+        if not self._conn:
+            await self.connect()
+        now_dt = datetime.now(timezone.utc)
+        now = now_dt.isoformat()
+        model = model or ""
+        input_tokens = input_tokens or 0
+        output_tokens = output_tokens or 0
+        cache_read_tokens = cache_read_tokens or 0
+        cache_write_tokens = cache_write_tokens or 0
+        statements: list[tuple[str, tuple]] = [(
+            """INSERT INTO usage_stats
+                   (user_id, provider, model, input_tokens, output_tokens, cache_read_tokens, cache_write_tokens, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (user_id, provider, model, input_tokens, output_tokens, cache_read_tokens, cache_write_tokens, now),
+        )]
+        for granularity, bucket in (("hour", now_dt.strftime("%Y-%m-%d %H:00")), ("day", now_dt.strftime("%Y-%m-%d"))):
+            statements.append((
+                """INSERT INTO usage_rollups
+                       (user_id, granularity, bucket, provider, model, input_tokens, output_tokens,
+                        cache_read_tokens, cache_write_tokens, calls, last_used)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
+                   ON CONFLICT(user_id, granularity, bucket, provider, model) DO UPDATE SET
+                       input_tokens = input_tokens + excluded.input_tokens,
+                       output_tokens = output_tokens + excluded.output_tokens,
+                       cache_read_tokens = cache_read_tokens + excluded.cache_read_tokens,
+                       cache_write_tokens = cache_write_tokens + excluded.cache_write_tokens,
+                       calls = calls + 1,
+                       last_used = MAX(last_used, excluded.last_used)""",
+                (
+                    user_id, granularity, bucket, provider, model, input_tokens, output_tokens,
+                    cache_read_tokens, cache_write_tokens, now,
+                ),
+            ))
+        await self._writes.submit(statements, durable=durable)
 
     async def get_usage_stats(self, user_id: str = "default", days: int = 30) -> list[dict[str, Any]]:
-        """Return per-provider token usage totals for the last N days."""
+        """Return per-provider token usage totals for the last N days (from daily rollups, so cost is O(days))."""
         if not self._conn:
             await self.connect()
+        await self.flush_writes()
         cursor = await self._conn.execute(
             """
             SELECT provider,
                    SUM(input_tokens) AS input_tokens,
                    SUM(output_tokens) AS output_tokens,
-                   COUNT(*) AS calls,
-                   MAX(created_at) AS last_used
-            FROM usage_stats
+                   SUM(cache_read_tokens) AS cache_read_tokens,
+                   SUM(cache_write_tokens) AS cache_write_tokens,
+                   SUM(calls) AS calls,
+                   MAX(last_used) AS last_used
+            FROM usage_rollups
             WHERE user_id = ?
-              AND created_at >= datetime('now', ? || ' days')
+              AND granularity = 'day'
+              AND bucket >= date('now', ? || ' days')
             GROUP BY provider
             ORDER BY (SUM(input_tokens) + SUM(output_tokens)) DESC
             """,
-            (user_id, f"-{days}"),
+            (user_id, f"-{int(days)}"),
         )
         rows = await cursor.fetchall()
         return [dict(r) for r in rows]
 
+    async def compact_usage_stats(
+        self,
+        raw_retention_days: int = USAGE_RAW_RETENTION_DAYS,
+        hourly_retention_days: int = USAGE_HOURLY_RETENTION_DAYS,
+    ) -> dict[str, int]:
+        """Retention job: drop raw usage rows and hourly rollups already covered by daily rollups."""
+        if not self._conn:
+            await self.connect()
+        await self.flush_writes()
+        now = datetime.now(timezone.utc)
+        raw_cutoff = (now - timedelta(days=max(1, raw_retention_days))).isoformat()
+        hour_cutoff = (now - timedelta(days=max(1, hourly_retention_days))).strftime("%Y-%m-%d %H:00")
+        raw = await self._conn.execute("DELETE FROM usage_stats WHERE created_at < ?", (raw_cutoff,))
+        hourly = await self._conn.execute(
+            "DELETE FROM usage_rollups WHERE granularity = 'hour' AND bucket < ?",
+            (hour_cutoff,),
+        )
+        await self._conn.commit()
+        return {"raw_deleted": int(raw.rowcount or 0), "hourly_deleted": int(hourly.rowcount or 0)}
+
     async def close(self) -> None:
+        if self._writes is not None:
+            try:
+                await self._writes.close()
+            except Exception as e:
+                self.logger.warning("Failed to flush queued DB writes on close: %s", e)
+            self._writes = None
         if self._conn:
             await self._conn.close()
             self._conn = None
+        self._settings_cache.clear()
+        from app.keys import reset_api_key_cache
+        reset_api_key_cache()
 
 
     # ── Users ──────────────────────────────────────────────────────────────────
@@ -1867,6 +2223,7 @@ class Db:
         await self.connect()
         await self._conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
         await self._conn.commit()
+        self._invalidate_user_settings(user_id)
 
     async def update_user_password(self, user_id: str, password_hash: str) -> None:
         await self.connect()
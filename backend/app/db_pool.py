@@ -0,0 +1,282 @@
+"""Read/write connection routing for the SQLite database.
+
+Separated from db.py so the Db class keeps calling ``self._conn.execute(...)``
+and ``self._conn.commit()`` as before, while statements are spread over one
+dedicated writer connection plus a small pool of read-only WAL connections.
+
+Routing rules:
+- ``SELECT`` statements go to the next reader (round-robin).
+- Everything else (INSERT/UPDATE/DELETE/PRAGMA/DDL/CTE writes) goes to the writer.
+- While the writer has an open transaction, or while a caller has pinned it
+  (``pin_writer``), reads stay on the writer so a method sees its own
+  uncommitted rows.
+- Connection-scoped functions (``last_insert_rowid()``, ``changes()``) always
+  run on the writer.
+- A write batch (``app.db_writes``) takes the writer with ``exclusive_writer``:
+  it waits for an open transaction to finish, and until it is done other
+  callers' writes, commits and rollbacks wait, so they can neither commit
+  half a batch nor roll it back.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import itertools
+import logging
+import re
+from typing import Any, AsyncIterator, Iterable, Iterator
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+_LEADING_COMMENTS_RE = re.compile(r"^\s*(?:(?:--[^\n]*\n)|(?:/\*.*?\*/)|\s)*", re.DOTALL)
+_WRITER_ONLY_FUNCS = ("last_insert_rowid", "changes()", "total_changes")
+# How long a write batch waits for another caller's open transaction before joining it
+WRITER_TXN_WAIT_S = 5.0
+
+
+def is_read_statement(sql: str) -> bool:
+    """True when ``sql`` is a plain SELECT that a read-only connection can serve."""
+    body = _LEADING_COMMENTS_RE.sub("", sql or "", count=1)
+    if body[:6].upper() != "SELECT":
+        return False
+    lowered = body.lower()
+    return not any(fn in lowered for fn in _WRITER_ONLY_FUNCS)
+
+
+class ReadResult:
+    """Fully-fetched result of a routed read.
+
+    Rows are fetched eagerly in the same call that runs the statement, so a
+    reader never keeps a stale WAL snapshot open between statements.
+    """
+
+    def __init__(self, rows: list[Any], description: Any = None) -> None:
+        self._rows = rows
+        self._pos = 0
+        self.description = description
+        self.rowcount = -1
+        self.lastrowid = None
+
+    async def fetchone(self) -> Any | None:
+        if self._pos >= len(self._rows):
+            return None
+        row = self._rows[self._pos]
+        self._pos += 1
+        return row
+
+    async def fetchmany(self, size: int | None = None) -> list[Any]:
+        n = len(self._rows) - self._pos if size is None else max(0, int(size))
+        out = self._rows[self._pos:self._pos + n]
+        self._pos += len(out)
+        return out
+
+    async def fetchall(self) -> list[Any]:
+        out = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return out
+
+    async def close(self) -> None:
+        self._pos = len(self._rows)
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self._iter()
+
+    async def _iter(self) -> AsyncIterator[Any]:
+        while (row := await self.fetchone()) is not None:
+            yield row
+
+
+class RoutedConnection:
+    """Minimal aiosqlite.Connection facade that routes statements by type."""
+
+    def __init__(self, writer: aiosqlite.Connection, readers: list[aiosqlite.Connection] | None = None) -> None:
+        self.writer = writer
+        self.readers: list[aiosqlite.Connection] = []
+        self._reader_cycle: Iterator[aiosqlite.Connection] | None = None
+        self._writer_pins = 0
+        # Task holding the writer for a batch, and batches waiting for it.
+        self._writer_owner: asyncio.Task | None = None
+        self._writer_wanted = 0
+        self._writer_cond: asyncio.Condition | None = None
+        self._writer_cond_loop: asyncio.AbstractEventLoop | None = None
+        self.attach_readers(readers or [])
+
+    def attach_readers(self, readers: list[aiosqlite.Connection]) -> None:
+        """Start routing SELECTs to ``readers`` (in addition to any already attached)."""
+        self.readers.extend(readers)
+        self._reader_cycle = itertools.cycle(self.readers) if self.readers else None
+
+    @property
+    def row_factory(self) -> Any:
+        return self.writer.row_factory
+
+    @property
+    def in_transaction(self) -> bool:
+        return bool(self.writer.in_transaction)
+
+    @property
+    def total_changes(self) -> int:
+        return self.writer.total_changes
+
+    def pin_writer(self) -> None:
+        """Route all reads to the writer until the matching ``unpin_writer``."""
+        self._writer_pins += 1
+
+    def unpin_writer(self) -> None:
+        self._writer_pins = max(0, self._writer_pins - 1)
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._writer_cond is None or self._writer_cond_loop is not loop:
+            # Waiters on a previous (closed) loop are gone with it.
+            self._writer_cond = asyncio.Condition()
+            self._writer_cond_loop = loop
+            self._writer_owner = None
+            self._writer_wanted = 0
+        return self._writer_cond
+
+    @contextlib.asynccontextmanager
+    async def exclusive_writer(self, *, wait_s: float = WRITER_TXN_WAIT_S) -> AsyncIterator[aiosqlite.Connection]:
+        """Hold the writer for a multi-statement transaction (one at a time).
+
+        Waits up to ``wait_s`` for another caller's open transaction to commit or
+        roll back; past that it joins the open transaction instead of deadlocking.
+        """
+        cond = self._condition()
+        async with cond:
+            self._writer_wanted += 1
+            try:
+                await asyncio.wait_for(
+                    cond.wait_for(lambda: self._writer_owner is None and not self.writer.in_transaction),
+                    timeout=wait_s,
+                )
+            except asyncio.TimeoutError:
+                await cond.wait_for(lambda: self._writer_owner is None)
+                logger.warning("Writer transaction still open after %.1fs; batch joins it", wait_s)
+            except BaseException:
+                self._writer_wanted -= 1
+                cond.notify_all()
+                raise
+            self._writer_owner = asyncio.current_task()
+        try:
+            yield self.writer
+        finally:
+            async with cond:
+                self._writer_owner = None
+                self._writer_wanted -= 1
+                cond.notify_all()
+
+    def _may_use_writer(self) -> bool:
+        owner = self._writer_owner
+        if owner is not None:
+            return owner is asyncio.current_task()
+        # A waiting batch holds back new transactions; an open one may still finish.
+        return not self._writer_wanted or self.writer.in_transaction
+
+    async def _writer_turn(self) -> None:
+        if self._writer_owner is None and not self._writer_wanted:
+            return
+        if self._may_use_writer():
+            return
+        cond = self._condition()
+        async with cond:
+            await cond.wait_for(self._may_use_writer)
+
+    async def _notify_writer_free(self) -> None:
+        if self._writer_wanted and self._writer_owner is None:
+            cond = self._condition()
+            async with cond:
+                cond.notify_all()
+
+    def _pick_reader(self, sql: str) -> aiosqlite.Connection | None:
+        if self._reader_cycle is None or self._writer_pins or self.writer.in_transaction:
+            return None
+        if not is_read_statement(sql):
+            return None
+        reader = next(self._reader_cycle)
+        if not _worker_alive(reader):
+            self._drop_dead_readers()
+            return self._pick_reader(sql)
+        return reader
+
+    def _drop_dead_readers(self) -> None:
+        # aiosqlite's worker thread exits if it hands a result to an event loop
+        # that has since closed; anything queued to it afterwards never completes.
+        dead = [r for r in self.readers if not _worker_alive(r)]
+        logger.warning("Dropping %d SQLite reader(s) whose worker thread exited", len(dead))
+        self.readers = [r for r in self.readers if r not in dead]
+        self._reader_cycle = itertools.cycle(self.readers) if self.readers else None
+
+    async def execute(self, sql: str, parameters: Iterable[Any] | None = None) -> Any:
+        reader = self._pick_reader(sql)
+        if reader is None:
+            if not is_read_statement(sql):
+                await self._writer_turn()
+            return await self.writer.execute(sql, parameters)
+        # Execute and fetch in one worker-thread call: a cancelled await between
+        # the two would leave the reader holding an old WAL snapshot.
+        rows = await reader.execute_fetchall(sql, parameters)
+        return ReadResult(list(rows))
+
+    async def executemany(self, sql: str, parameters: Iterable[Iterable[Any]]) -> Any:
+        await self._writer_turn()
+        return await self.writer.executemany(sql, parameters)
+
+    async def executescript(self, sql_script: str) -> Any:
+        await self._writer_turn()
+        try:
+            return await self.writer.executescript(sql_script)
+        finally:
+            await self._notify_writer_free()
+
+    async def commit(self) -> None:
+        await self._writer_turn()
+        try:
+            await self.writer.commit()
+        finally:
+            await self._notify_writer_free()
+
+    async def rollback(self) -> None:
+        await self._writer_turn()
+        try:
+            await self.writer.rollback()
+        finally:
+            await self._notify_writer_free()
+
+    async def close(self) -> None:
+        for conn in [*self.readers, self.writer]:
+            try:
+                await conn.close()
+            except Exception as e:
+                logger.debug("Failed to close SQLite connection: %s", e)
+        self.readers = []
+        self._reader_cycle = None
+
+
+def _worker_alive(conn: aiosqlite.Connection) -> bool:
+    if not getattr(conn, "_running", True):
+        return False
+    thread = getattr(conn, "_thread", None)
+    return thread is None or thread.ident is None or thread.is_alive()
+
+
+async def open_readers(db_path: str, size: int, *, timeout: float = 30.0) -> list[aiosqlite.Connection]:
+    """Open up to ``size`` read-only connections. Returns [] when pooling is not possible."""
+    if size <= 0 or not db_path or db_path == ":memory:" or db_path.startswith("file::memory:"):
+        return []
+    readers: list[aiosqlite.Connection] = []
+    try:
+        for _ in range(size):
+            conn = await aiosqlite.connect(f"file:{db_path}?mode=ro", uri=True, timeout=timeout)
+            readers.append(conn)
+            conn.row_factory = aiosqlite.Row
+            await conn.execute("PRAGMA busy_timeout = 5000")
+            await conn.execute("PRAGMA query_only = 1")
+    except Exception as e:
+        logger.warning("SQLite read pool unavailable, routing reads to the writer: %s", e)
+        await asyncio.gather(*(c.close() for c in readers), return_exceptions=True)
+        return []
+    return readers
@@ -15,6 +15,22 @@ from app.provider_flow import DEFAULT_MAIN_PROVIDER
 if TYPE_CHECKING:
     import aiosqlite
 
+# Max stored length of conversations.first_user_snippet (sidebar titles cut at 80).
+CONVERSATION_SNIPPET_CHARS = 200
+
+# Recompute conversations summary columns from messages. Used for the backfill
+# (all rows) and, with a WHERE clause appended, after truncating one conversation.
+CONVERSATION_SUMMARY_REFRESH_SQL = f"""
+    UPDATE conversations SET
+        last_active_at = (SELECT created_at FROM messages WHERE conversation_id = conversations.id ORDER BY id DESC LIMIT 1),
+        message_count = (SELECT COUNT(*) FROM messages WHERE conversation_id = conversations.id),
+        approx_chars = (SELECT COALESCE(SUM(LENGTH(content)), 0) FROM messages WHERE conversation_id = conversations.id),
+        first_user_snippet = (
+            SELECT substr(content, 1, {CONVERSATION_SNIPPET_CHARS}) FROM messages
+            WHERE conversation_id = conversations.id AND role = 'user' ORDER BY id ASC LIMIT 1
+        )
+"""
+
 
 async def init_schema(conn: "aiosqlite.Connection", logger: logging.Logger) -> None:
     """Create all tables/indexes (IF NOT EXISTS) then run column migrations."""
@@ -60,6 +76,7 @@ async def init_schema(conn: "aiosqlite.Connection", logger: logging.Logger) -> N
             thinking_level TEXT NOT NULL DEFAULT 'off',
             reasoning_mode TEXT NOT NULL DEFAULT 'off',
             final_mode TEXT NOT NULL DEFAULT 'off',
+            provider_flow_mode TEXT NOT NULL DEFAULT 'fixed',
             updated_at TEXT NOT NULL
         );
         CREATE TABLE IF NOT EXISTS api_keys (
@@ -85,6 +102,17 @@ async def init_schema(conn: "aiosqlite.Connection", logger: logging.Logger) -> N
             enabled INTEGER NOT NULL DEFAULT 1,
             auto_disabled INTEGER NOT NULL DEFAULT 0,
             disabled_reason TEXT,
+            hedge_wins INTEGER NOT NULL DEFAULT 0,
+            hedge_losses INTEGER NOT NULL DEFAULT 0,
+            stats_model TEXT,
+            calls INTEGER NOT NULL DEFAULT 0,
+            error_rate REAL,
+            latency_ewma_ms REAL,
+            latency_p50_ms REAL,
+            latency_p95_ms REAL,
+            ttft_ewma_ms REAL,
+            latency_window TEXT,
+            last_call_at TEXT,
             updated_at TEXT NOT NULL,
             PRIMARY KEY (user_id, provider)
         );
@@ -130,7 +158,7 @@ async def init_schema(conn: "aiosqlite.Connection", logger: logging.Logger) -> N
             created_at TEXT NOT NULL
         );
         CREATE INDEX IF NOT EXISTS idx_saved_audio_notes_user ON saved_audio_notes(user_id);
-        CREATE INDEX IF NOT EXISTS idx_messages_conv ON messages(conversation_id);
+        CREATE INDEX IF NOT EXISTS idx_messages_conv ON messages(conversation_id, id);
         CREATE INDEX IF NOT EXISTS idx_tasks_run ON tasks(run_at);
         CREATE INDEX IF NOT EXISTS idx_reminders_run ON reminders(run_at);
         CREATE TABLE IF NOT EXISTS system_config (
@@ -224,10 +252,26 @@ async def init_schema(conn: "aiosqlite.Connection", logger: logging.Logger) -> N
             model TEXT NOT NULL DEFAULT '',
             input_tokens INTEGER NOT NULL DEFAULT 0,
             output_tokens INTEGER NOT NULL DEFAULT 0,
+            cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+            cache_write_tokens INTEGER NOT NULL DEFAULT 0,
             created_at TEXT NOT NULL
         );
         CREATE INDEX IF NOT EXISTS idx_usage_provider_created ON usage_stats(provider, created_at DESC);
         CREATE INDEX IF NOT EXISTS idx_usage_user_created ON usage_stats(user_id, created_at DESC);
+        CREATE TABLE IF NOT EXISTS usage_rollups (
+            user_id TEXT NOT NULL,
+            granularity TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            provider TEXT NOT NULL,
+            model TEXT NOT NULL DEFAULT '',
+            input_tokens INTEGER NOT NULL DEFAULT 0,
+            output_tokens INTEGER NOT NULL DEFAULT 0,
+            cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+            cache_write_tokens INTEGER NOT NULL DEFAULT 0,
+            calls INTEGER NOT NULL DEFAULT 0,
+            last_used TEXT NOT NULL,
+            PRIMARY KEY (user_id, granularity, bucket, provider, model)
+        );
         CREATE TABLE IF NOT EXISTS conversation_folders (
             id TEXT PRIMARY KEY,
             user_id TEXT NOT NULL,
@@ -345,6 +389,48 @@ async def init_schema(conn: "aiosqlite.Connection", logger: logging.Logger) -> N
         except Exception as e:
             logger.exception("Failed to add title column to conversations: %s", e)
 
+    # messages: idx_messages_conv used to be (conversation_id) only; keyset paging wants (conversation_id, id)
+    try:
+        cursor = await conn.execute("PRAGMA index_info(idx_messages_conv)")
+        if len(await cursor.fetchall()) == 1:
+            await conn.execute("DROP INDEX idx_messages_conv")
+            await conn.execute("CREATE INDEX idx_messages_conv ON messages(conversation_id, id)")
+            await conn.commit()
+    except Exception as e:
+        logger.exception("Failed to rebuild idx_messages_conv: %s", e)
+
+    # conversations: denormalized summary so list_conversations never scans messages
+    _conv_summary_migrations = [
+        ("last_active_at", "ALTER TABLE conversations ADD COLUMN last_active_at TEXT"),
+        ("message_count", "ALTER TABLE conversations ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0"),
+        ("approx_chars", "ALTER TABLE conversations ADD COLUMN approx_chars INTEGER NOT NULL DEFAULT 0"),
+        ("first_user_snippet", "ALTER TABLE conversations ADD COLUMN first_user_snippet TEXT"),
+    ]
+    added_summary_cols = False
+    for col, sql in _conv_summary_migrations:
+        if col not in conv_cols:
+            try:
+                await conn.execute(sql)
+                await conn.commit()
+                added_summary_cols = True
+            except Exception as e:
+                logger.exception("Failed to add conversations.%s column: %s", col, e)
+    try:
+        await conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_conversations_user_channel_active "
+            "ON conversations(user_id, channel, last_active_at DESC)"
+        )
+        await conn.commit()
+    except Exception as e:
+        logger.exception("Failed to create conversations activity index: %s", e)
+    if added_summary_cols:
+        # One-time backfill for installs that predate the summary columns.
+        try:
+            await conn.execute(CONVERSATION_SUMMARY_REFRESH_SQL)
+            await conn.commit()
+        except Exception as e:
+            logger.exception("Failed to backfill conversation summary columns: %s", e)
+
     # cron_jobs: payload_kind, tlg_call
     cursor = await conn.execute("PRAGMA table_info(cron_jobs)")
     cron_cols = [row["name"] for row in await cursor.fetchall()]
@@ -393,6 +479,10 @@ async def init_schema(conn: "aiosqlite.Connection", logger: logging.Logger) -> N
             "final_mode",
             "ALTER TABLE user_settings ADD COLUMN final_mode TEXT NOT NULL DEFAULT 'off'",
         ),
+        (
+            "provider_flow_mode",
+            "ALTER TABLE user_settings ADD COLUMN provider_flow_mode TEXT NOT NULL DEFAULT 'fixed'",
+        ),
     ]
     for col, sql in _user_settings_migrations:
         if col not in columns:
@@ -402,6 +492,64 @@ async def init_schema(conn: "aiosqlite.Connection", logger: logging.Logger) -> N
             except Exception as e:
                 logger.exception("Failed to add user_settings.%s column: %s", col, e)
 
+    # provider_runtime_state: hedged-request counters and rolling call stats
+    cursor = await conn.execute("PRAGMA table_info(provider_runtime_state)")
+    columns = [row["name"] for row in await cursor.fetchall()]
+    for col, decl in (
+        ("hedge_wins", "INTEGER NOT NULL DEFAULT 0"),
+        ("hedge_losses", "INTEGER NOT NULL DEFAULT 0"),
+        ("stats_model", "TEXT"),
+        ("calls", "INTEGER NOT NULL DEFAULT 0"),
+        ("error_rate", "REAL"),
+        ("latency_ewma_ms", "REAL"),
+        ("latency_p50_ms", "REAL"),
+        ("latency_p95_ms", "REAL"),
+        ("ttft_ewma_ms", "REAL"),
+        ("latency_window", "TEXT"),
+        ("last_call_at", "TEXT"),
+    ):
+        if col not in columns:
+            try:
+                await conn.execute(f"ALTER TABLE provider_runtime_state ADD COLUMN {col} {decl}")
+                await conn.commit()
+            except Exception as e:
+                logger.exception("Failed to add provider_runtime_state.%s column: %s", col, e)
+
+    # usage_stats / usage_rollups: prompt-cache token columns
+    for table in ("usage_stats", "usage_rollups"):
+        cursor = await conn.execute(f"PRAGMA table_info({table})")
+        columns = [row["name"] for row in await cursor.fetchall()]
+        for col in ("cache_read_tokens", "cache_write_tokens"):
+            if col not in columns:
+                try:
+                    await conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} INTEGER NOT NULL DEFAULT 0")
+                    await conn.commit()
+                except Exception as e:
+                    logger.exception("Failed to add %s.%s column: %s", table, col, e)
+
+    # usage_rollups: one-time backfill from raw usage_stats for installs that predate the rollups
+    try:
+        cursor = await conn.execute("SELECT EXISTS(SELECT 1 FROM usage_rollups) AS has_rollups")
+        has_rollups = (await cursor.fetchone())[0]
+        if not has_rollups:
+            for granularity, bucket_expr in (
+                ("hour", "substr(created_at, 1, 10) || ' ' || substr(created_at, 12, 2) || ':00'"),
+                ("day", "substr(created_at, 1, 10)"),
+            ):
+                await conn.execute(
+                    f"""INSERT INTO usage_rollups
+                           (user_id, granularity, bucket, provider, model, input_tokens, output_tokens,
+                            cache_read_tokens, cache_write_tokens, calls, last_used)
+                       SELECT user_id, '{granularity}', {bucket_expr}, provider, model,
+                              SUM(input_tokens), SUM(output_tokens),
+                              SUM(cache_read_tokens), SUM(cache_write_tokens), COUNT(*), MAX(created_at)
+                       FROM usage_stats
+                       GROUP BY user_id, {bucket_expr}, provider, model"""
+                )
+            await conn.commit()
+    except Exception as e:
+        logger.exception("Failed to backfill usage_rollups: %s", e)
+
     # subagent_runs: several columns added over time
     try:
         cursor = await conn.execute("PRAGMA table_info(subagent_runs)")
@@ -488,6 +636,28 @@ async def _migrate_default_to_admin(conn: "aiosqlite.Connection", logger: loggin
             await conn.execute(f"UPDATE {table} SET user_id = ? WHERE user_id = 'default'", (admin_id,))
         except Exception as e:
             logger.debug("Migration skip %s: %s", table, e)
+    # usage_rollups has user_id in its primary key: fold 'default' counters into any
+    # existing admin row for the same bucket instead of renaming into a conflict.
+    try:
+        await conn.execute(
+            """INSERT INTO usage_rollups
+                   (user_id, granularity, bucket, provider, model, input_tokens, output_tokens,
+                    cache_read_tokens, cache_write_tokens, calls, last_used)
+               SELECT ?, granularity, bucket, provider, model, input_tokens, output_tokens,
+                      cache_read_tokens, cache_write_tokens, calls, last_used
+               FROM usage_rollups WHERE user_id = 'default'
+               ON CONFLICT (user_id, granularity, bucket, provider, model) DO UPDATE SET
+                   input_tokens = input_tokens + excluded.input_tokens,
+                   output_tokens = output_tokens + excluded.output_tokens,
+                   cache_read_tokens = cache_read_tokens + excluded.cache_read_tokens,
+                   cache_write_tokens = cache_write_tokens + excluded.cache_write_tokens,
+                   calls = calls + excluded.calls,
+                   last_used = MAX(last_used, excluded.last_used)""",
+            (admin_id,),
+        )
+        await conn.execute("DELETE FROM usage_rollups WHERE user_id = 'default'")
+    except Exception as e:
+        logger.debug("Migration skip usage_rollups: %s", e)
 
     # Update conversation IDs: default:web:xxx → admin_id:web:xxx
     cursor = await conn.execute("SELECT id FROM conversations WHERE id LIKE 'default:%'")
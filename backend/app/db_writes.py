@@ -0,0 +1,165 @@
+"""Write-behind queue that group-commits small inserts/updates.
+
+Separated from db.py so hot-path writes (messages, usage rows, titles) from
+many concurrent turns share one transaction per ``window_ms`` instead of each
+paying for its own commit.
+
+Semantics:
+- ``submit(..., durable=False)`` returns as soon as the write is queued;
+  failures are logged.
+- ``submit(..., durable=True)`` waits until the batch containing the write is
+  committed and re-raises the statement's error, if any.
+- ``flush()`` commits everything queued so far, waiting for a batch that is
+  already being written; Db calls it before reading the batched tables so
+  reads still see earlier writes.
+- Batches are applied one at a time, and each write runs inside its own
+  SAVEPOINT: a failing statement rolls back that write only, never a
+  neighbour's rows or the rest of its own write.
+- While a batch is being written, reads are pinned to the writer connection
+  (see ``RoutedConnection.pin_writer``) so they cannot miss in-flight rows,
+  and the batch holds the writer exclusively
+  (``RoutedConnection.exclusive_writer``): other callers' writes, commits and
+  rollbacks wait until it has committed.
+- A batcher belongs to one event loop. It rebinds only after that loop has
+  closed (e.g. between test loops); submitting from a second live loop is an
+  error.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Sequence
+
+from app.db_pool import RoutedConnection
+
+logger = logging.getLogger(__name__)
+
+Statement = tuple[str, Sequence[Any]]
+
+
+class _PendingWrite:
+    __slots__ = ("statements", "future")
+
+    def __init__(self, statements: list[Statement], future: asyncio.Future | None) -> None:
+        self.statements = statements
+        self.future = future
+
+
+def _resolve(fut: asyncio.Future | None, error: BaseException | None = None) -> None:
+    if fut is None or fut.done():
+        return
+    try:
+        if error is None:
+            fut.set_result(None)
+        else:
+            fut.set_exception(error)
+    except RuntimeError:
+        # Waiter's event loop is already closed (e.g. caller went away); nothing to notify.
+        pass
+
+
+class WriteBatcher:
+    def __init__(self, conn: RoutedConnection, window_ms: float) -> None:
+        self._conn = conn
+        self._window = max(0.0, float(window_ms)) / 1000.0
+        self._pending: list[_PendingWrite] = []
+        self._timer: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock: asyncio.Lock | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _bind(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._loop is not None and not self._loop.is_closed():
+                raise RuntimeError("WriteBatcher is bound to a different running event loop")
+            # Previous loop is gone, and with it any timer or lock waiters; start over on this one.
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._timer = None
+        assert self._lock is not None
+        return self._lock
+
+    async def submit(self, statements: list[Statement], *, durable: bool = False) -> None:
+        """Queue statements that must be applied together; see module docstring for ``durable``."""
+        self._bind()
+        fut = self._loop.create_future() if durable else None
+        self._pending.append(_PendingWrite(list(statements), fut))
+        if self._window <= 0:
+            await self.flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = self._loop.create_task(self._flush_later())
+        if fut is not None:
+            await fut
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self._window)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Apply and commit every queued write in a single transaction, after any batch already in flight."""
+        async with self._bind():
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            errors = await self._apply(batch)
+        for item, error in zip(batch, errors):
+            if error is not None and item.future is None:
+                logger.warning("Batched DB write failed: %s", error)
+            _resolve(item.future, error)
+
+    async def _apply(self, batch: list[_PendingWrite]) -> list[BaseException | None]:
+        async with self._conn.exclusive_writer() as writer:
+            return await self._apply_exclusive(writer, batch)
+
+    async def _apply_exclusive(self, writer, batch: list[_PendingWrite]) -> list[BaseException | None]:
+        errors: list[BaseException | None] = []
+        self._conn.pin_writer()
+        try:
+            # Open the transaction explicitly: RELEASE of an outermost SAVEPOINT would commit on its own.
+            if not writer.in_transaction:
+                await writer.execute("BEGIN")
+            for item in batch:
+                errors.append(await self._apply_one(writer, item))
+            try:
+                await writer.commit()
+            except Exception as e:
+                logger.exception("Batched DB commit failed (%d writes): %s", len(batch), e)
+                errors = [e] * len(batch)
+        except Exception as e:
+            logger.exception("Batched DB write failed (%d writes): %s", len(batch), e)
+            try:
+                await writer.rollback()
+            except Exception:
+                pass
+            errors = [e] * len(batch)
+        finally:
+            self._conn.unpin_writer()
+        return errors
+
+    @staticmethod
+    async def _apply_one(writer, item: _PendingWrite) -> BaseException | None:
+        await writer.execute("SAVEPOINT batched_write")
+        try:
+            for sql, params in item.statements:
+                await writer.execute(sql, params)
+        except Exception as e:
+            await writer.execute("ROLLBACK TO batched_write")
+            await writer.execute("RELEASE batched_write")
+            return e
+        await writer.execute("RELEASE batched_write")
+        return None
+
+    async def close(self) -> None:
+        """Flush what is queued (waiting for an in-flight batch rather than cancelling it), then stop the timer."""
+        if self._loop is not None and self._loop.is_closed():
+            self._loop = None
+        await self.flush()
+        timer, self._timer = self._timer, None
+        if timer is not None and not timer.done():
+            # Nothing is queued and no batch holds the lock, so the timer is at most sleeping or about to flush nothing.
+            timer.cancel()
@@ -283,8 +283,13 @@ def build_exec_runtime_argv(cmd: str, validated_parts: list[str]) -> list[str]:
     return validated_parts
 
 
-async def get_effective_exec_bins(db: Db | None, user_id: str | None = None) -> set[str]:
-    """OpenClaw-style: env + DB + bins from enabled workspace skills (autoAllowSkills)."""
+async def get_effective_exec_bins(
+    db: Db | None,
+    user_id: str | None = None,
+    skill_toggles: dict[str, bool] | None = None,
+) -> set[str]:
+    """OpenClaw-style: env + DB + bins from enabled workspace skills (autoAllowSkills).
+    Pass skill_toggles when the caller already loaded them for this turn."""
     settings = get_settings()
     allowed = set(settings.exec_allowed_bins or [])
     if db:
@@ -300,17 +305,19 @@ async def get_effective_exec_bins(db: Db | None, user_id: str | None = None) ->
             logger.debug("Failed to load exec_allowed_bins from DB (will use env only): %s", e)
     # Bins from enabled workspace skills only (OpenClaw autoAllowSkills behavior).
     from app.workspace import discover_workspace_skills, is_skill_runtime_eligible
+    toggles = skill_toggles
+    if toggles is None and db and user_id:
+        try:
+            toggles = await db.get_all_skill_toggles(user_id)
+        except Exception as e:
+            logger.debug("Failed to load skill toggles (treating workspace skills as disabled): %s", e)
+            return allowed
     for skill in discover_workspace_skills():
         # OpenClaw-style: only host-eligible skills should influence runtime command surface.
         if not is_skill_runtime_eligible(skill, require_bins=False):
             continue
-        if db and user_id:
-            try:
-                if not await db.get_skill_enabled(user_id, skill.name):
-                    continue
-            except Exception as e:
-                logger.debug("Failed to check if skill '%s' is enabled (treating as disabled): %s", skill.name, e)
-                # Continue - treat skill as disabled on error
+        if toggles is not None and not toggles.get(skill.name, True):
+            continue
         for b in (skill.required_bins or ()):
             if b:
                 allowed.add(b.strip().lower())
@@ -4,7 +4,7 @@ import logging
 import io
 import json
 import re
-from typing import Any
+from typing import Any, Awaitable, Callable
 from PIL import Image
 from app.context import build_context
 from app.db import get_db
@@ -44,6 +44,8 @@ from app.tool_call_parser import (
     _extract_textual_tool_calls, _has_tool_call_markup, _strip_tool_call_markup,
     _strip_bracket_tool_protocol,
 )
+from app.tool_registry import ToolCall, ToolHandler, ToolRegistry, action_label, lazy_parser
+from app.tool_scheduler import ReadOnlyToolBatch, is_read_only_tool_call, parse_tool_call
 
 # Extracted handler modules
 from app.handler_vision import (
@@ -282,10 +284,12 @@ async def handle_message(
         stream_event_callback = None
     stream_events_enabled = bool(stream_event_callback) and (channel or "").strip().lower() == "web"
     live_stream_machine: AssistantStreamStateMachine | None = None
+    # One query (or a cache hit) for everything the pre-LLM path reads per turn.
+    user_settings = await db.get_user_settings_snapshot(user_id)
     if mood is None:
-        mood = await db.get_user_mood(user_id)
+        mood = user_settings.mood
     extra["mood"] = mood
-    thinking_level = await db.get_user_thinking_level(user_id)
+    thinking_level = user_settings.thinking_level
     thinking_override = (
         extra.get("subagent_thinking_override")
         or extra.get("agent_thinking_override")
@@ -294,15 +298,15 @@ async def handle_message(
     if thinking_override in _THINK_LEVELS:
         thinking_level = thinking_override
     extra["thinking_level"] = thinking_level
-    reasoning_mode = await db.get_user_reasoning_mode(user_id)
+    reasoning_mode = user_settings.reasoning_mode
     extra["reasoning_mode"] = reasoning_mode
     reasoning_mode_norm = (reasoning_mode or "").strip().lower()
-    final_mode = await db.get_user_final_mode(user_id)
+    final_mode = user_settings.final_mode
     if final_mode not in _FINAL_MODES:
         final_mode = "off"
     extra["final_mode"] = final_mode
     if provider_name == "default":
-        provider_name = await db.get_user_default_ai(user_id)
+        provider_name = user_settings.default_ai
     strict_final_mode_requested = final_mode == "strict"
     strict_final_mode_enabled = (
         strict_final_mode_requested
@@ -325,7 +329,7 @@ async def handle_message(
         or extra.get("agent_model_override")
         or ""
     ).strip()
-    directive_model = model_override or await db.get_user_provider_model(user_id, provider_name)
+    directive_model = model_override or user_settings.provider_model(provider_name)
     think_options = _format_thinking_options(provider_name, directive_model)
 
     directive_text = text
@@ -359,7 +363,8 @@ async def handle_message(
             await db.add_message(cid, "assistant", reply, "script")
             return reply
         await db.set_user_thinking_level(user_id, think_level)
-        thinking_level = await db.get_user_thinking_level(user_id)
+        user_settings = await db.get_user_settings_snapshot(user_id)
+        thinking_level = user_settings.thinking_level
         extra["thinking_level"] = thinking_level
 
     if reasoning_matched:
@@ -378,7 +383,8 @@ async def handle_message(
             await db.add_message(cid, "assistant", reply, "script")
             return reply
         await db.set_user_reasoning_mode(user_id, reasoning_level)
-        reasoning_mode = await db.get_user_reasoning_mode(user_id)
+        user_settings = await db.get_user_settings_snapshot(user_id)
+        reasoning_mode = user_settings.reasoning_mode
         extra["reasoning_mode"] = reasoning_mode
         reasoning_mode_norm = (reasoning_mode or "").strip().lower()
 
@@ -467,7 +473,7 @@ async def handle_message(
     from app.skills.registry import get_all_skills as _get_all_skills
     enabled = set()
     for skill in _get_all_skills():
-        if await db.get_skill_enabled(user_id, skill.name):
+        if user_settings.skill_enabled(skill.name):
             enabled.add(skill.name)
     agent_skill_filter = _selected_agent_skill_filter(extra)
     if agent_skill_filter is not None:
@@ -572,39 +578,40 @@ async def handle_message(
     # Execute skills to gather data (populate `extra`)
     from app.skills.registry import get_skill_by_name, get_all_skills
 
-    # Sort skills: RAG before Google Search (Search sees RAG content); then registry order for stability
-    priority_order = ["rag", "google_search"]
+    # Registry order for stability; skills that read another skill's results (google_search reads
+    # rag's) declare it via Skill.depends_on and execute_skills runs them after it.
     skill_names = list(get_all_skills())
     name_to_idx = {s.name: i for i, s in enumerate(skill_names)}
-
-    def _skill_sort_key(name: str) -> tuple[int, int]:
-        prio = priority_order.index(name) if name in priority_order else 999
-        idx = name_to_idx.get(name, 999)
-        return (prio, idx)
-
-    sorted_skills = sorted(skills_to_use, key=_skill_sort_key)
+    sorted_skills = sorted(skills_to_use, key=lambda name: name_to_idx.get(name, 999))
     logger.info("Executing skills: %s (Original: %s)", sorted_skills, skills_to_use)
 
     # OpenClaw-style: Apple Notes (and other exec) work only via the exec tool. Model calls exec(command);
     # we run it and return the result — no proactive run or context injection.
 
-    for skill_name in sorted_skills:
-        skill = get_skill_by_name(skill_name)
-        if skill:
-            try:
-                logger.info("Skill %s executing...", skill_name)
-                skill_result = await skill.execute(user_id, text, extra)
-                if skill_result:
-                    logger.info("Skill %s returned data: %s", skill_name, list(skill_result.keys()))
-                    extra.update(skill_result)
-                else:
-                    logger.debug("Skill %s returned None", skill_name)
-            except Exception as e:
-                logger.error("Skill %s execution failed: %s", skill_name, e, exc_info=True)
+    from app.config import get_settings
+    from app.skills.execution import execute_skills
+
+    await execute_skills(
+        [skill for skill in map(get_skill_by_name, sorted_skills) if skill],
+        user_id,
+        text,
+        extra,
+        timeout_s=get_settings().asta_skill_timeout_s,
+    )
 
     # 4. Build Context (Prompt Engineering)
     # Built-in skills are intent-routed; workspace skills are selected by the model via <available_skills> + read tool.
-    context = await build_context(db, user_id, cid, extra=extra, skills_in_use=skills_to_use, user_role=user_role)
+    context = await build_context(
+        db,
+        user_id,
+        cid,
+        extra=extra,
+        skills_in_use=skills_to_use,
+        user_role=user_role,
+        skill_toggles=user_settings.skill_toggles,
+        model=directive_model,
+        provider_name=provider_name,
+    )
     context = _append_selected_agent_context(context, extra)
 
     # Silly GIF skill: Proactive instruction (not intent-based)
@@ -774,7 +781,7 @@ async def handle_message(
         # Image wasn't preprocessed and provider doesn't support native vision — block
         await db.add_message(cid, "assistant", _VISION_PREPROCESSOR_UNAVAILABLE_MESSAGE, "script")
         return _VISION_PREPROCESSOR_UNAVAILABLE_MESSAGE
-    user_model = await db.get_user_provider_model(user_id, provider.name)
+    user_model = user_settings.provider_model(provider.name)
     model_override = (
         extra.get("subagent_model_override")
         or extra.get("agent_model_override")
@@ -793,8 +800,6 @@ async def handle_message(
     # Exec tool (Claw-style): expose based on exec security policy. Admin-only.
     from app.exec_tool import (
         get_effective_exec_bins,
-        get_bash_tool_openai_def,
-        get_exec_tool_openai_def,
         prepare_allowlisted_command,
         run_allowlisted_command,
         parse_exec_arguments,
@@ -802,142 +807,70 @@ async def handle_message(
         OUTPUT_EVENT_TAIL_CHARS,
     )
     from app.config import get_settings
-    tools: list = []
     offer_exec = False
+    effective_bins: set[str] = set()
+    exec_mode = ""
     if _is_admin:
-        effective_bins = await get_effective_exec_bins(db, user_id)
+        effective_bins = await get_effective_exec_bins(db, user_id, skill_toggles=user_settings.skill_toggles)
         exec_mode = get_settings().exec_security
         offer_exec = exec_mode != "deny" and (exec_mode == "full" or bool(effective_bins))
         if offer_exec:
-            tools = list(get_exec_tool_openai_def(effective_bins, security_mode=exec_mode))
-            tools = tools + get_bash_tool_openai_def(effective_bins, security_mode=exec_mode)
             logger.info("Exec allowlist: %s; passing tools to provider=%s", sorted(effective_bins), provider.name)
-            # Process tool companion for long-running exec sessions
-            from app.process_tool import get_process_tool_openai_def
-            tools = tools + get_process_tool_openai_def()
         elif "notes" in text.lower() or "memo" in text.lower():
             logger.warning("User asked for notes/memo but exec allowlist is empty (enable Apple Notes skill or set ASTA_EXEC_ALLOWED_BINS)")
 
-    # Coding compatibility tools: admin-only (read/write/edit with alias normalization).
     from app.workspace import discover_workspace_skills
     workspace_skill_names = {s.name for s in discover_workspace_skills()}
     has_enabled_workspace_skills = any(name in enabled for name in workspace_skill_names)
-    if _is_admin:
-        offer_coding_compat = has_enabled_workspace_skills or ("files" in enabled)
-        if offer_coding_compat:
-            from app.coding_compat_tool import get_coding_compat_tools_openai_def
-            from app.apply_patch_compat_tool import get_apply_patch_compat_tool_openai_def
-            tools = tools + get_coding_compat_tools_openai_def()
-            tools = tools + get_apply_patch_compat_tool_openai_def()
-
-    # Web/memory tools: allowed for ALL users (web search, etc.)
-    if has_enabled_workspace_skills or extra.get("force_web"):
-        from app.openclaw_compat_tools import get_openclaw_web_memory_tools_openai_def
-        from app.message_compat_tool import get_message_compat_tool_openai_def
-        tools = tools + get_openclaw_web_memory_tools_openai_def()
-        tools = tools + get_message_compat_tool_openai_def()
-
-    # Files tool: admin-only
-    if _is_admin and "files" in enabled:
-        from app.files_tool import get_files_tools_openai_def
-        tools = tools + get_files_tools_openai_def()
-    # Reminders tool: admin-only
-    if _is_admin and "reminders" in enabled:
-        from app.reminders_tool import get_reminders_tool_openai_def
-        tools = tools + get_reminders_tool_openai_def()
-    # Cron tool: admin-only
-    if _is_admin:
-        from app.cron_tool import get_cron_tool_openai_def
-        tools = tools + get_cron_tool_openai_def()
-    # Spotify tool: admin-only
-    if _is_admin and "spotify" in enabled:
-        from app.spotify_tool import get_spotify_tools_openai_def
-        tools = tools + get_spotify_tools_openai_def()
-    # Image generation tool — allowed for ALL users
     from app.keys import get_api_key as _get_api_key_img
     _gemini_key = await _get_api_key_img("gemini_api_key") or await _get_api_key_img("google_ai_key")
     _hf_key = await _get_api_key_img("huggingface_api_key")
-    if _gemini_key or _hf_key:
-        from app.image_gen_tool import get_image_gen_tool_openai_def
-        tools = tools + get_image_gen_tool_openai_def()
-    # PDF generation tool — allowed for ALL users
-    from app.pdf_tool import get_pdf_tool_openai_def, is_fitz_available
-    if is_fitz_available():
-        tools = tools + get_pdf_tool_openai_def()
-    # Office document generation (pptx/docx/xlsx) — allowed for ALL users
-    from app.office_tool import (
-        get_pptx_tool_openai_def, get_docx_tool_openai_def, get_xlsx_tool_openai_def,
-        is_pptx_available, is_docx_available, is_xlsx_available,
-    )
-    if is_pptx_available():
-        tools = tools + get_pptx_tool_openai_def()
-    if is_docx_available():
-        tools = tools + get_docx_tool_openai_def()
-    if is_xlsx_available():
-        tools = tools + get_xlsx_tool_openai_def()
-    # Subagent orchestration: admin-only
-    if _is_admin and channel != "subagent":
-        from app.subagent_orchestrator import get_subagent_tools_openai_def
-        tools = tools + get_subagent_tools_openai_def()
     # Project update tool: only when this conversation belongs to a project folder
     _conv_folder_id = await db.get_conversation_folder_id(cid)
-    if _conv_folder_id:
-        tools = (tools or []) + [
-            {
-                "type": "function",
-                "function": {
-                    "name": "project_update",
-                    "description": (
-                        "Update the current project's context notes (project.md). "
-                        "Call this when you learn important information about the project — goals, decisions, preferences, "
-                        "key findings, or status changes. Keep entries concise. "
-                        "Do NOT call this for every message — only when genuinely important context should be persisted "
-                        "for future conversations in this project."
-                    ),
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "action": {
-                                "type": "string",
-                                "enum": ["append", "replace_section", "read"],
-                                "description": "append: add a new entry. replace_section: replace a named section. read: read current project.md",
-                            },
-                            "section": {
-                                "type": "string",
-                                "description": "Section name (e.g., 'Summary', 'Decisions', 'Status', 'Open Questions'). Required for replace_section.",
-                            },
-                            "content": {
-                                "type": "string",
-                                "description": "Content to write. For append: a concise bullet point or paragraph. For replace_section: the full new section content.",
-                            },
-                        },
-                        "required": ["action"],
-                    },
-                },
-            }
-        ]
     # MCP tools: add tool definitions from connected MCP servers
+    mcp_tool_defs: list[dict] = []
+    mcp_generation = -1
     try:
         from app import mcp_client
         await mcp_client.ensure_initialized(db)
+        mcp_generation = mcp_client.get_tool_generation()
         mcp_tool_defs = mcp_client.get_tool_definitions()
         if mcp_tool_defs:
-            tools = tools + mcp_tool_defs
             logger.info("MCP tools added: %s", [d["function"]["name"] for d in mcp_tool_defs])
     except Exception as e:
         logger.warning("MCP initialization skipped: %s", e)
 
-    tools = tools if tools else None
+    # Tool definitions are memoized per bundle key (role, exec mode/bins, skills, MCP generation, ...).
+    from app.tool_bundle import ToolBundleKey, get_tool_bundle
+
+    tool_bundle = get_tool_bundle(
+        ToolBundleKey(
+            is_admin=_is_admin,
+            exec_mode=exec_mode if offer_exec else None,
+            exec_bins=tuple(sorted(effective_bins)) if offer_exec else (),
+            enabled_skills=tuple(sorted(enabled)),
+            workspace_skills_enabled=has_enabled_workspace_skills,
+            force_web=bool(extra.get("force_web")),
+            image_gen=bool(_gemini_key or _hf_key),
+            subagents=channel != "subagent",
+            project_update=bool(_conv_folder_id),
+            mcp_generation=mcp_generation,
+        ),
+        mcp_tool_defs,
+    )
+    tools = tool_bundle.tools if tool_bundle.tools else None
 
     from app.providers.fallback import (
         chat_with_fallback,
         chat_with_fallback_stream,
         get_available_fallback_providers,
     )
-    fallback_names = await get_available_fallback_providers(db, user_id, exclude_provider=provider.name)
+    fallback_names = await get_available_fallback_providers(
+        db, user_id, exclude_provider=provider.name, flow_mode=user_settings.provider_flow_mode
+    )
     fallback_models = {}
     for fb_name in fallback_names:
-        fb_model = await db.get_user_provider_model(user_id, fb_name)
+        fb_model = user_settings.provider_model(fb_name)
         if fb_model:
             fallback_models[fb_name] = fb_model
 
@@ -954,7 +887,7 @@ async def handle_message(
     )
     if tools:
         chat_kwargs["tools"] = tools
-    allowed_tool_names = _tool_names_from_defs(tools)
+    allowed_tool_names = set(tool_bundle.names)
 
     # Stream reasoning when explicitly set to "stream" mode, or when Claude's native
     # thinking is active (thinkingLevel != "off") — Claude users should always see
@@ -1143,6 +1076,494 @@ async def handle_message(
         last_tool_error_mutating = False
         last_tool_error_fingerprint = ""
 
+    def _read_only_tool_factory(tool_name: str, raw_args: Any) -> Callable[[], Awaitable[str]]:
+        """Call for a read-only tool; shared by the early start and the in-order dispatch below."""
+        if tool_name == "list_directory":
+            from app.files_tool import list_directory as list_dir, parse_files_tool_args as parse_files_args
+
+            path = (parse_files_args(raw_args).get("path") or "").strip()
+            return lambda: list_dir(path, user_id, db)
+        if tool_name == "read_file":
+            from app.files_tool import read_file_content as read_file_fn, parse_files_tool_args as parse_files_args
+
+            params = parse_files_args(raw_args)
+            path = (params.get("path") or "").strip()
+            offset = int(params["offset"]) if isinstance(params.get("offset"), int) and params["offset"] > 0 else 0
+            return lambda: read_file_fn(path, user_id, db, offset=offset, model=user_model, provider=provider_name)
+        if tool_name == "read":
+            from app.coding_compat_tool import parse_coding_compat_args, run_read_compat
+
+            params = parse_coding_compat_args(raw_args)
+            return lambda: run_read_compat(params, user_id, db, model=user_model, provider=provider_name)
+
+        from app.openclaw_compat_tools import (
+            parse_openclaw_compat_args,
+            run_memory_get_compat,
+            run_memory_search_compat,
+            run_web_fetch_compat,
+            run_web_search_compat,
+        )
+
+        params = parse_openclaw_compat_args(raw_args)
+        if tool_name == "web_search":
+            return lambda: run_web_search_compat(params)
+        if tool_name == "web_fetch":
+            # Inject model/provider so web_fetch can compute adaptive page cap.
+            params["_model"] = user_model
+            params["_provider"] = provider_name
+            return lambda: run_web_fetch_compat(params)
+        if tool_name == "memory_search":
+            return lambda: run_memory_search_compat(params, user_id=user_id)
+        if tool_name == "memory_get":
+            return lambda: run_memory_get_compat(params, model=user_model, provider=provider_name)
+        raise ValueError(f"Not a read-only tool: {tool_name}")
+
+    def _start_read_only_tool_calls(
+        batch: ReadOnlyToolBatch, tool_calls: list[dict[str, Any]], first: int = 0
+    ) -> int:
+        """Start the read-only calls from ``first`` up to the next call that may mutate state.
+
+        Returns that call's index (``len(tool_calls)`` if there is none): later reads must not
+        run before it, so the loop starts the next segment once it has executed that call.
+        """
+        from app.config import get_settings
+
+        barrier = len(tool_calls)
+        candidates: list[tuple[int, str, Any]] = []
+        for index in range(first, len(tool_calls)):
+            call_name, call_args, call_data = parse_tool_call(tool_calls[index])
+            call_name = (call_name or "").strip().lower()
+            if call_name not in allowed_tool_names:
+                continue  # rejected in the loop below; never runs
+            if not is_read_only_tool_call(call_name, call_data):
+                barrier = index
+                break
+            if db is None and call_name in ("list_directory", "read_file"):
+                continue
+            if loop_detector:
+                loop_check = loop_detector.detect_loop(call_name, call_data)
+                if loop_check.stuck and loop_check.level == "critical":
+                    continue  # blocked in the loop below; never start it
+            candidates.append((index, call_name, call_args))
+        if len(candidates) < 2 or get_settings().asta_tool_concurrency <= 1:
+            return barrier
+        for index, call_name, call_args in candidates:
+            batch.start(index, _read_only_tool_factory(call_name, call_args))
+        logger.info("Started %d read-only tool calls concurrently", len(candidates))
+        return barrier
+
+    # Tool dispatch table: one handler per tool name (see app.tool_registry). Handlers are
+    # closures so they can update this turn's tool-state flags (ran_exec_tool, ...).
+    async def _tool_exec(call: ToolCall, params: dict[str, Any]) -> str:
+        nonlocal ran_exec_tool, exec_tool_call_count
+        nonlocal last_exec_command, last_exec_stdout, last_exec_stderr, last_exec_error
+        cmd = (params.get("command") or "").strip()
+        timeout_sec = params.get("timeout_sec")
+        yield_ms = params.get("yield_ms")
+        background = bool(params.get("background"))
+        pty = bool(params.get("pty"))
+        workdir = params.get("workdir") if isinstance(params.get("workdir"), str) else None
+        logger.info("Exec tool called: command=%r", cmd)
+        precheck_argv, precheck_err = prepare_allowlisted_command(
+            cmd,
+            allowed_bins=effective_bins,
+        )
+        if (
+            precheck_err
+            and exec_mode == "allowlist"
+            and "not in allowlist" in precheck_err.lower()
+        ):
+            from app.exec_approvals import create_pending_exec_approval
+
+            approval_id, requested_bin = await create_pending_exec_approval(
+                db=db,
+                user_id=user_id,
+                channel=channel,
+                channel_target=channel_target,
+                command=cmd,
+                timeout_sec=timeout_sec if isinstance(timeout_sec, int) else None,
+                workdir=workdir,
+                background=background,
+                pty=pty,
+            )
+            ran_exec_tool = True
+            last_exec_command = cmd
+            last_exec_stdout = ""
+            last_exec_stderr = ""
+            last_exec_error = (
+                "Approval is blocking this action. In Telegram: open /approvals and tap Once, Always, or Deny."
+            )
+            return (
+                f"approval-needed: id={approval_id} binary={requested_bin or 'unknown'} command={cmd}\n"
+                "Approval is blocking this action. In Telegram: open /approvals and tap Once, Always, or Deny."
+            )
+        if precheck_err and exec_mode != "allowlist":
+            ran_exec_tool = True
+            last_exec_command = cmd
+            last_exec_stdout = ""
+            last_exec_stderr = ""
+            last_exec_error = precheck_err
+            return f"error: {precheck_err}"
+        # precheck_argv is intentionally not reused; runtime functions re-validate for safety.
+        _ = precheck_argv
+        if background or isinstance(yield_ms, int) or pty:
+            from app.process_tool import run_exec_with_process_support
+
+            exec_result = await run_exec_with_process_support(
+                cmd,
+                allowed_bins=effective_bins,
+                timeout_seconds=timeout_sec if isinstance(timeout_sec, int) else None,
+                workdir=workdir,
+                background=background,
+                yield_ms=yield_ms if isinstance(yield_ms, int) else None,
+                pty=pty,
+            )
+            status = (exec_result.get("status") or "").strip().lower()
+            if status == "running":
+                ok = True
+                stdout = json.dumps(exec_result, indent=0)
+                stderr = ""
+            elif status in ("completed", "failed"):
+                stdout = (exec_result.get("stdout") or "").strip()
+                stderr = (exec_result.get("stderr") or "").strip()
+                ok = bool(exec_result.get("ok")) if "ok" in exec_result else (status == "completed")
+            else:
+                stdout = ""
+                stderr = (exec_result.get("error") or "Exec failed").strip()
+                ok = False
+        else:
+            stdout, stderr, ok = await run_allowlisted_command(
+                cmd,
+                allowed_bins=effective_bins,
+                timeout_seconds=timeout_sec if isinstance(timeout_sec, int) else None,
+                workdir=workdir,
+            )
+        ran_exec_tool = True
+        exec_tool_call_count += 1
+        last_exec_command = cmd
+        last_exec_stdout = stdout
+        last_exec_stderr = stderr
+        if not ok:
+            last_exec_error = (stderr or stdout or "").strip() or "Command not allowed or failed."
+        else:
+            last_exec_error = ""
+        logger.info("Exec result: ok=%s stdout_len=%s stderr_len=%s", ok, len(stdout), len(stderr))
+        if ok or stdout or stderr:
+            return f"stdout:\n{stdout}\n" + (f"stderr:\n{stderr}\n" if stderr else "")
+        return f"error: {stderr or 'Command not allowed or failed.'}"
+
+    async def _tool_process(call: ToolCall, params: dict[str, Any]) -> str:
+        from app.process_tool import run_process_tool
+
+        out = await run_process_tool(params)
+        _record_tool_outcome(
+            tool_name="process",
+            tool_output=out,
+            tool_args=params,
+            action=str(params.get("action") or ""),
+        )
+        return out
+
+    async def _tool_read_only(call: ToolCall, params: dict[str, Any]) -> str:
+        nonlocal ran_files_tool
+        out = await read_batch.run(call.index, _read_only_tool_factory(call.name, call.raw_args))
+        if call.name in ("list_directory", "read_file", "read"):
+            ran_files_tool = True
+        if call.name == "memory_get":
+            _record_tool_outcome(tool_name="memory_get", tool_output=out, tool_args=params)
+        return out
+
+    async def _tool_write_file(call: ToolCall, params: dict[str, Any]) -> str:
+        nonlocal ran_files_tool
+        from app.files_tool import write_file as write_file_fn
+
+        path = (params.get("path") or "").strip()
+        if _is_note_capture_request(text):
+            path = _canonicalize_note_write_path(path)
+            params["path"] = path
+        content = params.get("content")
+        out = await write_file_fn(path, content if isinstance(content, str) else "", user_id, db)
+        ran_files_tool = True
+        return out
+
+    async def _tool_allow_path(call: ToolCall, params: dict[str, Any]) -> str:
+        nonlocal ran_files_tool
+        from app.files_tool import allow_path as allow_path_fn
+
+        out = await allow_path_fn((params.get("path") or "").strip(), user_id, db)
+        ran_files_tool = True
+        return out
+
+    async def _tool_delete_file(call: ToolCall, params: dict[str, Any]) -> str:
+        nonlocal ran_files_tool
+        from app.files_tool import delete_file as delete_file_fn
+
+        path = (params.get("path") or "").strip()
+        permanently = bool(params.get("permanently")) if isinstance(params, dict) else False
+        out = await delete_file_fn(path, user_id, db, permanently=permanently)
+        ran_files_tool = True
+        return out
+
+    async def _tool_delete_matching_files(call: ToolCall, params: dict[str, Any]) -> str:
+        nonlocal ran_files_tool
+        from app.files_tool import delete_matching_files as delete_matching_files_fn
+
+        directory = (params.get("directory") or "").strip()
+        glob_pattern = (params.get("glob_pattern") or "").strip()
+        permanently = bool(params.get("permanently")) if isinstance(params, dict) else False
+        out = await delete_matching_files_fn(
+            directory,
+            glob_pattern,
+            user_id,
+            db,
+            permanently=permanently,
+        )
+        ran_files_tool = True
+        return out
+
+    async def _tool_coding_write(call: ToolCall, params: dict[str, Any]) -> str:
+        nonlocal ran_files_tool
+        from app.coding_compat_tool import run_edit_compat, run_write_compat
+
+        if call.name == "write":
+            if _is_note_capture_request(text):
+                note_path = _canonicalize_note_write_path(str(params.get("path") or ""))
+                params["path"] = note_path
+            out = await run_write_compat(params, user_id, db)
+        else:
+            out = await run_edit_compat(params, user_id, db)
+        ran_files_tool = True
+        return out
+
+    async def _tool_generate_pdf(call: ToolCall, params: dict[str, Any]) -> str:
+        from app.pdf_tool import generate_pdf as generate_pdf_fn
+
+        pdf_content = (params.get("content") or "").strip()
+        pdf_filename = (params.get("filename") or "document.pdf").strip()
+        pdf_title = params.get("title")
+        if not pdf_content:
+            return "Error: content is required"
+        pdf_path = generate_pdf_fn(pdf_content, filename=pdf_filename, title=pdf_title)
+        import os as _os
+        pdf_safe = _os.path.basename(pdf_path)
+        return f"PDF generated successfully. Download: /api/files/download-pdf/{pdf_safe}"
+
+    async def _tool_generate_pptx(call: ToolCall, params: dict[str, Any]) -> str:
+        from app.office_tool import generate_pptx as _gen_pptx
+
+        slides = params.get("slides")
+        if not slides or not isinstance(slides, list):
+            return "Error: slides array is required"
+        pptx_filename = (params.get("filename") or "presentation.pptx").strip()
+        pptx_theme = (params.get("theme") or "dark").strip()
+        pptx_path = _gen_pptx(slides, filename=pptx_filename, theme=pptx_theme)
+        import os as _os
+        pptx_safe = _os.path.basename(pptx_path)
+        return f"Presentation generated successfully. Download: /api/files/download-office/{pptx_safe}"
+
+    async def _tool_generate_docx(call: ToolCall, params: dict[str, Any]) -> str:
+        from app.office_tool import generate_docx as _gen_docx
+
+        docx_content = (params.get("content") or "").strip()
+        if not docx_content:
+            return "Error: content is required"
+        docx_filename = (params.get("filename") or "document.docx").strip()
+        docx_title = params.get("title")
+        docx_path = _gen_docx(docx_content, filename=docx_filename, title=docx_title)
+        import os as _os
+        docx_safe = _os.path.basename(docx_path)
+        return f"Document generated successfully. Download: /api/files/download-office/{docx_safe}"
+
+    async def _tool_generate_xlsx(call: ToolCall, params: dict[str, Any]) -> str:
+        from app.office_tool import generate_xlsx as _gen_xlsx
+
+        xlsx_sheets = params.get("sheets")
+        if not xlsx_sheets or not isinstance(xlsx_sheets, list):
+            return "Error: sheets array is required"
+        xlsx_filename = (params.get("filename") or "spreadsheet.xlsx").strip()
+        xlsx_title = params.get("title")
+        xlsx_path = _gen_xlsx(xlsx_sheets, filename=xlsx_filename, title=xlsx_title)
+        import os as _os
+        xlsx_safe = _os.path.basename(xlsx_path)
+        return f"Spreadsheet generated successfully. Download: /api/files/download-office/{xlsx_safe}"
+
+    async def _tool_apply_patch(call: ToolCall, params: dict[str, Any]) -> str:
+        nonlocal ran_files_tool
+        from app.apply_patch_compat_tool import run_apply_patch_compat
+
+        out = await run_apply_patch_compat(params)
+        ran_files_tool = True
+        return out
+
+    async def _tool_message(call: ToolCall, params: dict[str, Any]) -> str:
+        from app.message_compat_tool import run_message_compat
+
+        return await run_message_compat(
+            params,
+            current_channel=channel,
+            current_target=channel_target,
+        )
+
+    async def _tool_reminders(call: ToolCall, params: dict[str, Any]) -> str:
+        nonlocal ran_reminders_tool, reminder_tool_scheduled
+        from app.reminders_tool import run_reminders_tool
+
+        out = await run_reminders_tool(
+            params,
+            user_id=user_id,
+            channel=channel,
+            channel_target=channel_target,
+            db=db,
+        )
+        ran_reminders_tool = True
+        if (params.get("action") or "").strip().lower() == "add":
+            try:
+                parsed = json.loads(out)
+                if isinstance(parsed, dict) and parsed.get("ok") is True:
+                    reminder_tool_scheduled = True
+                    extra["reminder_scheduled"] = True
+                    extra["reminder_at"] = (
+                        parsed.get("display_time")
+                        or parsed.get("run_at")
+                        or ""
+                    )
+            except Exception:
+                pass
+        _record_tool_outcome(
+            tool_name="reminders",
+            tool_output=out,
+            tool_args=params,
+            action=str(params.get("action") or ""),
+        )
+        return out
+
+    async def _tool_cron(call: ToolCall, params: dict[str, Any]) -> str:
+        nonlocal ran_cron_tool
+        from app.cron_tool import run_cron_tool
+
+        out = await run_cron_tool(
+            params,
+            user_id=user_id,
+            channel=channel,
+            channel_target=channel_target,
+            db=db,
+        )
+        ran_cron_tool = True
+        _record_tool_outcome(
+            tool_name="cron",
+            tool_output=out,
+            tool_args=params,
+            action=str(params.get("action") or ""),
+        )
+        return out
+
+    async def _tool_subagents(call: ToolCall, params: dict[str, Any]) -> str:
+        from app.subagent_orchestrator import run_subagent_tool
+
+        return await run_subagent_tool(
+            tool_name=call.name,
+            params=params,
+            user_id=user_id,
+            parent_conversation_id=cid,
+            provider_name=provider_name,
+            channel=channel,
+            channel_target=channel_target,
+        )
+
+    async def _tool_spotify(call: ToolCall, params: dict[str, Any]) -> str:
+        from app.spotify_tool import run_spotify_tool
+
+        return await run_spotify_tool(params, user_id=user_id)
+
+    async def _tool_image_gen(call: ToolCall, params: dict[str, Any]) -> str:
+        nonlocal ran_image_gen_tool
+        from app.image_gen_tool import run_image_gen
+
+        prompt = (params.get("prompt") or "").strip() if isinstance(params, dict) else ""
+        out = await run_image_gen(user_id=user_id, prompt=prompt)
+        ran_image_gen_tool = True
+        return out
+
+    async def _tool_project_update(call: ToolCall, params: dict[str, Any]) -> str:
+        return await _run_project_update_tool(params, cid, db)
+
+    async def _tool_mcp(call: ToolCall, params: dict[str, Any]) -> str:
+        from app import mcp_client
+
+        if mcp_client.is_mcp_tool(call.name):
+            return await mcp_client.call_tool(call.name, params)
+        return f"Error: MCP tool '{call.name}' not found"
+
+    def _mcp_label(call: ToolCall, params: dict[str, Any]) -> str | None:
+        from app import mcp_client
+
+        return _build_tool_trace_label(call.name) if mcp_client.is_mcp_tool(call.name) else None
+
+    _files_args = lazy_parser("app.files_tool", "parse_files_tool_args")
+    _coding_args = lazy_parser("app.coding_compat_tool", "parse_coding_compat_args")
+    _compat_args = lazy_parser("app.openclaw_compat_tools", "parse_openclaw_compat_args")
+    tool_registry = ToolRegistry()
+    for tool_handler in (
+        ToolHandler(("exec", "bash"), _tool_exec, parse=parse_exec_arguments),
+        ToolHandler(
+            ("process",), _tool_process,
+            parse=lazy_parser("app.process_tool", "parse_process_tool_args"),
+            summarize=action_label, track_outcome=False,
+        ),
+        ToolHandler(("list_directory", "read_file"), _tool_read_only, parse=_files_args),
+        ToolHandler(("write_file",), _tool_write_file, parse=_files_args),
+        ToolHandler(("allow_path",), _tool_allow_path, parse=_files_args),
+        ToolHandler(("delete_file",), _tool_delete_file, parse=_files_args),
+        ToolHandler(("delete_matching_files",), _tool_delete_matching_files, parse=_files_args),
+        ToolHandler(("read",), _tool_read_only, parse=_coding_args),
+        ToolHandler(("write", "edit"), _tool_coding_write, parse=_coding_args),
+        ToolHandler(("generate_pdf",), _tool_generate_pdf, parse=lazy_parser("app.pdf_tool", "parse_pdf_tool_args")),
+        ToolHandler(
+            ("generate_pptx",), _tool_generate_pptx, parse=lazy_parser("app.office_tool", "parse_pptx_tool_args")
+        ),
+        ToolHandler(
+            ("generate_docx",), _tool_generate_docx, parse=lazy_parser("app.office_tool", "parse_docx_tool_args")
+        ),
+        ToolHandler(
+            ("generate_xlsx",), _tool_generate_xlsx, parse=lazy_parser("app.office_tool", "parse_xlsx_tool_args")
+        ),
+        ToolHandler(("web_search", "web_fetch", "memory_search"), _tool_read_only, parse=_compat_args),
+        ToolHandler(("memory_get",), _tool_read_only, parse=_compat_args, track_outcome=False),
+        ToolHandler(
+            ("apply_patch",), _tool_apply_patch,
+            parse=lazy_parser("app.apply_patch_compat_tool", "parse_apply_patch_compat_args"),
+        ),
+        ToolHandler(
+            ("message",), _tool_message,
+            parse=lazy_parser("app.message_compat_tool", "parse_message_compat_args"),
+            summarize=lambda call, params: _build_tool_trace_label("message", str(params.get("action") or "send")),
+        ),
+        ToolHandler(
+            ("reminders",), _tool_reminders,
+            parse=lazy_parser("app.reminders_tool", "parse_reminders_tool_args"),
+            summarize=action_label, track_outcome=False,
+        ),
+        ToolHandler(
+            ("cron",), _tool_cron,
+            parse=lazy_parser("app.cron_tool", "parse_cron_tool_args"),
+            summarize=action_label, track_outcome=False,
+        ),
+        ToolHandler(
+            ("agents_list", "sessions_spawn", "sessions_list", "sessions_history", "sessions_send", "sessions_stop"),
+            _tool_subagents,
+            parse=lazy_parser("app.subagent_orchestrator", "parse_subagent_tool_args"),
+            track_outcome=False,
+        ),
+        ToolHandler(
+            ("spotify",), _tool_spotify,
+            parse=lazy_parser("app.spotify_tool", "parse_spotify_tool_args"), summarize=action_label,
+        ),
+        ToolHandler(("image_gen",), _tool_image_gen),
+        ToolHandler(("project_update",), _tool_project_update, summarize=action_label),
+    ):
+        tool_registry.register(tool_handler)
+    tool_registry.register(ToolHandler((), _tool_mcp, summarize=_mcp_label), prefix="mcp_")
+
     for _round in range(MAX_TOOL_ROUNDS):
         if tools and not response.tool_calls:
             parsed_calls, cleaned = _extract_textual_tool_calls(response.content or "", allowed_tool_names)
@@ -1156,6 +1577,11 @@ async def handle_message(
                 )
         if not response.tool_calls or not provider_used:
             break
+        # Model that reads this round's tool results (the provider may have fallen back).
+        if provider_used.name == provider.name:
+            tool_loop_model = user_model or None
+        else:
+            tool_loop_model = fallback_models.get(provider_used.name)
         # Append assistant message (with content + tool_calls) and run each exec call
         # Strip any textual tool-call markup (e.g. <tool_call> XML from Trinity/Qwen models)
         # from the content before storing it in the conversation history. If the model
@@ -1172,560 +1598,157 @@ async def handle_message(
         # Track seen IDs to prevent duplicates
         seen_ids = set()
 
-        for tc in asst_tool_calls:
-            fn = (tc.get("function") or {}) if isinstance(tc.get("function"), dict) else {}
-            name = fn.get("name") or tc.get("function", {}).get("name")
-            args_str = fn.get("arguments") or "{}"
-            args_data: dict[str, Any] = {}
-            if isinstance(args_str, dict):
-                args_data = args_str
-            elif isinstance(args_str, str):
-                try:
-                    parsed_args = json.loads(args_str)
-                    if isinstance(parsed_args, dict):
-                        args_data = parsed_args
-                except Exception:
-                    args_data = {}
-
-            # SECURITY: Validate tool name against registry
-            if not name:
-                logger.warning("Tool call missing name: %s", tc)
-                out = "Error: Tool call missing name"
-                _record_tool_outcome(tool_name="tool_call", tool_output=out, tool_args=args_data)
-                # Truncate extremely large tool output to prevent context overflow/model failure
-                MAX_CHARS = 10000
-                if len(out) > MAX_CHARS:
-                    logger.info("Truncating tool output from %d to %d chars", len(out), MAX_CHARS)
-                    out = out[:MAX_CHARS] + f"\n\n[TRUNCATED: original output was {len(out)} chars]"
-                current_messages.append({"role": "tool", "tool_call_id": tc.get("id", ""), "content": out})
-                continue
-
-            # Normalize and validate tool name
-            name = name.strip().lower()
-            out = None
-            if name not in allowed_tool_names:
-                logger.warning("Tool '%s' not in allowed tools: %s", name, sorted(allowed_tool_names))
-                out = f"Error: Tool '{name}' not available (not in registry)"
-
-            # SECURITY: Validate database availability for tools that need it
-            db_required_tools = {
-                "list_directory", "read_file", "write_file", "delete_file",
-                "delete_matching_files", "allow_path", "reminders", "cron",
-                "message", "agents_list", "sessions_spawn", "sessions_list",
-                "sessions_history", "sessions_send", "sessions_stop"
-            }
-            if name in db_required_tools and db is None:
-                out = f"Error: Database not available for tool '{name}'"
-                logger.error("Tool %s requires database but db is None", name)
-
-            # Validate and normalize tool_call_id
-            tool_call_id = tc.get("id", "")
-            if not tool_call_id:
-                logger.warning("Tool call missing ID, generating fallback: %s", name)
-                tool_call_id = f"{name}_{len(current_messages)}"
-
-            # Check for duplicate IDs
-            if tool_call_id in seen_ids:
-                logger.error("Duplicate tool_call_id: %s", tool_call_id)
-                tool_call_id = f"{tool_call_id}_dup_{len(seen_ids)}"
-            seen_ids.add(tool_call_id)
-
-            # === TOOL LOOP DETECTION ===
-            # Check for loops before executing the tool
-            if loop_detector and name:
-                loop_result = loop_detector.detect_loop(name, args_data)
-                if loop_result.stuck:
-                    if loop_result.level == "critical":
-                        # Critical - block the tool execution
-                        critical_loop_detected = True
-                        critical_loop_message = loop_result.message
-                        logger.warning(f"Tool loop blocked: {name} - {loop_result.message}")
-                        out = f"Error: Tool execution blocked due to loop detection.\n\n{loop_result.message}"
-                        current_messages.append({"role": "tool", "tool_call_id": tool_call_id, "content": out})
-                        continue
-                    else:
-                        # Warning - inject warning into tool result but allow execution
-                        logger.info(f"Tool loop warning: {name} - {loop_result.message}")
-                        # Record the call anyway so we can track progress
-                        loop_detector.record_tool_call(name, args_data, tool_call_id)
-                        # Note: We'll record the outcome after execution
-                else:
-                    # No loop detected - record the call
-                    loop_detector.record_tool_call(name, args_data, tool_call_id)
-            # === END TOOL LOOP DETECTION ===
-
-            if name:
-                await _emit_tool_event(
-                    phase="start",
-                    name=name,
-                    label=_build_tool_trace_label(name),
-                    channel=channel,
-                    channel_target=channel_target,
-                    stream_event_callback=stream_event_callback,
-                )
-            if name in ("exec", "bash"):
-                params = parse_exec_arguments(args_str)
-                cmd = (params.get("command") or "").strip()
-                timeout_sec = params.get("timeout_sec")
-                yield_ms = params.get("yield_ms")
-                background = bool(params.get("background"))
-                pty = bool(params.get("pty"))
-                workdir = params.get("workdir") if isinstance(params.get("workdir"), str) else None
-                logger.info("Exec tool called: command=%r", cmd)
-                precheck_argv, precheck_err = prepare_allowlisted_command(
-                    cmd,
-                    allowed_bins=effective_bins,
-                )
-                if (
-                    precheck_err
-                    and exec_mode == "allowlist"
-                    and "not in allowlist" in precheck_err.lower()
-                ):
-                    from app.exec_approvals import create_pending_exec_approval
+        # Start independent read-only calls (web_search, read_file, ...) concurrently; results are
+        # still consumed below in call order, after loop detection has seen each call. Reads after
+        # a possibly mutating call (write_file, exec, ...) are only started once it has run.
+        read_batch = ReadOnlyToolBatch(get_settings().asta_tool_concurrency)
+        try:
+            read_barrier = _start_read_only_tool_calls(read_batch, asst_tool_calls)
+
+            for tool_index, tc in enumerate(asst_tool_calls):
+                if tool_index > read_barrier:
+                    # The call at the barrier has run; start the reads up to the next one.
+                    read_barrier = _start_read_only_tool_calls(read_batch, asst_tool_calls, tool_index)
+                name, args_str, args_data = parse_tool_call(tc)
+
+                # SECURITY: Validate tool name against registry
+                if not name:
+                    logger.warning("Tool call missing name: %s", tc)
+                    out = "Error: Tool call missing name"
+                    _record_tool_outcome(tool_name="tool_call", tool_output=out, tool_args=args_data)
+                    current_messages.append({"role": "tool", "tool_call_id": tc.get("id", ""), "content": out})
+                    continue
 
-                    approval_id, requested_bin = await create_pending_exec_approval(
-                        db=db,
-                        user_id=user_id,
-                        channel=channel,
-                        channel_target=channel_target,
-                        command=cmd,
-                        timeout_sec=timeout_sec if isinstance(timeout_sec, int) else None,
-                        workdir=workdir,
-                        background=background,
-                        pty=pty,
-                    )
-                    out = (
-                        f"approval-needed: id={approval_id} binary={requested_bin or 'unknown'} command={cmd}\n"
-                        "Approval is blocking this action. In Telegram: open /approvals and tap Once, Always, or Deny."
-                    )
-                    ran_exec_tool = True
-                    last_exec_command = cmd
-                    last_exec_stdout = ""
-                    last_exec_stderr = ""
-                    last_exec_error = (
-                        "Approval is blocking this action. In Telegram: open /approvals and tap Once, Always, or Deny."
-                    )
-                    used_tool_labels.append(_build_tool_trace_label(name))
-                elif precheck_err and exec_mode != "allowlist":
-                    ran_exec_tool = True
-                    last_exec_command = cmd
-                    last_exec_stdout = ""
-                    last_exec_stderr = ""
-                    last_exec_error = precheck_err
-                    used_tool_labels.append(_build_tool_trace_label(name))
-                    out = f"error: {precheck_err}"
-                else:
-                    # precheck_argv is intentionally not reused; runtime functions re-validate for safety.
-                    _ = precheck_argv
-                    if background or isinstance(yield_ms, int) or pty:
-                        from app.process_tool import run_exec_with_process_support
-
-                        exec_result = await run_exec_with_process_support(
-                            cmd,
-                            allowed_bins=effective_bins,
-                            timeout_seconds=timeout_sec if isinstance(timeout_sec, int) else None,
-                            workdir=workdir,
-                            background=background,
-                            yield_ms=yield_ms if isinstance(yield_ms, int) else None,
-                            pty=pty,
-                        )
-                        status = (exec_result.get("status") or "").strip().lower()
-                        if status == "running":
-                            ok = True
-                            stdout = json.dumps(exec_result, indent=0)
-                            stderr = ""
-                        elif status in ("completed", "failed"):
-                            stdout = (exec_result.get("stdout") or "").strip()
-                            stderr = (exec_result.get("stderr") or "").strip()
-                            ok = bool(exec_result.get("ok")) if "ok" in exec_result else (status == "completed")
+                # Normalize and validate tool name
+                name = name.strip().lower()
+                out = None
+                if name not in allowed_tool_names:
+                    logger.warning("Tool '%s' not in allowed tools: %s", name, sorted(allowed_tool_names))
+                    out = f"Error: Tool '{name}' not available (not in registry)"
+
+                # SECURITY: Validate database availability for tools that need it
+                db_required_tools = {
+                    "list_directory", "read_file", "write_file", "delete_file",
+                    "delete_matching_files", "allow_path", "reminders", "cron",
+                    "message", "agents_list", "sessions_spawn", "sessions_list",
+                    "sessions_history", "sessions_send", "sessions_stop"
+                }
+                if name in db_required_tools and db is None:
+                    out = f"Error: Database not available for tool '{name}'"
+                    logger.error("Tool %s requires database but db is None", name)
+
+                # Validate and normalize tool_call_id
+                tool_call_id = tc.get("id", "")
+                if not tool_call_id:
+                    logger.warning("Tool call missing ID, generating fallback: %s", name)
+                    tool_call_id = f"{name}_{len(current_messages)}"
+
+                # Check for duplicate IDs
+                if tool_call_id in seen_ids:
+                    logger.error("Duplicate tool_call_id: %s", tool_call_id)
+                    tool_call_id = f"{tool_call_id}_dup_{len(seen_ids)}"
+                seen_ids.add(tool_call_id)
+
+                # === TOOL LOOP DETECTION ===
+                # Check for loops before executing the tool
+                if loop_detector and name:
+                    loop_result = loop_detector.detect_loop(name, args_data)
+                    if loop_result.stuck:
+                        if loop_result.level == "critical":
+                            # Critical - block the tool execution
+                            critical_loop_detected = True
+                            critical_loop_message = loop_result.message
+                            logger.warning(f"Tool loop blocked: {name} - {loop_result.message}")
+                            out = f"Error: Tool execution blocked due to loop detection.\n\n{loop_result.message}"
+                            current_messages.append({"role": "tool", "tool_call_id": tool_call_id, "content": out})
+                            continue
                         else:
-                            stdout = ""
-                            stderr = (exec_result.get("error") or "Exec failed").strip()
-                            ok = False
+                            # Warning - inject warning into tool result but allow execution
+                            logger.info(f"Tool loop warning: {name} - {loop_result.message}")
+                            # Record the call anyway so we can track progress
+                            loop_detector.record_tool_call(name, args_data, tool_call_id)
+                            # Note: We'll record the outcome after execution
                     else:
-                        stdout, stderr, ok = await run_allowlisted_command(
-                            cmd,
-                            allowed_bins=effective_bins,
-                            timeout_seconds=timeout_sec if isinstance(timeout_sec, int) else None,
-                            workdir=workdir,
-                        )
-                    ran_exec_tool = True
-                    exec_tool_call_count += 1
-                    used_tool_labels.append(_build_tool_trace_label(name))
-                    last_exec_command = cmd
-                    last_exec_stdout = stdout
-                    last_exec_stderr = stderr
-                    if not ok:
-                        last_exec_error = (stderr or stdout or "").strip() or "Command not allowed or failed."
-                    else:
-                        last_exec_error = ""
-                    logger.info("Exec result: ok=%s stdout_len=%s stderr_len=%s", ok, len(stdout), len(stderr))
-                    if ok or stdout or stderr:
-                        out = f"stdout:\n{stdout}\n" + (f"stderr:\n{stderr}\n" if stderr else "")
-                    else:
-                        out = f"error: {stderr or 'Command not allowed or failed.'}"
-            elif name == "process":
-                from app.process_tool import parse_process_tool_args, run_process_tool
-
-                params = parse_process_tool_args(args_str)
-                used_tool_labels.append(_build_tool_trace_label("process", str(params.get("action") or "")))
-                out = await run_process_tool(params)
-                _record_tool_outcome(
-                    tool_name="process",
-                    tool_output=out,
-                    tool_args=params,
-                    action=str(params.get("action") or ""),
-                )
-            elif name == "list_directory":
-                from app.files_tool import list_directory as list_dir, parse_files_tool_args as parse_files_args
-                params = parse_files_args(args_str)
-                path = (params.get("path") or "").strip()
-                out = await list_dir(path, user_id, db)
-                ran_files_tool = True
-                used_tool_labels.append(_build_tool_trace_label("list_directory"))
-            elif name == "read_file":
-                from app.files_tool import read_file_content as read_file_fn, parse_files_tool_args as parse_files_args
-                params = parse_files_args(args_str)
-                path = (params.get("path") or "").strip()
-                _rf_offset = int(params["offset"]) if isinstance(params.get("offset"), int) and params["offset"] > 0 else 0
-                out = await read_file_fn(
-                    path, user_id, db,
-                    offset=_rf_offset,
-                    model=user_model,
-                    provider=provider_name,
-                )
-                ran_files_tool = True
-                used_tool_labels.append(_build_tool_trace_label("read_file"))
-            elif name == "write_file":
-                from app.files_tool import write_file as write_file_fn, parse_files_tool_args as parse_files_args
-
-                params = parse_files_args(args_str)
-                path = (params.get("path") or "").strip()
-                if _is_note_capture_request(text):
-                    path = _canonicalize_note_write_path(path)
-                    params["path"] = path
-                content = params.get("content")
-                out = await write_file_fn(path, content if isinstance(content, str) else "", user_id, db)
-                ran_files_tool = True
-                used_tool_labels.append(_build_tool_trace_label("write_file"))
-            elif name == "allow_path":
-                from app.files_tool import allow_path as allow_path_fn, parse_files_tool_args as parse_files_args
-                params = parse_files_args(args_str)
-                path = (params.get("path") or "").strip()
-                out = await allow_path_fn(path, user_id, db)
-                ran_files_tool = True
-                used_tool_labels.append(_build_tool_trace_label("allow_path"))
-            elif name == "delete_file":
-                from app.files_tool import delete_file as delete_file_fn, parse_files_tool_args as parse_files_args
-                params = parse_files_args(args_str)
-                path = (params.get("path") or "").strip()
-                permanently = bool(params.get("permanently")) if isinstance(params, dict) else False
-                out = await delete_file_fn(path, user_id, db, permanently=permanently)
-                ran_files_tool = True
-                used_tool_labels.append(_build_tool_trace_label("delete_file"))
-            elif name == "delete_matching_files":
-                from app.files_tool import (
-                    delete_matching_files as delete_matching_files_fn,
-                    parse_files_tool_args as parse_files_args,
-                )
-                params = parse_files_args(args_str)
-                directory = (params.get("directory") or "").strip()
-                glob_pattern = (params.get("glob_pattern") or "").strip()
-                permanently = bool(params.get("permanently")) if isinstance(params, dict) else False
-                out = await delete_matching_files_fn(
-                    directory,
-                    glob_pattern,
-                    user_id,
-                    db,
-                    permanently=permanently,
-                )
-                ran_files_tool = True
-                used_tool_labels.append(_build_tool_trace_label("delete_matching_files"))
-            elif name in ("read", "write", "edit"):
-                from app.coding_compat_tool import (
-                    parse_coding_compat_args,
-                    run_read_compat,
-                    run_write_compat,
-                    run_edit_compat,
-                )
-
-                params = parse_coding_compat_args(args_str)
-                if name == "read":
-                    out = await run_read_compat(params, user_id, db, model=user_model, provider=provider_name)
-                elif name == "write":
-                    if _is_note_capture_request(text):
-                        note_path = _canonicalize_note_write_path(str(params.get("path") or ""))
-                        params["path"] = note_path
-                    out = await run_write_compat(params, user_id, db)
-                else:
-                    out = await run_edit_compat(params, user_id, db)
-                ran_files_tool = True
-                used_tool_labels.append(_build_tool_trace_label(name))
-            elif name == "generate_pdf":
-                from app.pdf_tool import generate_pdf as generate_pdf_fn, parse_pdf_tool_args
-
-                params = parse_pdf_tool_args(args_str)
-                pdf_content = (params.get("content") or "").strip()
-                pdf_filename = (params.get("filename") or "document.pdf").strip()
-                pdf_title = params.get("title")
-                if not pdf_content:
-                    out = "Error: content is required"
-                else:
-                    pdf_path = generate_pdf_fn(pdf_content, filename=pdf_filename, title=pdf_title)
-                    import os as _os
-                    pdf_safe = _os.path.basename(pdf_path)
-                    out = f"PDF generated successfully. Download: /api/files/download-pdf/{pdf_safe}"
-                used_tool_labels.append(_build_tool_trace_label("generate_pdf"))
-            elif name == "generate_pptx":
-                from app.office_tool import generate_pptx as _gen_pptx, parse_pptx_tool_args
-
-                params = parse_pptx_tool_args(args_str)
-                slides = params.get("slides")
-                if not slides or not isinstance(slides, list):
-                    out = "Error: slides array is required"
-                else:
-                    pptx_filename = (params.get("filename") or "presentation.pptx").strip()
-                    pptx_theme = (params.get("theme") or "dark").strip()
-                    pptx_path = _gen_pptx(slides, filename=pptx_filename, theme=pptx_theme)
-                    import os as _os
-                    pptx_safe = _os.path.basename(pptx_path)
-                    out = f"Presentation generated successfully. Download: /api/files/download-office/{pptx_safe}"
-                used_tool_labels.append(_build_tool_trace_label("generate_pptx"))
-            elif name == "generate_docx":
-                from app.office_tool import generate_docx as _gen_docx, parse_docx_tool_args
-
-                params = parse_docx_tool_args(args_str)
-                docx_content = (params.get("content") or "").strip()
-                if not docx_content:
-                    out = "Error: content is required"
-                else:
-                    docx_filename = (params.get("filename") or "document.docx").strip()
-                    docx_title = params.get("title")
-                    docx_path = _gen_docx(docx_content, filename=docx_filename, title=docx_title)
-                    import os as _os
-                    docx_safe = _os.path.basename(docx_path)
-                    out = f"Document generated successfully. Download: /api/files/download-office/{docx_safe}"
-                used_tool_labels.append(_build_tool_trace_label("generate_docx"))
-            elif name == "generate_xlsx":
-                from app.office_tool import generate_xlsx as _gen_xlsx, parse_xlsx_tool_args
-
-                params = parse_xlsx_tool_args(args_str)
-                xlsx_sheets = params.get("sheets")
-                if not xlsx_sheets or not isinstance(xlsx_sheets, list):
-                    out = "Error: sheets array is required"
-                else:
-                    xlsx_filename = (params.get("filename") or "spreadsheet.xlsx").strip()
-                    xlsx_title = params.get("title")
-                    xlsx_path = _gen_xlsx(xlsx_sheets, filename=xlsx_filename, title=xlsx_title)
-                    import os as _os
-                    xlsx_safe = _os.path.basename(xlsx_path)
-                    out = f"Spreadsheet generated successfully. Download: /api/files/download-office/{xlsx_safe}"
-                used_tool_labels.append(_build_tool_trace_label("generate_xlsx"))
-            elif name == "web_search":
-                from app.openclaw_compat_tools import parse_openclaw_compat_args, run_web_search_compat
-
-                params = parse_openclaw_compat_args(args_str)
-                used_tool_labels.append(_build_tool_trace_label("web_search"))
-                out = await run_web_search_compat(params)
-            elif name == "web_fetch":
-                from app.openclaw_compat_tools import parse_openclaw_compat_args, run_web_fetch_compat
-
-                params = parse_openclaw_compat_args(args_str)
-                # Inject model/provider so web_fetch can compute adaptive page cap.
-                params["_model"] = user_model
-                params["_provider"] = provider_name
-                used_tool_labels.append(_build_tool_trace_label("web_fetch"))
-                out = await run_web_fetch_compat(params)
-            elif name == "memory_search":
-                from app.openclaw_compat_tools import parse_openclaw_compat_args, run_memory_search_compat
-
-                params = parse_openclaw_compat_args(args_str)
-                used_tool_labels.append(_build_tool_trace_label("memory_search"))
-                out = await run_memory_search_compat(params, user_id=user_id)
-            elif name == "memory_get":
-                from app.openclaw_compat_tools import parse_openclaw_compat_args, run_memory_get_compat
-
-                params = parse_openclaw_compat_args(args_str)
-                used_tool_labels.append(_build_tool_trace_label("memory_get"))
-                out = await run_memory_get_compat(params, model=user_model, provider=provider_name)
-                _record_tool_outcome(tool_name="memory_get", tool_output=out, tool_args=params)
-            elif name == "apply_patch":
-                from app.apply_patch_compat_tool import parse_apply_patch_compat_args, run_apply_patch_compat
-
-                params = parse_apply_patch_compat_args(args_str)
-                used_tool_labels.append(_build_tool_trace_label("apply_patch"))
-                out = await run_apply_patch_compat(params)
-                ran_files_tool = True
-            elif name == "message":
-                from app.message_compat_tool import parse_message_compat_args, run_message_compat
-
-                params = parse_message_compat_args(args_str)
-                used_tool_labels.append(
-                    _build_tool_trace_label("message", str(params.get("action") or "send"))
-                )
-                out = await run_message_compat(
-                    params,
-                    current_channel=channel,
-                    current_target=channel_target,
-                )
-            elif name == "reminders":
-                from app.reminders_tool import run_reminders_tool, parse_reminders_tool_args
-                params = parse_reminders_tool_args(args_str)
-                used_tool_labels.append(
-                    _build_tool_trace_label("reminders", str(params.get("action") or ""))
-                )
-                out = await run_reminders_tool(
-                    params,
-                    user_id=user_id,
-                    channel=channel,
-                    channel_target=channel_target,
-                    db=db,
-                )
-                ran_reminders_tool = True
-                if (params.get("action") or "").strip().lower() == "add":
-                    try:
-                        parsed = json.loads(out)
-                        if isinstance(parsed, dict) and parsed.get("ok") is True:
-                            reminder_tool_scheduled = True
-                            extra["reminder_scheduled"] = True
-                            extra["reminder_at"] = (
-                                parsed.get("display_time")
-                                or parsed.get("run_at")
-                                or ""
-                            )
-                    except Exception:
-                        pass
-                _record_tool_outcome(
-                    tool_name="reminders",
-                    tool_output=out,
-                    tool_args=params,
-                    action=str(params.get("action") or ""),
-                )
-            elif name == "cron":
-                from app.cron_tool import run_cron_tool, parse_cron_tool_args
-                params = parse_cron_tool_args(args_str)
-                used_tool_labels.append(
-                    _build_tool_trace_label("cron", str(params.get("action") or ""))
-                )
-                out = await run_cron_tool(
-                    params,
-                    user_id=user_id,
-                    channel=channel,
-                    channel_target=channel_target,
-                    db=db,
-                )
-                ran_cron_tool = True
-                _record_tool_outcome(
-                    tool_name="cron",
-                    tool_output=out,
-                    tool_args=params,
-                    action=str(params.get("action") or ""),
-                )
-            elif name in (
-                "agents_list",
-                "sessions_spawn",
-                "sessions_list",
-                "sessions_history",
-                "sessions_send",
-                "sessions_stop",
-            ):
-                from app.subagent_orchestrator import parse_subagent_tool_args, run_subagent_tool
-
-                params = parse_subagent_tool_args(args_str)
-                used_tool_labels.append(
-                    _build_tool_trace_label(name)
-                )
-                out = await run_subagent_tool(
-                    tool_name=name,
-                    params=params,
-                    user_id=user_id,
-                    parent_conversation_id=cid,
-                    provider_name=provider_name,
-                    channel=channel,
-                    channel_target=channel_target,
-                )
-            elif name == "spotify":
-                from app.spotify_tool import parse_spotify_tool_args, run_spotify_tool
-                params = parse_spotify_tool_args(args_str)
-                used_tool_labels.append(
-                    _build_tool_trace_label("spotify", str(params.get("action") or ""))
-                )
-                out = await run_spotify_tool(params, user_id=user_id)
-            elif name == "image_gen":
-                from app.image_gen_tool import run_image_gen
-                prompt = (args_data.get("prompt") or "").strip() if isinstance(args_data, dict) else ""
-                used_tool_labels.append(_build_tool_trace_label("image_gen"))
-                out = await run_image_gen(user_id=user_id, prompt=prompt)
-                ran_image_gen_tool = True
-            elif name == "project_update":
-                out = await _run_project_update_tool(args_data, cid, db)
-                used_tool_labels.append(_build_tool_trace_label("project_update", str((args_data or {}).get("action") or "")))
-            elif name and name.startswith("mcp_"):
-                # Route to MCP server
-                from app import mcp_client
-                if mcp_client.is_mcp_tool(name):
-                    out = await mcp_client.call_tool(name, args_data)
-                    used_tool_labels.append(_build_tool_trace_label(name))
-                else:
-                    out = f"Error: MCP tool '{name}' not found"
-            else:
-                out = "Unknown tool."
-
-            if out is not None:
-                # Record if not already handled specifically in branches (like process/reminders/cron)
-                # Note: most tools were refactored to use this common block.
-                recorded_tools = (
-                    "process", "reminders", "cron", "agents_list", "sessions_spawn",
-                    "sessions_list", "sessions_history", "sessions_send", "sessions_stop"
-                )
-                if name not in recorded_tools:
-                    _record_tool_outcome(tool_name=name or "unknown", tool_output=out, tool_args=args_data)
-
-                # Truncate tool output to prevent context overflow / provider failure.
-                # OpenClaw-style adaptive paging:
-                #   - exec/bash: tail truncation (keep last N chars of stdout)
-                #   - read/coding tools: already paged at source with offset hint; safety cap here
-                #   - pageable non-read tools (memory_get): already paged at source; safety cap only
-                #   - non-pageable tools (web_fetch, list_dir, memory_search): hard cap, no offset hint
-                if name in ("exec", "bash"):
-                    if len(out) > OUTPUT_EVENT_TAIL_CHARS:
-                        logger.info("Truncating exec output from %d to last %d chars", len(out), OUTPUT_EVENT_TAIL_CHARS)
-                        out = truncate_output_tail(out, OUTPUT_EVENT_TAIL_CHARS)
-                else:
-                    from app.adaptive_paging import compute_page_chars, truncate_with_offset_hint
-                    _tool_page_chars = compute_page_chars(user_model, provider_name)
-                    if len(out) > _tool_page_chars:
-                        logger.info(
-                            "Truncating tool %s output from %d to %d chars (adaptive, model=%s)",
-                            name, len(out), _tool_page_chars, user_model or "unknown",
-                        )
-                        # Tools that support offset-based pagination get a continuation hint.
-                        # Non-pageable tools get a plain truncation notice (no offset hint).
-                        # Tools that do their own offset-based pagination at the source.
-                        # These already append a continuation hint, so we add one here too
-                        # (for the rare case where the safety net fires on top of their output).
-                        _offset_pageable = name in (
-                            "read", "read_file", "read_workspace_file",
-                            "memory_get",  # already paged at source with from= hint
-                        )
-                        if _offset_pageable:
-                            out = truncate_with_offset_hint(out, max_chars=_tool_page_chars, offset=0)
-                        else:
-                            out = out[:_tool_page_chars] + (
-                                f"\n\n[Output truncated to {_tool_page_chars} chars."
-                                " Use a more specific query or request a smaller range.]"
-                            )
+                        # No loop detected - record the call
+                        loop_detector.record_tool_call(name, args_data, tool_call_id)
+                # === END TOOL LOOP DETECTION ===
 
                 if name:
                     await _emit_tool_event(
-                        phase="end",
+                        phase="start",
                         name=name,
                         label=_build_tool_trace_label(name),
                         channel=channel,
                         channel_target=channel_target,
                         stream_event_callback=stream_event_callback,
                     )
-                current_messages.append({"role": "tool", "tool_call_id": tool_call_id, "content": out})
+                tool_handler = tool_registry.get(name) if out is None else None
+                if out is None and tool_handler is None:
+                    out = "Unknown tool."
+                elif tool_handler is not None:
+                    tool_result = await tool_registry.dispatch(
+                        tool_handler,
+                        ToolCall(name=name, raw_args=args_str, args=args_data, index=tool_index, tool_call_id=tool_call_id),
+                    )
+                    out = tool_result.output
+                    if tool_result.label:
+                        used_tool_labels.append(tool_result.label)
+
+                if out is not None:
+                    # Handlers with track_outcome=False record their own outcome (process/reminders/cron)
+                    # or are not tracked (subagent tools).
+                    if tool_handler is None or tool_handler.track_outcome:
+                        _record_tool_outcome(tool_name=name or "unknown", tool_output=out, tool_args=args_data)
+
+                    # Truncate tool output to prevent context overflow / provider failure.
+                    # OpenClaw-style adaptive paging:
+                    #   - exec/bash: tail truncation (keep last N chars of stdout)
+                    #   - read/coding tools: already paged at source with offset hint; safety cap here
+                    #   - pageable non-read tools (memory_get): already paged at source; safety cap only
+                    #   - non-pageable tools (web_fetch, list_dir, memory_search): hard cap, no offset hint
+                    if name in ("exec", "bash"):
+                        if len(out) > OUTPUT_EVENT_TAIL_CHARS:
+                            logger.info("Truncating exec output from %d to last %d chars", len(out), OUTPUT_EVENT_TAIL_CHARS)
+                            out = truncate_output_tail(out, OUTPUT_EVENT_TAIL_CHARS)
+                    else:
+                        from app.adaptive_paging import fit_page_chars, truncate_with_offset_hint
+                        # Budgeted in tokens of the model reading the result, cut at a char offset.
+                        _tool_page_chars = fit_page_chars(out, tool_loop_model, provider_used.name)
+                        if len(out) > _tool_page_chars:
+                            logger.info(
+                                "Truncating tool %s output from %d to %d chars (adaptive, model=%s)",
+                                name, len(out), _tool_page_chars, tool_loop_model or "unknown",
+                            )
+                            # Tools that support offset-based pagination get a continuation hint.
+                            # Non-pageable tools get a plain truncation notice (no offset hint).
+                            # Tools that do their own offset-based pagination at the source.
+                            # These already append a continuation hint, so we add one here too
+                            # (for the rare case where the safety net fires on top of their output).
+                            _offset_pageable = name in (
+                                "read", "read_file", "read_workspace_file",
+                                "memory_get",  # already paged at source with from= hint
+                            )
+                            if _offset_pageable:
+                                out = truncate_with_offset_hint(out, max_chars=_tool_page_chars, offset=0)
+                            else:
+                                out = out[:_tool_page_chars] + (
+                                    f"\n\n[Output truncated to {_tool_page_chars} chars."
+                                    " Use a more specific query or request a smaller range.]"
+                                )
+
+                    if name:
+                        await _emit_tool_event(
+                            phase="end",
+                            name=name,
+                            label=_build_tool_trace_label(name),
+                            channel=channel,
+                            channel_target=channel_target,
+                            stream_event_callback=stream_event_callback,
+                        )
+                    current_messages.append({"role": "tool", "tool_call_id": tool_call_id, "content": out})
+
+        finally:
+            await read_batch.close()
 
         # If the model has made 6+ exec calls in a row, nudge it hard to write a script
         SCRIPT_NUDGE_THRESHOLD = 6
@@ -1745,18 +1768,20 @@ async def handle_message(
         # Compact old tool rounds every N rounds (OpenClaw-style context compaction).
         # Replaces old tool call/result pairs with a concise inline summary so long
         # agentic tasks don't overflow the context window.
+        # Also compact as soon as the messages outgrow the model's token budget.
+        from app.compaction import compact_tool_rounds, compact_tool_rounds_to_budget
+        _did_compact = False
         if _round > 0 and _round % COMPACT_EVERY_N_ROUNDS == 0:
-            from app.compaction import compact_tool_rounds
             current_messages, _did_compact = compact_tool_rounds(current_messages)
-            if _did_compact:
-                logger.info("Tool history compacted at round %d (%d messages remaining)", _round, len(current_messages))
+        current_messages, _over_budget = compact_tool_rounds_to_budget(
+            current_messages, tool_loop_model, provider_used.name,
+        )
+        if _did_compact or _over_budget:
+            logger.info("Tool history compacted at round %d (%d messages remaining)", _round, len(current_messages))
 
         # Re-call same provider with updated messages (no fallback switch); use that provider's model
         tool_kwargs = {**chat_kwargs}
-        if provider_used.name == provider.name:
-            tool_kwargs["model"] = user_model or None
-        else:
-            tool_kwargs["model"] = fallback_models.get(provider_used.name)
+        tool_kwargs["model"] = tool_loop_model
         # Give the model more time when it has to summarize large tool output (e.g. memo notes)
         if provider_used.name == "openrouter":
             tool_kwargs["timeout"] = 90
@@ -2106,12 +2131,7 @@ async def handle_message(
         # Safety: only honor legacy [ASTA_EXEC] fallback when current user message is clearly exec-intent.
         # Prevents unrelated requests (e.g. reminders/lists) from accidentally running stale exec commands.
         if _is_exec_intent(text):
-            from app.exec_tool import (
-                get_effective_exec_bins,
-                prepare_allowlisted_command,
-                run_allowlisted_command,
-            )
-            effective_bins = await get_effective_exec_bins(db, user_id)
+            effective_bins = await get_effective_exec_bins(db, user_id, skill_toggles=user_settings.skill_toggles)
             for m in exec_matches:
                 cmd = m.group(1).strip()
                 precheck_argv, precheck_err = prepare_allowlisted_command(
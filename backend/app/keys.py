@@ -1,7 +1,18 @@
-"""Resolve API keys: stored (DB) first, then env. Used by providers."""
+"""Resolve API keys: stored (DB) first, then env. Used by providers.
+
+Stored keys are cached in-process: loaded with one query at startup (or on first lookup) and updated
+by ``Db.set_stored_api_key`` through ``notify_api_key_changed``, so lookups on provider hot paths do
+no SQLite reads. ``on_api_key_change`` registers callbacks (e.g. the provider client pool).
+"""
+from __future__ import annotations
+import logging
+from typing import Callable
+
 from app.config import get_settings
 from app.db import get_db
 
+logger = logging.getLogger(__name__)
+
 _ENV_KEYS = {
     "groq_api_key": "groq_api_key",
     "gemini_api_key": "gemini_api_key",
@@ -15,14 +26,65 @@ _ENV_KEYS = {
     "spotify_client_secret": "spotify_client_secret",
 }
 
+# key_name -> stored value; None until loaded.
+_stored_keys: dict[str, str] | None = None
+_listeners: list[Callable[[str], None]] = []
 
-async def get_api_key(key_name: str) -> str | None:
-    """Return API key: from DB if set, else from env. Used by AI providers."""
+
+async def load_api_keys() -> dict[str, str]:
+    """(Re)load every stored key with a single query."""
+    global _stored_keys
     db = get_db()
     await db.connect()
-    stored = await db.get_stored_api_key(key_name)
+    _stored_keys = dict(await db.get_api_keys())
+    return _stored_keys
+
+
+async def ensure_api_keys_loaded() -> None:
+    if _stored_keys is None:
+        await load_api_keys()
+
+
+def reset_api_key_cache() -> None:
+    """Forget cached keys (the DB connection closed); the next lookup reloads them."""
+    global _stored_keys
+    _stored_keys = None
+
+
+def get_stored_api_key_sync(key_name: str) -> str | None:
+    """Stored (DB) key from the cache only, no env fallback. None if unset or the cache is not loaded yet."""
+    return (_stored_keys or {}).get(key_name) or None
+
+
+def get_api_key_sync(key_name: str) -> str | None:
+    """Cached stored key, else env. Never touches SQLite; call ensure_api_keys_loaded() once beforehand."""
+    stored = get_stored_api_key_sync(key_name)
     if stored:
         return stored
     s = get_settings()
     val = getattr(s, key_name, None)
     return (val or "").strip() or None
+
+
+async def get_api_key(key_name: str) -> str | None:
+    """Return API key: from DB if set, else from env. Used by AI providers."""
+    await ensure_api_keys_loaded()
+    return get_api_key_sync(key_name)
+
+
+def on_api_key_change(callback: Callable[[str], None]) -> None:
+    """Call ``callback(key_name)`` whenever a stored key is set or cleared."""
+    _listeners.append(callback)
+
+
+def notify_api_key_changed(key_name: str, value: str | None) -> None:
+    if _stored_keys is not None:
+        if value:
+            _stored_keys[key_name] = value
+        else:
+            _stored_keys.pop(key_name, None)
+    for callback in list(_listeners):
+        try:
+            callback(key_name)
+        except Exception as e:
+            logger.warning("API key change listener failed for %s: %s", key_name, e)
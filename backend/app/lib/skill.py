@@ -15,6 +15,11 @@ class Skill(ABC):
         """If True, this skill cannot be disabled by the user."""
         return False
 
+    @property
+    def depends_on(self) -> tuple[str, ...]:
+        """Skills whose execute() results this skill reads from 'extra'; they finish first when both run."""
+        return ()
+
     @abstractmethod
     def check_eligibility(self, text: str, user_id: str) -> bool:
         """
@@ -27,16 +27,36 @@ if not _app_log.handlers:
     _h.setFormatter(logging.Formatter("%(levelname)s:     %(name)s: %(message)s"))
     _app_log.addHandler(_h)
 
+_USAGE_RETENTION_INTERVAL_S = 24 * 3600
+
+
+async def _usage_retention_loop() -> None:
+    """Once a day: drop raw usage rows / hourly rollups that the daily rollups already cover."""
+    while True:
+        try:
+            result = await get_db().compact_usage_stats()
+            if any(result.values()):
+                logger.info("Usage retention: %s", result)
+        except Exception as e:
+            logger.warning("Usage retention failed: %s", e)
+        await asyncio.sleep(_USAGE_RETENTION_INTERVAL_S)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup: validate DB, reload reminders, ensure User.md, start Telegram. Shutdown: cleanup."""
 
+    # Scheduler jobs (cron, reminders, learning) run their async work on this loop.
+    from app.tasks.scheduler import bind_main_loop
+    bind_main_loop(asyncio.get_running_loop())
+
     # 1. Validate database connection FIRST
     try:
         db = get_db()
         await db.connect()
         logger.info("✓ Database connected: %s", os.path.basename(DB_PATH))
+        from app.keys import load_api_keys
+        await load_api_keys()
     except Exception as e:
         logger.critical("✗ Failed to connect to database: %s", e)
         raise RuntimeError("Database initialization failed") from e
@@ -124,6 +144,7 @@ async def lifespan(app: FastAPI):
             )
             await asyncio.sleep(delay)
     token = token or get_settings().telegram_bot_token
+    app.state.usage_retention_task = asyncio.create_task(_usage_retention_loop())
     app.state.telegram_app = None
     if token:
         try:
@@ -134,6 +155,10 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.exception("Failed to start Telegram bot; continuing without it: %s", e)
     yield
+    bind_main_loop(None)
+    retention_task = getattr(app.state, "usage_retention_task", None)
+    if retention_task is not None:
+        retention_task.cancel()
     # Shutdown: stop MCP servers
     try:
         from app import mcp_client
@@ -151,6 +176,21 @@ async def lifespan(app: FastAPI):
             await tg.shutdown()
         except Exception as e:
             logger.exception("Telegram bot shutdown: %s", e)
+    try:
+        from app.rag.service import close_embed_client
+        await close_embed_client()
+    except Exception as e:
+        logger.warning("RAG embed client close: %s", e)
+    try:
+        from app.providers.clients import close_provider_clients
+        await close_provider_clients()
+    except Exception as e:
+        logger.warning("Provider client pool close: %s", e)
+    # Shutdown: commit any group-committed writes still queued
+    try:
+        await get_db().flush_writes()
+    except Exception as e:
+        logger.warning("DB write flush on shutdown: %s", e)
 
 
 # Read version from file (root/VERSION)
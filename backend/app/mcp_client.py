@@ -25,6 +25,7 @@ _tools: dict[str, dict] = {}  # tool_name -> {server, schema}
 _ready_events: dict[str, asyncio.Event] = {}  # signals when a server is ready
 _initialized = False
 _lock = asyncio.Lock()
+_tools_generation = 0  # bumped whenever _tools changes (keys the cached tool bundles)
 
 
 def _load_config() -> dict:
@@ -60,6 +61,7 @@ async def _run_server(
     db_keys: dict[str, str] | None = None,
 ) -> None:
     """Start an MCP server inside a proper async context and keep it alive."""
+    global _tools_generation
     command = config["command"]
     args = config.get("args", [])
     env_map = config.get("env", {})
@@ -99,6 +101,7 @@ async def _run_server(
                             "description": tool.description or "",
                             "schema": tool.inputSchema if hasattr(tool, "inputSchema") else {},
                         }
+                    _tools_generation += 1
                     logger.info(
                         "MCP server '%s': discovered %d tools: %s",
                         name,
@@ -164,7 +167,7 @@ async def initialize(db_keys: dict[str, str] | None = None) -> None:
 
 async def shutdown() -> None:
     """Shutdown all MCP sessions and servers."""
-    global _initialized
+    global _initialized, _tools_generation
     for name, task in list(_tasks.items()):
         task.cancel()
         try:
@@ -174,6 +177,7 @@ async def shutdown() -> None:
     _tasks.clear()
     _sessions.clear()
     _tools.clear()
+    _tools_generation += 1
     _initialized = False
     logger.info("MCP client shutdown complete")
 
@@ -195,6 +199,11 @@ def get_tool_definitions() -> list[dict]:
     return defs
 
 
+def get_tool_generation() -> int:
+    """Changes whenever the set of MCP tool definitions changes."""
+    return _tools_generation
+
+
 def get_tool_names() -> set[str]:
     """Return set of all MCP tool names."""
     return set(_tools.keys())
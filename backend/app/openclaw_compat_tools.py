@@ -451,24 +451,22 @@ async def run_memory_search_compat(params: dict, user_id: str) -> str:
             from app.rag.service import get_rag
 
             rag = get_rag()
-            rag_text = (await rag.query(query, k=max_results)).strip()
-            if rag_text:
-                rag_chunks = [c.strip() for c in rag_text.split("\n\n") if c.strip()]
-                for i, chunk in enumerate(rag_chunks[:max_results]):
-                    score = max(0.4, 0.9 - i * 0.1)
-                    if score < min_score:
-                        continue
-                    line_count = max(1, len(chunk.splitlines()))
-                    results.append(
-                        {
-                            "path": "rag://hybrid",
-                            "startLine": 1,
-                            "endLine": line_count,
-                            "snippet": chunk,
-                            "score": round(score, 4),
-                            "source": "rag",
-                        }
-                    )
+            for hit in await rag.search(query, k=max_results):
+                chunk = (hit.get("text") or "").strip()
+                score = float(hit.get("score") or 0.0)
+                if not chunk or score < min_score:
+                    continue
+                line_count = max(1, len(chunk.splitlines()))
+                results.append(
+                    {
+                        "path": "rag://hybrid",
+                        "startLine": 1,
+                        "endLine": line_count,
+                        "snippet": chunk,
+                        "score": round(score, 4),
+                        "source": "rag",
+                    }
+                )
         except Exception:
             pass
 
@@ -2,12 +2,27 @@
 
 from __future__ import annotations
 
+import json
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
 from app.providers.base import ProviderError
 
 # Fixed provider chain for single-user Asta flow.
 MAIN_PROVIDER_CHAIN: tuple[str, ...] = ("claude", "google", "openrouter", "ollama")
 DEFAULT_MAIN_PROVIDER = MAIN_PROVIDER_CHAIN[0]
 
+# fixed: fallbacks in MAIN_PROVIDER_CHAIN order. adaptive: ordered by observed latency/error rate,
+# with degraded providers skipped until they cool down.
+PROVIDER_FLOW_MODES: tuple[str, ...] = ("fixed", "adaptive")
+
+# Rolling call statistics kept per provider in provider_runtime_state.
+STATS_EWMA_ALPHA = 0.3
+STATS_LATENCY_WINDOW = 50  # recent successful latencies kept for p50/p95
+DEGRADED_MIN_CALLS = 3
+DEGRADED_ERROR_RATE = 0.5
+DEGRADED_RETRY_AFTER_S = 600
+
 _BILLING_ERROR_HINTS: tuple[str, ...] = (
     "credit balance",
     "insufficient credit",
@@ -78,3 +93,112 @@ def classify_provider_disable_reason(
     if provider_error == ProviderError.AUTH and is_auth_error_text(error_message):
         return "auth"
     return None
+
+
+def normalize_provider_flow_mode(mode: str | None) -> str:
+    candidate = (mode or "").strip().lower()
+    return candidate if candidate in PROVIDER_FLOW_MODES else PROVIDER_FLOW_MODES[0]
+
+
+def _ewma(previous: float | None, sample: float) -> float:
+    if previous is None:
+        return sample
+    return STATS_EWMA_ALPHA * sample + (1 - STATS_EWMA_ALPHA) * previous
+
+
+def _percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def update_call_stats(
+    stats: dict[str, Any] | None,
+    *,
+    model: str,
+    ok: bool,
+    latency_ms: float | None,
+    ttft_ms: float | None = None,
+) -> dict[str, Any]:
+    """Fold one provider call into its rolling stats (EWMA latency/TTFT/error rate, p50/p95 window).
+
+    Stats recorded for a different model are discarded: a model switch makes old latencies meaningless.
+    """
+    prev = dict(stats or {})
+    if (prev.get("stats_model") or "") != (model or ""):
+        prev = {}
+    try:
+        window = [float(v) for v in json.loads(prev.get("latency_window") or "[]")]
+    except (TypeError, ValueError):
+        window = []
+    latency_ewma = prev.get("latency_ewma_ms")
+    ttft_ewma = prev.get("ttft_ewma_ms")
+    # Only successful calls feed latency: a fast 401 says nothing about how long answers take.
+    if ok and latency_ms is not None:
+        latency_ewma = _ewma(latency_ewma, float(latency_ms))
+        window = (window + [round(float(latency_ms), 1)])[-STATS_LATENCY_WINDOW:]
+    if ok and ttft_ms is not None:
+        ttft_ewma = _ewma(ttft_ewma, float(ttft_ms))
+    return {
+        "stats_model": model or "",
+        "calls": int(prev.get("calls") or 0) + 1,
+        "error_rate": _ewma(prev.get("error_rate"), 0.0 if ok else 1.0),
+        "latency_ewma_ms": latency_ewma,
+        "latency_p50_ms": _percentile(window, 50),
+        "latency_p95_ms": _percentile(window, 95),
+        "ttft_ewma_ms": ttft_ewma,
+        "latency_window": json.dumps(window),
+    }
+
+
+def _seconds_since(timestamp: str | None, now: datetime | None = None) -> float | None:
+    if not timestamp:
+        return None
+    try:
+        then = datetime.strptime(timestamp, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    return ((now or datetime.now(timezone.utc)) - then).total_seconds()
+
+
+def is_provider_degraded(state: dict[str, Any], now: datetime | None = None) -> bool:
+    """Mostly failing lately. Degradation lapses after DEGRADED_RETRY_AFTER_S so the provider is retried."""
+    if int(state.get("calls") or 0) < DEGRADED_MIN_CALLS:
+        return False
+    if float(state.get("error_rate") or 0.0) < DEGRADED_ERROR_RATE:
+        return False
+    age = _seconds_since(state.get("last_call_at"), now)
+    return age is not None and age < DEGRADED_RETRY_AFTER_S
+
+
+def adaptive_provider_order(
+    providers: Iterable[str],
+    states: dict[str, dict[str, Any]],
+    now: datetime | None = None,
+) -> list[str]:
+    """Order providers by expected latency (EWMA inflated by error rate); degraded ones go last.
+
+    Providers with no samples yet score as the median of the measured ones, so they keep their fixed
+    position relative to similar providers (the sort is stable) and still get sampled.
+    """
+    names = list(providers)
+
+    def _score(name: str) -> float | None:
+        state = states.get(name) or {}
+        latency = state.get("latency_ewma_ms")
+        if latency is None:
+            return None
+        return float(latency) * (1.0 + 4.0 * float(state.get("error_rate") or 0.0))
+
+    scores = {name: _score(name) for name in names}
+    known = [v for v in scores.values() if v is not None]
+    neutral = _percentile(known, 50) or 0.0
+    return sorted(
+        names,
+        key=lambda name: (
+            is_provider_degraded(states.get(name) or {}, now),
+            scores[name] if scores[name] is not None else neutral,
+        ),
+    )
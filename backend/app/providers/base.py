@@ -27,6 +27,38 @@ TextDeltaCallback = Callable[[str], Awaitable[None] | None]
 StreamEventCallback = Callable[[dict[str, Any]], Awaitable[None] | None]
 
 
+class PromptContext(str):
+    """System prompt whose first ``stable_len`` characters stay identical across turns.
+
+    That prefix (workspace files, tool/skill guidance) is what providers with prompt caching mark as
+    cacheable; the rest (recent chat, live state) is the volatile suffix. Appending keeps the split,
+    so ``context += "..."`` additions land in the suffix. Any other str operation yields a plain str.
+    """
+
+    stable_len: int
+
+    def __new__(cls, text: str, stable_len: int = 0) -> "PromptContext":
+        obj = super().__new__(cls, text)
+        obj.stable_len = max(0, min(int(stable_len), len(text)))
+        return obj
+
+    @classmethod
+    def from_parts(cls, stable: str, volatile: str) -> "PromptContext":
+        return cls(stable + volatile, len(stable))
+
+    def __add__(self, other: str) -> "PromptContext":
+        if not isinstance(other, str):
+            return NotImplemented
+        return PromptContext(str.__add__(self, other), self.stable_len)
+
+
+def split_prompt_context(context: str | None) -> tuple[str, str]:
+    """(stable prefix, volatile suffix); a plain str is all volatile."""
+    text = str(context or "")
+    stable_len = getattr(context, "stable_len", 0) or 0
+    return text[:stable_len], text[stable_len:]
+
+
 @dataclass
 class ProviderResponse:
     """Standardized response from an AI provider."""
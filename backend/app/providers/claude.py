@@ -6,9 +6,10 @@ from anthropic import AsyncAnthropic
 from app.providers.base import (
     BaseProvider, Message, ProviderResponse, ProviderError,
     TextDeltaCallback, StreamEventCallback,
-    emit_text_delta, emit_stream_event,
+    emit_text_delta, emit_stream_event, split_prompt_context,
 )
 from app.keys import get_api_key
+from app.providers.clients import get_sdk_client
 
 # Token budget for Claude's extended thinking feature per thinking level.
 # Higher budgets allow deeper reasoning but cost more tokens and increase latency.
@@ -21,6 +22,13 @@ _THINKING_BUDGET: dict[str, int] = {
     "xhigh":   16000,
 }
 
+# Prompt caching: Anthropic caches the request prefix up to each marked block (max 4 per request).
+# We mark the tool list, the stable system prefix, the volatile system suffix (identical across the
+# tool rounds of one turn) and, on tool rounds, the latest tool result.
+_CACHE_BREAKPOINT = {"type": "ephemeral"}
+_ANTHROPIC_TOOLS_CACHE_SIZE = 64
+_anthropic_tools_by_digest: dict[str, list[dict]] = {}
+
 
 class ClaudeProvider(BaseProvider):
     @property
@@ -119,8 +127,41 @@ class ClaudeProvider(BaseProvider):
             out.append({"role": "assistant" if role == "assistant" else "user", "content": str(content)})
         return out
 
+    @staticmethod
+    def _system_blocks(system: str | None) -> list[dict] | None:
+        """System prompt as text blocks with cache breakpoints after the stable prefix and at the end."""
+        blocks = [
+            {"type": "text", "text": part, "cache_control": dict(_CACHE_BREAKPOINT)}
+            for part in split_prompt_context(system)
+            if part.strip()
+        ]
+        return blocks or None
+
+    @staticmethod
+    def _mark_tool_round_breakpoint(msgs: list[dict]) -> None:
+        """On tool rounds, cache the conversation up to the latest tool result for the next round."""
+        if not msgs or msgs[-1]["role"] != "user" or not isinstance(msgs[-1]["content"], list):
+            return
+        last_block = msgs[-1]["content"][-1]
+        if last_block.get("type") == "tool_result":
+            last_block["cache_control"] = dict(_CACHE_BREAKPOINT)
+
+    @staticmethod
+    def _usage_tokens(usage) -> tuple[int, int, int, int]:
+        """(input, output, cache read, cache write) tokens from an Anthropic usage object."""
+        return (
+            getattr(usage, "input_tokens", 0) or 0,
+            getattr(usage, "output_tokens", 0) or 0,
+            getattr(usage, "cache_read_input_tokens", 0) or 0,
+            getattr(usage, "cache_creation_input_tokens", 0) or 0,
+        )
+
     @staticmethod
     def _to_anthropic_tools(openai_tools: list[dict] | None) -> list[dict]:
+        # Tool bundles (app.tool_bundle.ToolDefinitions) carry a digest: convert each one once.
+        digest = getattr(openai_tools, "digest", "")
+        if digest and digest in _anthropic_tools_by_digest:
+            return _anthropic_tools_by_digest[digest]
         tools: list[dict] = []
         for t in (openai_tools or []):
             fn = t.get("function") if isinstance(t, dict) else None
@@ -136,6 +177,12 @@ class ClaudeProvider(BaseProvider):
                     "input_schema": fn.get("parameters") or {"type": "object", "properties": {}},
                 }
             )
+        if tools:
+            tools[-1]["cache_control"] = dict(_CACHE_BREAKPOINT)
+        if digest:
+            if len(_anthropic_tools_by_digest) >= _ANTHROPIC_TOOLS_CACHE_SIZE:
+                _anthropic_tools_by_digest.pop(next(iter(_anthropic_tools_by_digest)))
+            _anthropic_tools_by_digest[digest] = tools
         return tools
 
     async def chat(self, messages: list[Message], **kwargs) -> ProviderResponse:
@@ -147,7 +194,7 @@ class ClaudeProvider(BaseProvider):
                 error_message="Anthropic API key not set. Add it in Settings (API keys) or in backend/.env as ANTHROPIC_API_KEY."
             )
         timeout = kwargs.get("timeout")
-        client = AsyncAnthropic(api_key=key, timeout=float(timeout) if timeout else 120.0)
+        client = get_sdk_client("claude", AsyncAnthropic, api_key=key, timeout=float(timeout) if timeout else 120.0)
         system = kwargs.get("context", "")
         image_bytes: bytes | None = kwargs.get("image_bytes")
         image_mime: str = (kwargs.get("image_mime") or "image/jpeg").strip() or "image/jpeg"
@@ -156,6 +203,7 @@ class ClaudeProvider(BaseProvider):
             image_b64 = base64.b64encode(image_bytes).decode("utf-8")
         pdf_documents: list[dict] | None = kwargs.get("pdf_documents")
         msgs = self._to_anthropic_messages(messages, image_b64=image_b64, image_mime=image_mime, pdf_documents=pdf_documents)
+        self._mark_tool_round_breakpoint(msgs)
         model = kwargs.get("model") or "claude-3-5-sonnet-20241022"
         tools = self._to_anthropic_tools(kwargs.get("tools"))
         thinking_level = str(kwargs.get("thinking_level") or "off").strip().lower()
@@ -165,7 +213,7 @@ class ClaudeProvider(BaseProvider):
             create_kwargs = dict(
                 model=model,
                 max_tokens=max_tokens,
-                system=system or None,
+                system=self._system_blocks(system),
                 messages=msgs,
             )
             if tools:
@@ -174,13 +222,14 @@ class ClaudeProvider(BaseProvider):
                 create_kwargs["thinking"] = {"type": "enabled", "budget_tokens": budget}
             r = await client.messages.create(**create_kwargs)
             # Capture token usage
-            _usage = getattr(r, "usage", None)
-            _in = getattr(_usage, "input_tokens", 0) or 0
-            _out = getattr(_usage, "output_tokens", 0) or 0
+            _in, _out, _cache_read, _cache_write = self._usage_tokens(getattr(r, "usage", None))
             if _in or _out:
                 try:
                     from app.db import get_db
-                    await get_db().record_usage("claude", model, _in, _out)
+                    await get_db().record_usage(
+                        "claude", model, _in, _out,
+                        cache_read_tokens=_cache_read, cache_write_tokens=_cache_write,
+                    )
                 except Exception:
                     pass
             text_blocks: list[str] = []
@@ -254,13 +303,14 @@ class ClaudeProvider(BaseProvider):
                 error=ProviderError.AUTH,
                 error_message="Anthropic API key not set. Add it in Settings (API keys) or in backend/.env as ANTHROPIC_API_KEY.",
             )
-        client = AsyncAnthropic(api_key=key)
+        client = get_sdk_client("claude", AsyncAnthropic, api_key=key)
         system = kwargs.get("context", "")
         image_bytes: bytes | None = kwargs.get("image_bytes")
         image_mime: str = (kwargs.get("image_mime") or "image/jpeg").strip() or "image/jpeg"
         image_b64 = base64.b64encode(image_bytes).decode() if image_bytes else None
         pdf_documents: list[dict] | None = kwargs.get("pdf_documents")
         msgs = self._to_anthropic_messages(messages, image_b64=image_b64, image_mime=image_mime, pdf_documents=pdf_documents)
+        self._mark_tool_round_breakpoint(msgs)
         model = kwargs.get("model") or "claude-3-5-sonnet-20241022"
         tools = self._to_anthropic_tools(kwargs.get("tools"))
         thinking_level = str(kwargs.get("thinking_level") or "off").strip().lower()
@@ -274,8 +324,9 @@ class ClaudeProvider(BaseProvider):
             "messages": msgs,
             "stream": True,
         }
-        if system:
-            create_kwargs["system"] = system
+        system_blocks = self._system_blocks(system)
+        if system_blocks:
+            create_kwargs["system"] = system_blocks
         if tools:
             create_kwargs["tools"] = tools
         if budget:
@@ -288,6 +339,8 @@ class ClaudeProvider(BaseProvider):
         cur_tool_id = cur_tool_name = cur_tool_args = ""
         _stream_in_tokens = 0
         _stream_out_tokens = 0
+        _stream_cache_read = 0
+        _stream_cache_write = 0
 
         try:
             stream = await client.messages.create(**create_kwargs)
@@ -295,7 +348,7 @@ class ClaudeProvider(BaseProvider):
                 etype = getattr(event, "type", "")
                 if etype == "message_start":
                     _u = getattr(getattr(event, "message", None), "usage", None)
-                    _stream_in_tokens = getattr(_u, "input_tokens", 0) or 0
+                    _stream_in_tokens, _, _stream_cache_read, _stream_cache_write = self._usage_tokens(_u)
                 elif etype == "message_delta":
                     _u = getattr(event, "usage", None)
                     _stream_out_tokens = getattr(_u, "output_tokens", 0) or 0
@@ -358,7 +411,10 @@ class ClaudeProvider(BaseProvider):
         if _stream_in_tokens or _stream_out_tokens:
             try:
                 from app.db import get_db
-                await get_db().record_usage("claude", model, _stream_in_tokens, _stream_out_tokens)
+                await get_db().record_usage(
+                    "claude", model, _stream_in_tokens, _stream_out_tokens,
+                    cache_read_tokens=_stream_cache_read, cache_write_tokens=_stream_cache_write,
+                )
             except Exception:
                 pass
         return ProviderResponse(content=content, tool_calls=tool_calls_list or None)
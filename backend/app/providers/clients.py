@@ -0,0 +1,228 @@
+"""Long-lived LLM provider clients, pooled by (provider, API key, base_url, timeout).
+
+Providers used to build a new AsyncAnthropic/AsyncOpenAI (or httpx.AsyncClient for Ollama) on every
+call, paying a fresh connection + TLS handshake on each tool round. Clients here are created once per
+key/endpoint and share one keep-alive httpx pool each (HTTP/2 via ``httpx[http2]``; HTTP/1.1 if ``h2``
+is missing).
+
+- ``get_sdk_client`` / ``get_http_client`` return the pooled client; the factory is looked up by the
+  caller at call time (so tests patching ``app.providers.openai.AsyncOpenAI`` still take effect).
+- Clients are bound to the event loop that created them and are rebuilt on a different loop.
+- ``invalidate_clients_for_key`` (an ``app.keys.on_api_key_change`` listener) drops pooled clients. A dropped
+  client is closed by a background sweep once it has been retired for ``RETIRED_GRACE_S`` (a caller may
+  have just been handed it) and its connection pool has no request in flight, and at the latest by
+  ``close_provider_clients`` (app shutdown).
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import time
+from typing import Any, Callable
+
+import httpx
+
+from app.keys import on_api_key_change
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (installed by httpx[http2]; enables HTTP/2 for provider connections)
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+
+POOL_MAX_CONNECTIONS = 20
+POOL_MAX_KEEPALIVE = 10
+POOL_KEEPALIVE_EXPIRY_S = 60.0
+# A retired client is closed once it is idle and has been retired this long; the sweep re-checks this often.
+RETIRED_GRACE_S = 5.0
+
+_REAL_ASYNC_CLIENT = httpx.AsyncClient
+
+# key -> (client, loop that created it, the httpx client it owns or None)
+_clients: dict[tuple, tuple[Any, asyncio.AbstractEventLoop, httpx.AsyncClient | None]] = {}
+# Dropped by invalidation or a loop change, with the time they were dropped; closed once idle (or on shutdown).
+_retired: list[tuple[tuple[Any, asyncio.AbstractEventLoop, httpx.AsyncClient | None], float]] = []
+_sweep_task: asyncio.Task | None = None
+
+
+def _new_http_client(timeout: float | None) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=HTTP2_ENABLED,
+        timeout=timeout if timeout is not None else httpx.Timeout(600.0, connect=10.0),
+        limits=httpx.Limits(
+            max_connections=POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=POOL_MAX_KEEPALIVE,
+            keepalive_expiry=POOL_KEEPALIVE_EXPIRY_S,
+        ),
+    )
+
+
+def _lookup(key: tuple, loop: asyncio.AbstractEventLoop) -> Any | None:
+    entry = _clients.get(key)
+    if entry is None:
+        return None
+    if entry[1] is loop:
+        return entry[0]
+    _clients.pop(key)
+    if not entry[1].is_closed():
+        _retire(entry)
+    return None
+
+
+def _retire(entry: tuple[Any, asyncio.AbstractEventLoop, httpx.AsyncClient | None]) -> None:
+    _retired.append((entry, time.monotonic()))
+
+
+def _has_active_requests(http: Any) -> bool:
+    """True while an httpx client's connection pool is serving or queueing a request."""
+    pool = getattr(getattr(http, "_transport", None), "_pool", None)
+    if pool is None:
+        return False
+    if getattr(pool, "_requests", None):
+        return True
+    return any(not conn.is_idle() for conn in getattr(pool, "connections", ()))
+
+
+async def _close_idle_retired() -> None:
+    """Close this loop's retired clients as they go idle; returns when none are left."""
+    loop = asyncio.get_running_loop()
+    while True:
+        waiting = False
+        for item in list(_retired):
+            entry, retired_at = item
+            client, entry_loop, http_client = entry
+            if entry_loop.is_closed():
+                _retired.remove(item)  # its connections went with the loop
+            elif entry_loop is not loop:
+                continue
+            elif (
+                time.monotonic() - retired_at < RETIRED_GRACE_S
+                or _has_active_requests(http_client if http_client is not None else client)
+            ):
+                waiting = True
+            else:
+                _retired.remove(item)
+                await _close_entry(*entry)
+        if not waiting:
+            return
+        await asyncio.sleep(RETIRED_GRACE_S)
+
+
+def _schedule_retired_sweep() -> None:
+    """Close retired clients that have finished their requests, in the background."""
+    global _sweep_task
+    if not _retired:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if _sweep_task is not None and not _sweep_task.done() and _sweep_task.get_loop() is loop:
+        return
+    _sweep_task = loop.create_task(_close_idle_retired())
+
+
+def get_sdk_client(
+    provider: str,
+    factory: Callable[..., Any],
+    *,
+    api_key: str,
+    base_url: str | None = None,
+    timeout: float | None = None,
+    **options: Any,
+) -> Any:
+    """Pooled ``factory(api_key=..., base_url=..., timeout=..., http_client=...)`` (AsyncOpenAI / AsyncAnthropic)."""
+    loop = asyncio.get_running_loop()
+    _schedule_retired_sweep()
+    key = (provider, factory, api_key, base_url, timeout, repr(sorted(options.items())))
+    client = _lookup(key, loop)
+    if client is not None:
+        return client
+    http_client = _new_http_client(timeout)
+    kwargs: dict[str, Any] = dict(options, api_key=api_key, http_client=http_client)
+    if base_url is not None:
+        kwargs["base_url"] = base_url
+    if timeout is not None:
+        kwargs["timeout"] = timeout
+    client = factory(**kwargs)
+    _clients[key] = (client, loop, http_client)
+    return client
+
+
+def get_http_client(provider: str, base_url: str, timeout: float) -> httpx.AsyncClient:
+    """Pooled keep-alive httpx client for providers that speak HTTP directly (Ollama)."""
+    loop = asyncio.get_running_loop()
+    _schedule_retired_sweep()
+    factory = httpx.AsyncClient
+    key = (provider, factory, None, base_url, timeout, "")
+    client = _lookup(key, loop)
+    if client is not None:
+        return client
+    if factory is _REAL_ASYNC_CLIENT:
+        client = _new_http_client(timeout)
+    else:
+        client = factory(timeout=timeout)
+    _clients[key] = (client, loop, None)
+    return client
+
+
+# Stored API key name -> provider whose pooled clients it authenticates.
+KEY_PROVIDERS = {
+    "anthropic_api_key": "claude",
+    "openai_api_key": "openai",
+    "groq_api_key": "groq",
+    "gemini_api_key": "google",
+    "google_ai_key": "google",
+    "openrouter_api_key": "openrouter",
+}
+
+
+def invalidate_provider_clients(provider: str | None = None) -> int:
+    """Drop pooled clients (all, or one provider's) so the next call builds them with current keys."""
+    keys = [k for k in _clients if provider is None or k[0] == provider]
+    for k in keys:
+        _retire(_clients.pop(k))
+    _schedule_retired_sweep()
+    return len(keys)
+
+
+def invalidate_clients_for_key(key_name: str) -> int:
+    provider = KEY_PROVIDERS.get(key_name)
+    return invalidate_provider_clients(provider) if provider else 0
+
+
+on_api_key_change(invalidate_clients_for_key)
+
+
+def pool_stats() -> dict[str, int]:
+    return {"clients": len(_clients), "retired": len(_retired), "http2": int(HTTP2_ENABLED)}
+
+
+async def _close_entry(client: Any, loop: asyncio.AbstractEventLoop, http_client: httpx.AsyncClient | None) -> None:
+    if loop is not asyncio.get_running_loop():
+        return  # connections belong to another (likely closed) loop; nothing safe to await here
+    for closable in (http_client, client):
+        aclose = getattr(closable, "aclose", None) or getattr(closable, "close", None)
+        if aclose is None:
+            continue
+        try:
+            result = aclose()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            logger.debug("Closing provider client failed: %s", e)
+
+
+async def close_provider_clients() -> None:
+    """Close every pooled and retired client (app shutdown)."""
+    global _sweep_task
+    sweep, _sweep_task = _sweep_task, None
+    if sweep is not None and not sweep.done():
+        sweep.cancel()
+        await asyncio.gather(sweep, return_exceptions=True)
+    entries = list(_clients.values()) + [entry for entry, _ in _retired]
+    _clients.clear()
+    _retired.clear()
+    for entry in entries:
+        await _close_entry(*entry)
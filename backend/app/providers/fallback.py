@@ -2,10 +2,17 @@
 Inspired by OpenClaw's model-fallback.ts — adapted for Asta's Python stack.
 """
 from __future__ import annotations
+import asyncio
 import logging
+import time
 
+from app.config import get_settings
+from app.keys import ensure_api_keys_loaded, get_stored_api_key_sync
 from app.provider_flow import (
+    adaptive_provider_order,
     classify_provider_disable_reason,
+    is_provider_degraded,
+    normalize_provider_flow_mode,
     resolve_main_provider_order,
 )
 from app.providers.base import (
@@ -26,8 +33,14 @@ async def get_available_fallback_providers(
     db,
     user_id: str,
     exclude_provider: str,
+    flow_mode: str = "fixed",
 ) -> list[str]:
-    """Return fixed-order fallback providers that are configured and active."""
+    """Return fallback providers that are configured and active.
+
+    ``fixed`` keeps MAIN_PROVIDER_CHAIN order. ``adaptive`` orders them by observed latency and error
+    rate and skips degraded providers, unless every candidate is degraded.
+    """
+    await ensure_api_keys_loaded()
     ordered = resolve_main_provider_order(exclude_provider)
     states = await db.get_provider_runtime_states(user_id, ordered)
     available: list[str] = []
@@ -39,13 +52,19 @@ async def get_available_fallback_providers(
             continue
         if bool(state.get("auto_disabled", False)):
             continue
-        if await _provider_has_key(db, provider_name):
+        if _provider_has_key(provider_name):
             available.append(provider_name)
+    if normalize_provider_flow_mode(flow_mode) == "adaptive" and available:
+        available = adaptive_provider_order(available, states)
+        healthy = [p for p in available if not is_provider_degraded(states.get(p) or {})]
+        if healthy and len(healthy) < len(available):
+            logger.info("Adaptive flow skipping degraded provider(s): %s", sorted(set(available) - set(healthy)))
+            available = healthy
     return available
 
 
-async def _provider_has_key(db, provider_name: str) -> bool:
-    """Check if a provider has its API key configured."""
+def _provider_has_key(provider_name: str) -> bool:
+    """Check if a provider has its API key stored (process key cache; no DB read)."""
     key_map = {
         "claude": "anthropic_api_key",
         "google": "gemini_api_key",
@@ -57,7 +76,7 @@ async def _provider_has_key(db, provider_name: str) -> bool:
         return provider_name == "ollama"  # Ollama is always "available" (but might not be running)
     if key_name is None:
         return False
-    val = await db.get_stored_api_key(key_name)
+    val = get_stored_api_key_sync(key_name)
     return bool(val and val.strip())
 
 
@@ -80,18 +99,24 @@ async def _runtime_provider_allowed(runtime_db, user_id: str, provider_name: str
     return True, ""
 
 
-async def _runtime_mark_success(runtime_db, user_id: str, provider_name: str) -> None:
+async def _runtime_mark_success(
+    runtime_db, user_id: str, provider_name: str, response: ProviderResponse, model=None
+) -> None:
     if not runtime_db or not user_id:
         return
+    await _runtime_record_call(runtime_db, user_id, provider_name, model, response)
     try:
         await runtime_db.clear_provider_auto_disabled(user_id, provider_name)
     except Exception as e:
         logger.debug("Failed clearing auto-disable for provider %s: %s", provider_name, e)
 
 
-async def _runtime_mark_failure(runtime_db, user_id: str, provider_name: str, response: ProviderResponse) -> None:
+async def _runtime_mark_failure(
+    runtime_db, user_id: str, provider_name: str, response: ProviderResponse, model=None
+) -> None:
     if not runtime_db or not user_id or not response.error:
         return
+    await _runtime_record_call(runtime_db, user_id, provider_name, model, response)
     reason = classify_provider_disable_reason(
         provider_error=response.error,
         error_message=response.error_message,
@@ -110,6 +135,137 @@ async def _runtime_mark_failure(runtime_db, user_id: str, provider_name: str, re
         logger.debug("Failed auto-disabling provider %s: %s", provider_name, e)
 
 
+def _stamp_timing(response: ProviderResponse, started: float, first_delta_at: float | None = None) -> ProviderResponse:
+    response.meta["latency_ms"] = (time.monotonic() - started) * 1000.0
+    if first_delta_at is not None:
+        response.meta["ttft_ms"] = (first_delta_at - started) * 1000.0
+    return response
+
+
+async def _runtime_record_call(
+    runtime_db, user_id: str, provider_name: str, model, response: ProviderResponse
+) -> None:
+    """Feed the provider's rolling latency/error stats (adaptive flow mode reads them)."""
+    if not runtime_db or not user_id:
+        return
+    try:
+        await runtime_db.record_provider_call(
+            user_id,
+            provider_name,
+            model=str(model or ""),
+            ok=not response.error,
+            latency_ms=response.meta.get("latency_ms"),
+            ttft_ms=response.meta.get("ttft_ms"),
+        )
+    except Exception as e:
+        logger.debug("Failed recording call stats for provider %s: %s", provider_name, e)
+
+
+async def _runtime_record_hedge(runtime_db, user_id: str, winner: str, loser: str) -> None:
+    if not runtime_db or not user_id:
+        return
+    try:
+        await runtime_db.record_provider_hedge_outcome(user_id, winner, loser)
+    except Exception as e:
+        logger.debug("Failed recording hedge outcome %s over %s: %s", winner, loser, e)
+
+
+def _hedge_delay_s(override) -> float | None:
+    """Seconds to wait on the primary before hedging; None when hedging is off."""
+    if override is None:
+        override = (get_settings().asta_provider_hedge_ms or 0) / 1000.0
+    try:
+        delay = float(override)
+    except (TypeError, ValueError):
+        return None
+    return delay if delay > 0 else None
+
+
+def _fallback_kwargs(kwargs: dict, fallback_models, fb_name: str) -> dict:
+    fb_model = fallback_models.get(fb_name) if isinstance(fallback_models, dict) else None
+    fb_kwargs = {**kwargs}
+    if fb_model:
+        fb_kwargs["model"] = fb_model
+    else:
+        fb_kwargs.pop("model", None)
+    return fb_kwargs
+
+
+async def _safe_chat(provider: BaseProvider, messages: list[Message], error_prefix: str, **kwargs) -> ProviderResponse:
+    started = time.monotonic()
+    try:
+        response = await provider.chat(messages, **kwargs)
+    except Exception as e:
+        return ProviderResponse(
+            content="",
+            error=ProviderError.TRANSIENT,
+            error_message=f"{error_prefix}{str(e)}",
+        )
+    return _stamp_timing(response, started)
+
+
+async def _chat_hedged(
+    primary: BaseProvider,
+    messages: list[Message],
+    fallback_names: list[str],
+    fallback_models,
+    kwargs: dict,
+    runtime_db,
+    runtime_user_id: str,
+    delay_s: float,
+) -> tuple[ProviderResponse, BaseProvider | None, set[str]]:
+    """Run the primary; if it has not answered after ``delay_s``, race it against the next healthy fallback.
+
+    Returns (response, provider_used, fallback names already tried). The losing request is cancelled.
+    """
+    from app.providers.registry import get_provider
+
+    tasks: dict[asyncio.Task, tuple[BaseProvider, str | None]] = {
+        asyncio.create_task(_safe_chat(primary, messages, "", **kwargs)): (primary, kwargs.get("model")),
+    }
+    tried: set[str] = set()
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay_s)
+        if not done:
+            for fb_name in fallback_names:
+                if fb_name == primary.name:
+                    continue
+                fb_allowed, _ = await _runtime_provider_allowed(runtime_db, runtime_user_id, fb_name)
+                fb_provider = get_provider(fb_name) if fb_allowed else None
+                if not fb_provider:
+                    continue
+                logger.info("Primary provider %s slower than %.2fs, hedging with %s", primary.name, delay_s, fb_name)
+                tried.add(fb_name)
+                fb_kwargs = _fallback_kwargs(kwargs, fallback_models, fb_name)
+                hedge = _safe_chat(fb_provider, messages, f"{fb_name} exception: ", **fb_kwargs)
+                tasks[asyncio.create_task(hedge)] = (fb_provider, fb_kwargs.get("model"))
+                break
+
+        pending = set(tasks)
+        response: ProviderResponse | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in [t for t in tasks if t in done]:  # primary first on a tie
+                provider, model = tasks[task]
+                response = task.result()
+                if response.error:
+                    await _runtime_mark_failure(runtime_db, runtime_user_id, provider.name, response, model)
+                    continue
+                for other in pending:
+                    other.cancel()
+                await _runtime_mark_success(runtime_db, runtime_user_id, provider.name, response, model)
+                if len(tasks) > 1:
+                    loser = next(p for t, (p, _) in tasks.items() if t is not task)
+                    logger.info("Hedged request won by %s over %s", provider.name, loser.name)
+                    await _runtime_record_hedge(runtime_db, runtime_user_id, provider.name, loser.name)
+                return (response, provider, tried)
+        return (response, None, tried)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
 async def chat_with_fallback(
     primary: BaseProvider,
     messages: list[Message],
@@ -117,19 +273,33 @@ async def chat_with_fallback(
     **kwargs,
 ) -> tuple[ProviderResponse, BaseProvider | None]:
     """Try the primary provider, then each fallback. Returns (response, provider_used).
-    provider_used is the provider that produced the response (for tool-call follow-up); None on failure."""
+    provider_used is the provider that produced the response (for tool-call follow-up); None on failure.
+
+    With hedging on (``ASTA_PROVIDER_HEDGE_MS`` or the ``_hedge_after_s`` kwarg), a primary that has not
+    answered by the deadline is raced against the next healthy fallback; the first success wins.
+    """
     from app.providers.registry import get_provider
 
     fallback_models = kwargs.pop("_fallback_models", {})
     runtime_db = kwargs.pop("_runtime_db", None)
     runtime_user_id = str(kwargs.pop("_runtime_user_id", "") or "").strip()
+    hedge_delay_s = _hedge_delay_s(kwargs.pop("_hedge_after_s", None))
 
     primary_allowed, primary_reason = await _runtime_provider_allowed(runtime_db, runtime_user_id, primary.name)
 
     # Try primary
-    if primary_allowed:
+    tried: set[str] = set()
+    if primary_allowed and hedge_delay_s is not None and fallback_names:
+        response, used, tried = await _chat_hedged(
+            primary, messages, fallback_names, fallback_models, kwargs,
+            runtime_db, runtime_user_id, hedge_delay_s,
+        )
+        if used is not None:
+            return (response, used)
+    elif primary_allowed:
+        started = time.monotonic()
         try:
-            response = await primary.chat(messages, **kwargs)
+            response = _stamp_timing(await primary.chat(messages, **kwargs), started)
         except Exception as e:
             logger.error(f"Primary provider {primary.name} exception: {e}")
             response = ProviderResponse(
@@ -138,9 +308,9 @@ async def chat_with_fallback(
                 error_message=str(e)
             )
         if not response.error:
-            await _runtime_mark_success(runtime_db, runtime_user_id, primary.name)
+            await _runtime_mark_success(runtime_db, runtime_user_id, primary.name, response, kwargs.get("model"))
             return (response, primary)
-        await _runtime_mark_failure(runtime_db, runtime_user_id, primary.name, response)
+        await _runtime_mark_failure(runtime_db, runtime_user_id, primary.name, response, kwargs.get("model"))
     else:
         response = ProviderResponse(
             content="",
@@ -157,6 +327,8 @@ async def chat_with_fallback(
 
     last_response = response
     for i, fb_name in enumerate(fallback_names):
+        if fb_name in tried:
+            continue
         fb_allowed, fb_reason = await _runtime_provider_allowed(runtime_db, runtime_user_id, fb_name)
         if not fb_allowed:
             logger.info("Skipping fallback provider %s (%s)", fb_name, fb_reason or "disabled")
@@ -165,25 +337,13 @@ async def chat_with_fallback(
         if not fb_provider:
             logger.warning("Fallback provider '%s' not found, skipping", fb_name)
             continue
-        fb_model = fallback_models.get(fb_name) if isinstance(fallback_models, dict) else None
-        fb_kwargs = {**kwargs}
-        if fb_model:
-            fb_kwargs["model"] = fb_model
-        else:
-            fb_kwargs.pop("model", None)
-        try:
-            fb_response = await fb_provider.chat(messages, **fb_kwargs)
-        except Exception as e:
-            fb_response = ProviderResponse(
-                content="",
-                error=ProviderError.TRANSIENT,
-                error_message=f"{fb_name} exception: {str(e)}"
-            )
+        fb_kwargs = _fallback_kwargs(kwargs, fallback_models, fb_name)
+        fb_response = await _safe_chat(fb_provider, messages, f"{fb_name} exception: ", **fb_kwargs)
         if not fb_response.error:
-            await _runtime_mark_success(runtime_db, runtime_user_id, fb_name)
+            await _runtime_mark_success(runtime_db, runtime_user_id, fb_name, fb_response, fb_kwargs.get("model"))
             logger.info("Fallback %s succeeded (attempt %d/%d)", fb_name, i + 1, len(fallback_names))
             return (fb_response, fb_provider)
-        await _runtime_mark_failure(runtime_db, runtime_user_id, fb_name, fb_response)
+        await _runtime_mark_failure(runtime_db, runtime_user_id, fb_name, fb_response, fb_kwargs.get("model"))
         logger.warning("Fallback %s failed (%s), trying next", fb_name, fb_response.error.value)
         last_response = fb_response
 
@@ -210,17 +370,21 @@ async def chat_with_fallback_stream(
     fallback_models = kwargs.pop("_fallback_models", {})
     runtime_db = kwargs.pop("_runtime_db", None)
     runtime_user_id = str(kwargs.pop("_runtime_user_id", "") or "").strip()
+    kwargs.pop("_hedge_after_s", None)  # not hedged: two live streams would interleave their deltas
 
     async def _call_stream_capable(p, msgs, cb, stream_cb, **call_kwargs) -> ProviderResponse:
         await emit_stream_event(stream_cb, {"type": "message_start", "provider": p.name})
         saw_text = False
+        started = time.monotonic()
+        first_delta_at: float | None = None
 
         async def _forward_delta(delta: str) -> None:
-            nonlocal saw_text
+            nonlocal saw_text, first_delta_at
             if not delta:
                 return
             if not saw_text:
                 saw_text = True
+                first_delta_at = time.monotonic()
                 await emit_stream_event(stream_cb, {"type": "text_start", "provider": p.name})
             await emit_stream_event(
                 stream_cb,
@@ -234,6 +398,7 @@ async def chat_with_fallback_stream(
             out = await p.chat(msgs, **call_kwargs)
             if out.content:
                 await _forward_delta(out.content)
+        _stamp_timing(out, started, first_delta_at)
 
         if not out.error:
             if not saw_text and out.content:
@@ -273,9 +438,9 @@ async def chat_with_fallback_stream(
                 error_message=str(e)
             )
         if not response.error:
-            await _runtime_mark_success(runtime_db, runtime_user_id, primary.name)
+            await _runtime_mark_success(runtime_db, runtime_user_id, primary.name, response, kwargs.get("model"))
             return (response, primary)
-        await _runtime_mark_failure(runtime_db, runtime_user_id, primary.name, response)
+        await _runtime_mark_failure(runtime_db, runtime_user_id, primary.name, response, kwargs.get("model"))
     else:
         response = ProviderResponse(
             content="",
@@ -300,12 +465,7 @@ async def chat_with_fallback_stream(
         if not fb_provider:
             logger.warning("Fallback provider '%s' not found, skipping", fb_name)
             continue
-        fb_model = fallback_models.get(fb_name) if isinstance(fallback_models, dict) else None
-        fb_kwargs = {**kwargs}
-        if fb_model:
-            fb_kwargs["model"] = fb_model
-        else:
-            fb_kwargs.pop("model", None)
+        fb_kwargs = _fallback_kwargs(kwargs, fallback_models, fb_name)
         try:
             fb_response = await _call_stream_capable(
                 fb_provider,
@@ -321,10 +481,10 @@ async def chat_with_fallback_stream(
                 error_message=f"{fb_name} exception: {str(e)}"
             )
         if not fb_response.error:
-            await _runtime_mark_success(runtime_db, runtime_user_id, fb_name)
+            await _runtime_mark_success(runtime_db, runtime_user_id, fb_name, fb_response, fb_kwargs.get("model"))
             logger.info("Fallback %s (stream) succeeded (attempt %d/%d)", fb_name, i + 1, len(fallback_names))
             return (fb_response, fb_provider)
-        await _runtime_mark_failure(runtime_db, runtime_user_id, fb_name, fb_response)
+        await _runtime_mark_failure(runtime_db, runtime_user_id, fb_name, fb_response, fb_kwargs.get("model"))
         logger.warning("Fallback %s failed (%s), trying next", fb_name, fb_response.error.value)
         last_response = fb_response
 
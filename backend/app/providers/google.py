@@ -14,6 +14,7 @@ from app.providers.base import (
     merge_stream_tool_call_delta,
 )
 from app.keys import get_api_key
+from app.providers.clients import get_sdk_client
 
 logger = logging.getLogger(__name__)
 
@@ -40,11 +41,7 @@ def _clean(s: object) -> str:
 
 
 def _build_client(key: str, timeout: int) -> AsyncOpenAI:
-    return AsyncOpenAI(
-        api_key=key,
-        base_url=GOOGLE_BASE_URL,
-        timeout=timeout,
-    )
+    return get_sdk_client("google", AsyncOpenAI, api_key=key, base_url=GOOGLE_BASE_URL, timeout=timeout)
 
 
 def _build_msgs(messages: list[Message], system: str, image_bytes: bytes | None, image_mime: str) -> list[dict]:
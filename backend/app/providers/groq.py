@@ -11,6 +11,9 @@ from app.providers.base import (
     merge_stream_tool_call_delta,
 )
 from app.keys import get_api_key
+from app.providers.clients import get_sdk_client
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
 
 
 def _reasoning_effort_from_level(level: str | None) -> str | None:
@@ -42,7 +45,7 @@ class GroqProvider(BaseProvider):
                 error=ProviderError.AUTH,
                 error_message="Groq API key not set. Add it in Settings (API keys) or in backend/.env as GROQ_API_KEY."
             )
-        client = AsyncOpenAI(api_key=key, base_url="https://api.groq.com/openai/v1")
+        client = get_sdk_client("groq", AsyncOpenAI, api_key=key, base_url=GROQ_BASE_URL)
         system = kwargs.get("context", "")
         msgs = []
         for m in messages:
@@ -131,7 +134,7 @@ class GroqProvider(BaseProvider):
                 error=ProviderError.AUTH,
                 error_message="Groq API key not set. Add it in Settings (API keys) or in backend/.env as GROQ_API_KEY."
             )
-        client = AsyncOpenAI(api_key=key, base_url="https://api.groq.com/openai/v1")
+        client = get_sdk_client("groq", AsyncOpenAI, api_key=key, base_url=GROQ_BASE_URL)
         system = kwargs.get("context", "")
         msgs = []
         for m in messages:
@@ -18,6 +18,7 @@ from app.ollama_catalog import (
     resolve_ollama_model_name,
     sort_ollama_models_by_preference,
 )
+from app.providers.clients import get_http_client
 from app.providers.base import (
     BaseProvider,
     Message,
@@ -284,8 +285,8 @@ class OllamaProvider(BaseProvider):
                 payload["tools"] = ollama_tools
 
             try:
-                async with httpx.AsyncClient(timeout=_REQUEST_TIMEOUT_SECONDS) as client:
-                    resp = await client.post(f"{base}/api/chat", json=payload)
+                client = get_http_client("ollama", base, _REQUEST_TIMEOUT_SECONDS)
+                resp = await client.post(f"{base}/api/chat", json=payload)
                 if resp.status_code >= 400:
                     msg = resp.text[:500]
                     last_error = f"Ollama model '{model}' failed: {msg}"
@@ -365,48 +366,48 @@ class OllamaProvider(BaseProvider):
             # Track if we're in a thinking block for streaming
             is_thinking = False
             try:
-                async with httpx.AsyncClient(timeout=_STREAM_TIMEOUT_SECONDS) as client:
-                    async with client.stream("POST", f"{base}/api/chat", json=payload) as resp:
-                        if resp.status_code >= 400:
-                            msg = (await resp.aread()).decode("utf-8", errors="ignore")[:500]
-                            raise RuntimeError(f"Ollama model '{model}' failed: {msg}")
-                        async for line in resp.aiter_lines():
-                            line = (line or "").strip()
-                            if not line:
-                                continue
-                            try:
-                                chunk = json.loads(line)
-                            except Exception:
-                                logger.debug("Skipping malformed Ollama stream line: %s", line[:120])
-                                continue
-                            msg = chunk.get("message") if isinstance(chunk, dict) else {}
+                client = get_http_client("ollama", base, _STREAM_TIMEOUT_SECONDS)
+                async with client.stream("POST", f"{base}/api/chat", json=payload) as resp:
+                    if resp.status_code >= 400:
+                        msg = (await resp.aread()).decode("utf-8", errors="ignore")[:500]
+                        raise RuntimeError(f"Ollama model '{model}' failed: {msg}")
+                    async for line in resp.aiter_lines():
+                        line = (line or "").strip()
+                        if not line:
+                            continue
+                        try:
+                            chunk = json.loads(line)
+                        except Exception:
+                            logger.debug("Skipping malformed Ollama stream line: %s", line[:120])
+                            continue
+                        msg = chunk.get("message") if isinstance(chunk, dict) else {}
                             
-                            # Extract thinking delta for streaming (like OpenRouter does)
-                            thinking_delta = str((msg or {}).get("thinking") or "")
-                            if thinking_delta:
-                                if not is_thinking:
-                                    # Start thinking block
-                                    content_parts.append("<think>")
-                                    await emit_text_delta(on_text_delta, "<think>")
-                                    is_thinking = True
-                                content_parts.append(thinking_delta)
-                                await emit_text_delta(on_text_delta, thinking_delta)
+                        # Extract thinking delta for streaming (like OpenRouter does)
+                        thinking_delta = str((msg or {}).get("thinking") or "")
+                        if thinking_delta:
+                            if not is_thinking:
+                                # Start thinking block
+                                content_parts.append("<think>")
+                                await emit_text_delta(on_text_delta, "<think>")
+                                is_thinking = True
+                            content_parts.append(thinking_delta)
+                            await emit_text_delta(on_text_delta, thinking_delta)
                             
-                            delta = str((msg or {}).get("content") or "")
-                            if delta:
-                                if is_thinking:
-                                    # Close thinking block before content
-                                    content_parts.append("</think>")
-                                    await emit_text_delta(on_text_delta, "</think>")
-                                    is_thinking = False
-                                content_parts.append(delta)
-                                await emit_text_delta(on_text_delta, delta)
+                        delta = str((msg or {}).get("content") or "")
+                        if delta:
+                            if is_thinking:
+                                # Close thinking block before content
+                                content_parts.append("</think>")
+                                await emit_text_delta(on_text_delta, "</think>")
+                                is_thinking = False
+                            content_parts.append(delta)
+                            await emit_text_delta(on_text_delta, delta)
                             
-                            tc = (msg or {}).get("tool_calls")
-                            if isinstance(tc, list):
-                                raw_tool_calls.extend(tc)
-                            if chunk.get("done"):
-                                break
+                        tc = (msg or {}).get("tool_calls")
+                        if isinstance(tc, list):
+                            raw_tool_calls.extend(tc)
+                        if chunk.get("done"):
+                            break
                 
                 # Close thinking tag if stream ended while thinking
                 if is_thinking:
@@ -13,6 +13,7 @@ from app.providers.base import (
     merge_stream_tool_call_delta,
 )
 from app.keys import get_api_key
+from app.providers.clients import get_sdk_client
 
 DEFAULT_MODEL = "gpt-4o-mini"
 
@@ -46,7 +47,7 @@ class OpenAIProvider(BaseProvider):
                 error=ProviderError.AUTH,
                 error_message="OpenAI API key not set. Add it in Settings (API keys) or in backend/.env as OPENAI_API_KEY."
             )
-        client = AsyncOpenAI(api_key=key)
+        client = get_sdk_client("openai", AsyncOpenAI, api_key=key)
         system = kwargs.get("context", "")
         image_bytes: bytes | None = kwargs.get("image_bytes")
         image_mime: str | None = kwargs.get("image_mime", "image/jpeg")
@@ -143,7 +144,7 @@ class OpenAIProvider(BaseProvider):
                 error=ProviderError.AUTH,
                 error_message="OpenAI API key not set. Add it in Settings (API keys) or in backend/.env as OPENAI_API_KEY."
             )
-        client = AsyncOpenAI(api_key=key)
+        client = get_sdk_client("openai", AsyncOpenAI, api_key=key)
         system = kwargs.get("context", "")
         image_bytes: bytes | None = kwargs.get("image_bytes")
         image_mime: str | None = kwargs.get("image_mime", "image/jpeg")
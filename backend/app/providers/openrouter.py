@@ -22,6 +22,7 @@ from app.providers.base import (
     merge_stream_tool_call_delta,
 )
 from app.keys import get_api_key
+from app.providers.clients import get_sdk_client
 from app.model_policy import (
     OPENROUTER_DEFAULT_MODEL_CHAIN,
     classify_openrouter_model_csv,
@@ -204,7 +205,9 @@ class OpenRouterProvider(BaseProvider):
                 error_message="OpenRouter API key not set. Add it in Settings (API keys) or in backend/.env as OPENROUTER_API_KEY. Get a key at https://openrouter.ai/keys"
             )
         timeout = kwargs.get("timeout") or MODEL_TIMEOUT
-        client = AsyncOpenAI(
+        client = get_sdk_client(
+            "openrouter",
+            AsyncOpenAI,
             api_key=key or "test-openrouter-key",
             base_url=BASE_URL,
             timeout=timeout,
@@ -369,7 +372,9 @@ class OpenRouterProvider(BaseProvider):
                 error_message="OpenRouter API key not set. Add it in Settings (API keys) or in backend/.env as OPENROUTER_API_KEY. Get a key at https://openrouter.ai/keys"
             )
         timeout = kwargs.get("timeout") or MODEL_TIMEOUT
-        client = AsyncOpenAI(
+        client = get_sdk_client(
+            "openrouter",
+            AsyncOpenAI,
             api_key=key or "test-openrouter-key",
             base_url=BASE_URL,
             timeout=timeout,
@@ -0,0 +1,192 @@
+"""RAG chunking: split documents into overlapping, token-budgeted chunks that carry source offsets.
+
+Chunkers are registered by name (``CHUNKERS`` / ``register_chunker``); ``chunk_text`` picks one.
+Every chunk's text is ``text[start:end]`` of the original document, so overlapping chunks can be
+stitched back together (``stitch_chunks``) without duplicating content.
+
+- ``structured`` (default): markdown-aware. Fenced code blocks stay whole when they fit, headings
+  start a new chunk, paragraphs are packed together, oversize paragraphs split at sentence ends.
+- ``fixed``: legacy fixed-width character windows (no overlap).
+"""
+from __future__ import annotations
+import math
+import re
+from dataclasses import dataclass
+from typing import Callable
+
+from app.compaction import estimate_tokens
+
+CHARS_PER_TOKEN = 4
+FIXED_CHUNK_CHARS = 500
+
+_FENCE_RE = re.compile(r"^(```|~~~)[^\n]*\n.*?^\1[^\n]*$", re.MULTILINE | re.DOTALL)
+_PARAGRAPH_RE = re.compile(r"(?:[^\n]*\S[^\n]*(?:\n|$))+")
+_HEADING_RE = re.compile(r"#{1,6}\s")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass(frozen=True)
+class Chunk:
+    text: str
+    start: int
+    end: int
+
+
+@dataclass(frozen=True)
+class _Unit:
+    start: int
+    end: int
+    heading: bool = False
+
+
+Chunker = Callable[[str, int, int], list[Chunk]]
+
+
+def count_tokens(text: str) -> int:
+    """Heuristic token count (``app.tokenizer``), floored by chars/4 so chunk sizes stay conservative."""
+    return max(estimate_tokens(text), math.ceil(len(text) / CHARS_PER_TOKEN))
+
+
+def _hard_split(text: str, start: int, end: int, max_tokens: int) -> list[_Unit]:
+    step = max(1, max_tokens * CHARS_PER_TOKEN)
+    out = []
+    i = start
+    while i < end:
+        j = min(end, i + step)
+        # Back off to the last whitespace so words are not cut, unless that would leave a tiny piece.
+        if j < end:
+            ws = text.rfind(" ", i + step // 2, j)
+            if ws > i:
+                j = ws + 1
+        while j > i + 1 and count_tokens(text[i:j]) > max_tokens:
+            j = i + max(1, (j - i) * 3 // 4)
+        out.append(_Unit(i, j))
+        i = j
+    return out
+
+
+def _split_oversize(text: str, start: int, end: int, max_tokens: int) -> list[_Unit]:
+    """Split an oversize span at sentence ends, falling back to hard splits for sentences that still don't fit."""
+    out: list[_Unit] = []
+    pos = start
+    bounds = [m.end() + start for m in _SENTENCE_END_RE.finditer(text[start:end])] + [end]
+    for b in bounds:
+        if b <= pos:
+            continue
+        if count_tokens(text[pos:b]) <= max_tokens:
+            out.append(_Unit(pos, b))
+        else:
+            out.extend(_hard_split(text, pos, b, max_tokens))
+        pos = b
+    return out
+
+
+def _units(text: str, max_tokens: int) -> list[_Unit]:
+    """Atomic pieces to pack: code blocks, paragraphs (flagged when they open with a heading), or their splits."""
+    spans: list[tuple[int, int, bool]] = []  # (start, end, is_code)
+    pos = 0
+    for m in _FENCE_RE.finditer(text):
+        if m.start() > pos:
+            spans.append((pos, m.start(), False))
+        spans.append((m.start(), m.end(), True))
+        pos = m.end()
+    if pos < len(text):
+        spans.append((pos, len(text), False))
+
+    units: list[_Unit] = []
+    for s, e, is_code in spans:
+        if is_code:
+            if count_tokens(text[s:e]) <= max_tokens:
+                units.append(_Unit(s, e))
+            else:
+                units.extend(_hard_split(text, s, e, max_tokens))
+            continue
+        for m in _PARAGRAPH_RE.finditer(text, s, e):
+            ps, pe = m.start(), m.end()
+            while pe > ps and text[pe - 1] == "\n":
+                pe -= 1
+            if pe <= ps:
+                continue
+            heading = bool(_HEADING_RE.match(text, ps))
+            if count_tokens(text[ps:pe]) <= max_tokens:
+                units.append(_Unit(ps, pe, heading))
+                continue
+            parts = _split_oversize(text, ps, pe, max_tokens)
+            if parts and heading:
+                parts[0] = _Unit(parts[0].start, parts[0].end, True)
+            units.extend(parts)
+    return units
+
+
+def structured_chunks(text: str, max_tokens: int, overlap_tokens: int) -> list[Chunk]:
+    """Greedy packing of structural units up to max_tokens, repeating up to overlap_tokens of trailing units."""
+    units = _units(text, max_tokens)
+    if not units:
+        return [Chunk(text, 0, len(text))] if text else []
+    chunks: list[Chunk] = []
+
+    def _span_tokens(start: int, end: int) -> int:
+        return count_tokens(text[start:end])
+
+    def _carry(us: list[_Unit]) -> list[_Unit]:
+        """Trailing units (never the whole chunk) that fit in the overlap budget."""
+        carried: list[_Unit] = []
+        for u in reversed(us[1:]):
+            if _span_tokens(u.start, us[-1].end) > overlap_tokens:
+                break
+            carried.insert(0, u)
+        return carried
+
+    current: list[_Unit] = []
+    for unit in units:
+        if current and (unit.heading or _span_tokens(current[0].start, unit.end) > max_tokens):
+            chunks.append(Chunk(text[current[0].start : current[-1].end], current[0].start, current[-1].end))
+            current = [] if unit.heading else _carry(current)
+            while current and _span_tokens(current[0].start, unit.end) > max_tokens:
+                current.pop(0)
+        current.append(unit)
+    if current:
+        chunks.append(Chunk(text[current[0].start : current[-1].end], current[0].start, current[-1].end))
+    return chunks
+
+
+def fixed_chunks(text: str, max_tokens: int = 0, overlap_tokens: int = 0) -> list[Chunk]:
+    """Fixed FIXED_CHUNK_CHARS windows; the budget arguments are ignored."""
+    if len(text) <= FIXED_CHUNK_CHARS:
+        return [Chunk(text, 0, len(text))]
+    return [
+        Chunk(text[i : i + FIXED_CHUNK_CHARS], i, min(len(text), i + FIXED_CHUNK_CHARS))
+        for i in range(0, len(text), FIXED_CHUNK_CHARS)
+    ]
+
+
+CHUNKERS: dict[str, Chunker] = {
+    "structured": structured_chunks,
+    "fixed": fixed_chunks,
+}
+
+
+def register_chunker(name: str, chunker: Chunker) -> None:
+    CHUNKERS[name.strip().lower()] = chunker
+
+
+def chunk_text(text: str, strategy: str, max_tokens: int, overlap_tokens: int) -> list[Chunk]:
+    chunker = CHUNKERS.get((strategy or "").strip().lower()) or CHUNKERS["structured"]
+    max_tokens = max(1, int(max_tokens))
+    overlap_tokens = max(0, min(int(overlap_tokens), max_tokens // 2))
+    return chunker(text, max_tokens, overlap_tokens)
+
+
+def stitch_chunks(chunks: list[tuple[int, int, str]]) -> str:
+    """Rebuild a document from (start, end, text) chunks, skipping overlapped ranges.
+    Gaps between non-adjacent chunks (dropped blank lines) become a paragraph break."""
+    out: list[str] = []
+    covered = 0
+    for start, end, chunk in sorted(chunks, key=lambda c: (c[0], c[1])):
+        if end <= covered:
+            continue
+        if out and start > covered:
+            out.append("\n\n")
+        out.append(chunk[max(0, covered - start) :])
+        covered = end
+    return "".join(out)
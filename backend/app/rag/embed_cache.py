@@ -0,0 +1,129 @@
+"""Content-addressed embedding cache: (model, sha256(text)) -> vector, persisted in SQLite next to rag_fts.db.
+
+Re-ingesting the same snippets, topic updates and repeated query strings reuse stored vectors
+instead of calling Ollama again. Least-recently-used rows are evicted past ``max_entries``.
+Methods are blocking; async callers run them with ``asyncio.to_thread``.
+"""
+from __future__ import annotations
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+
+from app.rag.service import FTS_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+EMBED_CACHE_PATH = os.environ.get(
+    "ASTA_RAG_EMBED_CACHE_PATH",
+    str(Path(FTS_DB_PATH).with_name("rag_embed_cache.db")),
+)
+EMBED_CACHE_MAX_ENTRIES = max(0, int(os.environ.get("ASTA_RAG_EMBED_CACHE_MAX_ENTRIES", "100000")))
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str, max_entries: int = EMBED_CACHE_MAX_ENTRIES) -> None:
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embedding_cache (
+                model TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, digest)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embedding_cache_lru ON embedding_cache(last_used)")
+        self._conn.commit()
+        # Row count as of the last recount; put_many only rescans when it could pass max_entries.
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, texts: list[str]) -> list[list[float] | None]:
+        """Cached vector per text (None on miss). Hits are marked as recently used."""
+        if not texts:
+            return []
+        digests = [text_digest(t) for t in texts]
+        unique = list(dict.fromkeys(digests))
+        found: dict[str, list[float]] = {}
+        with self._lock:
+            for i in range(0, len(unique), 500):
+                part = unique[i : i + 500]
+                rows = self._conn.execute(
+                    f"SELECT digest, vector FROM embedding_cache WHERE model = ? AND digest IN ({','.join('?' * len(part))})",
+                    (model, *part),
+                ).fetchall()
+                for digest, blob in rows:
+                    found[digest] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embedding_cache SET last_used = ? WHERE model = ? AND digest = ?",
+                    [(now, model, d) for d in found],
+                )
+                self._conn.commit()
+            out = [found.get(d) for d in digests]
+            hit = sum(1 for v in out if v is not None)
+            self.hits += hit
+            self.misses += len(out) - hit
+        return out
+
+    def put_many(self, model: str, texts: list[str], vectors: list[list[float]]) -> None:
+        """Store non-empty vectors; once the cache may exceed max_entries, evict the least recently used rows."""
+        now = time.time()
+        rows = [
+            (model, text_digest(t), array("f", v).tobytes(), now)
+            for t, v in zip(texts, vectors)
+            if v
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embedding_cache (model, digest, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._entries += len(rows)
+            if self._max_entries and self._entries > self._max_entries:
+                self._entries = self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+                excess = self._entries - self._max_entries
+                if excess > 0:
+                    self._conn.execute(
+                        """DELETE FROM embedding_cache WHERE rowid IN (
+                            SELECT rowid FROM embedding_cache ORDER BY last_used LIMIT ?
+                        )""",
+                        (excess,),
+                    )
+                    self._entries = self._max_entries
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+            return {"entries": entries, "max_entries": self._max_entries, "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_cache: EmbeddingCache | None = None
+
+
+def get_embed_cache() -> EmbeddingCache:
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache(EMBED_CACHE_PATH)
+    return _cache
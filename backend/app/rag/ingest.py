@@ -0,0 +1,274 @@
+"""Streaming bulk ingest for RAG: spool an upload to disk, then chunk/embed/upsert it in the background.
+
+The request only streams the body into a temp file (bounded memory, no long-running request), and a job
+processes the spool one segment at a time, so embedding and Chroma writes pace how fast the file is read.
+Spool reads and chunking run in a worker thread. Backpressure on the upload itself is the
+``INGEST_MAX_BYTES`` cap plus ``INGEST_MAX_CONCURRENT_JOBS``: the body is spooled in full before its job
+starts, so the client gets its job id without waiting for embedding.
+
+Body formats:
+- text (default): one document. Read in ~INGEST_SEGMENT_CHARS segments cut at paragraph breaks; chunk
+  offsets are relative to the whole document so get_topic_content can rebuild it. Without ``doc_id``
+  the document id is derived from the content (as ``RAGService.add`` does), so re-uploads replace
+  rather than duplicate.
+- NDJSON (``application/x-ndjson``): one ``{"text", "topic"?, "doc_id"?}`` record per line, each added
+  as its own document. Records are stored ``INGEST_NDJSON_BATCH_RECORDS`` at a time (``RAGService.add_many``);
+  if a batch fails, its records are retried one by one so errors are reported per line.
+"""
+from __future__ import annotations
+import asyncio
+import codecs
+import hashlib
+import itertools
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import IO, AsyncIterator, Iterator
+
+from app.rag.chunking import Chunk
+
+logger = logging.getLogger(__name__)
+
+try:
+    INGEST_MAX_BYTES = int(os.environ.get("ASTA_RAG_INGEST_MAX_BYTES", str(64 * 1024 * 1024)) or 64 * 1024 * 1024)
+except ValueError:
+    INGEST_MAX_BYTES = 64 * 1024 * 1024
+INGEST_SEGMENT_CHARS = 64 * 1024
+INGEST_MAX_CONCURRENT_JOBS = 2
+# NDJSON records embedded and stored together (one Chroma upsert and FTS commit per batch)
+INGEST_NDJSON_BATCH_RECORDS = 64
+_SPOOL_MEMORY_BYTES = 1024 * 1024
+_READ_BYTES = 64 * 1024
+_MAX_TRACKED_JOBS = 50
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+
+class IngestTooLarge(Exception):
+    pass
+
+
+@dataclass
+class IngestJob:
+    job_id: str
+    topic: str | None
+    doc_id: str | None
+    format: str
+    status: str = "queued"  # queued | running | done | error
+    bytes_total: int = 0
+    bytes_done: int = 0
+    documents_done: int = 0
+    chunks_done: int = 0
+    errors: list[str] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+
+    def to_dict(self) -> dict:
+        out = asdict(self)
+        out["progress"] = round(self.bytes_done / self.bytes_total, 4) if self.bytes_total else 0.0
+        return out
+
+
+_jobs: OrderedDict[str, IngestJob] = OrderedDict()
+_tasks: set[asyncio.Task] = set()
+_job_slots: asyncio.Semaphore | None = None
+
+
+def get_ingest_job(job_id: str) -> IngestJob | None:
+    return _jobs.get(job_id)
+
+
+def _track(job: IngestJob) -> None:
+    _jobs[job.job_id] = job
+    while len(_jobs) > _MAX_TRACKED_JOBS:
+        oldest = next(iter(_jobs.values()))
+        if oldest.status in ("queued", "running"):
+            break
+        _jobs.popitem(last=False)
+
+
+async def spool_upload(chunks: AsyncIterator[bytes], max_bytes: int | None = None) -> tuple[IO[bytes], int]:
+    """Copy a streamed body to a temp file (in memory up to 1 MB). Raises IngestTooLarge past max_bytes
+    (default INGEST_MAX_BYTES)."""
+    max_bytes = INGEST_MAX_BYTES if max_bytes is None else max_bytes
+    spool = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MEMORY_BYTES)
+    total = 0
+    try:
+        async for part in chunks:
+            total += len(part)
+            if total > max_bytes:
+                raise IngestTooLarge(f"Upload exceeds {max_bytes} bytes")
+            spool.write(part)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool, total
+
+
+def _text_segments(spool: IO[bytes], job: IngestJob) -> Iterator[tuple[int, str]]:
+    """Yield (char offset, text) segments, cutting at the last paragraph (else line) break in each window."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buf = ""
+    offset = 0
+    while True:
+        raw = spool.read(_READ_BYTES)
+        job.bytes_done += len(raw)
+        buf += decoder.decode(raw, final=not raw)
+        while len(buf) >= INGEST_SEGMENT_CHARS or (not raw and buf):
+            if not raw and len(buf) <= INGEST_SEGMENT_CHARS:
+                cut = len(buf)
+            else:
+                window = buf[:INGEST_SEGMENT_CHARS]
+                cut = window.rfind("\n\n") + 2
+                if cut < INGEST_SEGMENT_CHARS // 2:
+                    cut = window.rfind("\n") + 1
+                if cut < INGEST_SEGMENT_CHARS // 2:
+                    cut = INGEST_SEGMENT_CHARS
+            yield offset, buf[:cut]
+            offset += cut
+            buf = buf[cut:]
+        if not raw:
+            return
+
+
+def _spool_sha1(spool: IO[bytes]) -> str:
+    h = hashlib.sha1()
+    for block in iter(lambda: spool.read(_READ_BYTES), b""):
+        h.update(block)
+    spool.seek(0)
+    return h.hexdigest()
+
+
+def _take(items: Iterator, n: int) -> list:
+    return list(itertools.islice(items, n))
+
+
+def _segment_chunks(spool: IO[bytes], job: IngestJob) -> Iterator[list[Chunk]]:
+    """Chunks of each text segment, with offsets into the whole document."""
+    from app.rag.service import _chunk_text
+
+    for base, segment in _text_segments(spool, job):
+        chunks = [Chunk(c.text, base + c.start, base + c.end) for c in _chunk_text(segment) if c.text.strip()]
+        if chunks:
+            yield chunks
+
+
+async def _ingest_text(rag, spool: IO[bytes], job: IngestJob) -> None:
+    from app.rag.service import _content_doc_id
+
+    topic = (job.topic or "").lower()
+    doc = (job.doc_id or "").strip() or _content_doc_id(topic, await asyncio.to_thread(_spool_sha1, spool))
+    segments = _segment_chunks(spool, job)
+    next_index = 0
+    # Spool reads and chunking run in a worker thread, one segment at a time.
+    while batch := await asyncio.to_thread(_take, segments, 1):
+        chunks = batch[0]
+        await rag._store_chunks(topic, doc, chunks, next_index)
+        next_index += len(chunks)
+        job.chunks_done += len(chunks)
+    job.documents_done = 1
+
+
+def _ndjson_records(spool: IO[bytes], job: IngestJob) -> Iterator[tuple[int, tuple[str, str, str | None] | None]]:
+    """Yield ``(line number, (topic, text, doc_id))`` per record, or ``(line number, None)`` after logging a bad line."""
+    for lineno, raw in enumerate(spool, start=1):
+        job.bytes_done += len(raw)
+        line = raw.decode("utf-8", errors="replace").strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+            text = str(record.get("text") or "")
+            topic = str(record.get("topic") or job.topic or "").strip()
+            doc_id = record.get("doc_id")
+        except (ValueError, AttributeError) as e:
+            job.errors.append(f"line {lineno}: invalid JSON record ({e})")
+            yield lineno, None
+            continue
+        if not text.strip() or not topic:
+            job.errors.append(f"line {lineno}: 'text' and 'topic' are required")
+            yield lineno, None
+            continue
+        yield lineno, (topic, text, str(doc_id) if doc_id not in (None, "") else None)
+
+
+async def _store_ndjson_batch(rag, batch: list[tuple[int, tuple[str, str, str | None]]], job: IngestJob) -> None:
+    try:
+        counts = await rag.add_many([record for _, record in batch])
+    except Exception as e:
+        if len(batch) == 1:
+            lineno = batch[0][0]
+            logger.warning("RAG ingest job %s: line %d failed: %s", job.job_id, lineno, e)
+            job.errors.append(f"line {lineno}: {str(e) or type(e).__name__}")
+            return
+        # Retry record by record so one bad record does not fail its neighbours.
+        for item in batch:
+            await _store_ndjson_batch(rag, [item], job)
+        return
+    job.chunks_done += sum(counts)
+    job.documents_done += len(batch)
+
+
+async def _ingest_ndjson(rag, spool: IO[bytes], job: IngestJob) -> None:
+    from app.rag.service import _doc_base
+
+    records = _ndjson_records(spool, job)
+    batch: list[tuple[int, tuple[str, str, str | None]]] = []
+    docs: set[str] = set()
+    while lines := await asyncio.to_thread(_take, records, INGEST_NDJSON_BATCH_RECORDS):
+        for lineno, record in lines:
+            if record is None:
+                continue
+            topic, text, doc_id = record
+            doc = _doc_base(topic.lower(), text, doc_id)
+            if doc in docs:
+                # A later record for the same document replaces it; keep the writes in order.
+                await _store_ndjson_batch(rag, batch, job)
+                batch, docs = [], set()
+            batch.append((lineno, record))
+            docs.add(doc)
+            if len(batch) >= INGEST_NDJSON_BATCH_RECORDS:
+                await _store_ndjson_batch(rag, batch, job)
+                batch, docs = [], set()
+    if batch:
+        await _store_ndjson_batch(rag, batch, job)
+
+
+async def _run_job(job: IngestJob, spool: IO[bytes]) -> None:
+    global _job_slots
+    from app.rag.service import get_rag
+
+    if _job_slots is None:
+        _job_slots = asyncio.Semaphore(INGEST_MAX_CONCURRENT_JOBS)
+    try:
+        async with _job_slots:
+            job.status = "running"
+            rag = get_rag()
+            if job.format == "ndjson":
+                await _ingest_ndjson(rag, spool, job)
+            else:
+                await _ingest_text(rag, spool, job)
+            job.status = "done"
+    except Exception as e:
+        logger.exception("RAG ingest job %s failed: %s", job.job_id, e)
+        job.errors.append(str(e) or type(e).__name__)
+        job.status = "error"
+    finally:
+        job.finished_at = time.time()
+        spool.close()
+
+
+def start_ingest_job(spool: IO[bytes], size: int, *, fmt: str, topic: str | None, doc_id: str | None) -> IngestJob:
+    """Register a job for a spooled upload and process it in the background. Must be called on the event loop."""
+    job = IngestJob(job_id=uuid.uuid4().hex, topic=topic, doc_id=doc_id, format=fmt, bytes_total=size)
+    _track(job)
+    task = asyncio.get_running_loop().create_task(_run_job(job, spool))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
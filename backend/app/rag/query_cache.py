@@ -0,0 +1,78 @@
+"""In-memory TTL + LRU cache of RAG search results, keyed by (normalized question, topic, k).
+
+Entries for a topic are dropped when that topic changes; topic-less (all-topic) searches are dropped
+on any change. A generation counter keeps a search that raced with a change from caching stale results.
+"""
+from __future__ import annotations
+import os
+import time
+from collections import OrderedDict
+
+try:
+    QUERY_CACHE_SIZE = max(0, int(os.environ.get("ASTA_RAG_QUERY_CACHE_SIZE", "256") or 256))
+except ValueError:
+    QUERY_CACHE_SIZE = 256
+try:
+    QUERY_CACHE_TTL_S = float(os.environ.get("ASTA_RAG_QUERY_CACHE_TTL", "300") or 300)
+except ValueError:
+    QUERY_CACHE_TTL_S = 300.0
+
+CacheKey = tuple[str, str | None, int]
+
+
+def normalize_question(question: str) -> str:
+    return " ".join((question or "").lower().split())
+
+
+class QueryCache:
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, ttl_s: float = QUERY_CACHE_TTL_S) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl_s
+        self._entries: OrderedDict[CacheKey, tuple[float, list[dict]]] = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(question: str, topic: str | None, k: int) -> CacheKey:
+        return normalize_question(question), (topic or "").lower() or None, int(k)
+
+    def get(self, key: CacheKey) -> list[dict] | None:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [dict(r) for r in entry[1]]
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: CacheKey, results: list[dict], generation: int) -> None:
+        """Store results computed when the cache was at ``generation``; skipped if a topic changed since."""
+        if not self._max_entries or generation != self.generation:
+            return
+        self._entries[key] = (time.monotonic() + self._ttl, [dict(r) for r in results])
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_topic(self, topic: str) -> None:
+        topic = (topic or "").lower()
+        self.generation += 1
+        self.invalidations += 1
+        for key in [k for k in self._entries if k[1] is None or k[1] == topic]:
+            del self._entries[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self._max_entries,
+            "ttl_seconds": self._ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
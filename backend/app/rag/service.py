@@ -9,38 +9,166 @@ import logging
 import os
 import sqlite3
 import hashlib
+import threading
 import httpx
 from pathlib import Path
 
+from app.rag.chunking import Chunk, chunk_text, stitch_chunks
+from app.rag.query_cache import QueryCache
+
 logger = logging.getLogger(__name__)
 
 COLLECTION = "asta_rag"
 CHROMA_PATH = os.environ.get("ASTA_CHROMA_PATH", str(Path(__file__).resolve().parent.parent.parent / "chroma_db"))
 FTS_DB_PATH = os.environ.get("ASTA_FTS_PATH", str(Path(__file__).resolve().parent.parent.parent / "rag_fts.db"))
 EMBED_DIM = 768  # nomic-embed-text
+EMBED_MODEL = "nomic-embed-text"
+# Chunking strategy (see app/rag/chunking.py) and its per-chunk token budget / overlap.
+RAG_CHUNKER = os.environ.get("ASTA_RAG_CHUNKER", "structured")
+try:
+    RAG_CHUNK_TOKENS = max(1, int(os.environ.get("ASTA_RAG_CHUNK_TOKENS", "256") or 256))
+except ValueError:
+    RAG_CHUNK_TOKENS = 256
+try:
+    RAG_CHUNK_OVERLAP_TOKENS = max(0, int(os.environ.get("ASTA_RAG_CHUNK_OVERLAP_TOKENS", "32") or 32))
+except ValueError:
+    RAG_CHUNK_OVERLAP_TOKENS = 32
+if RAG_CHUNK_OVERLAP_TOKENS >= RAG_CHUNK_TOKENS:
+    logger.warning(
+        "ASTA_RAG_CHUNK_OVERLAP_TOKENS (%d) must be below ASTA_RAG_CHUNK_TOKENS (%d); using %d",
+        RAG_CHUNK_OVERLAP_TOKENS, RAG_CHUNK_TOKENS, RAG_CHUNK_TOKENS // 8,
+    )
+    RAG_CHUNK_OVERLAP_TOKENS = RAG_CHUNK_TOKENS // 8
+# Chunks per /api/embed request, and how many of those requests may be in flight at once.
+try:
+    EMBED_BATCH_SIZE = max(1, int(os.environ.get("ASTA_RAG_EMBED_BATCH_SIZE", "32") or 32))
+except ValueError:
+    EMBED_BATCH_SIZE = 32
+try:
+    EMBED_CONCURRENCY = max(1, int(os.environ.get("ASTA_RAG_EMBED_CONCURRENCY", "4") or 4))
+except ValueError:
+    EMBED_CONCURRENCY = 4
+
+# Keep-alive client for embedding calls, bound to the loop that created it.
+_embed_client: httpx.AsyncClient | None = None
+_embed_client_loop: asyncio.AbstractEventLoop | None = None
+
+# How RAGService.search combines vector and keyword hits: "rrf" (reciprocal-rank fusion) or "weighted".
+RAG_FUSION = os.environ.get("ASTA_RAG_FUSION", "rrf").strip().lower()
+RRF_K = 60
+VECTOR_WEIGHT = 0.7
+KEYWORD_WEIGHT = 0.3
+
+
+def _text_key(text: str) -> str:
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+def fuse_weighted(result_lists: list[tuple[list[dict], float]]) -> list[dict]:
+    """Sum of each source's 0-1 score times its weight. Returns [{text, score, sources}] best first."""
+    fused: dict[str, dict] = {}
+    for results, weight in result_lists:
+        for r in results:
+            entry = fused.setdefault(_text_key(r["text"]), {"text": r["text"], "score": 0.0, "sources": []})
+            entry["score"] += r["score"] * weight
+            entry["sources"].append(r.get("source"))
+    return sorted(fused.values(), key=lambda e: e["score"], reverse=True)
+
+
+def fuse_rrf(result_lists: list[tuple[list[dict], float]], k: int = RRF_K) -> list[dict]:
+    """Reciprocal-rank fusion: sum of 1 / (k + rank) per source. Uses ranks only (vector and FTS scores are not
+    comparable), so weights are ignored. Normalized so a hit ranked first by every source scores 1.0."""
+    fused: dict[str, dict] = {}
+    for results, _weight in result_lists:
+        for rank, r in enumerate(results, start=1):
+            entry = fused.setdefault(_text_key(r["text"]), {"text": r["text"], "score": 0.0, "sources": []})
+            entry["score"] += 1.0 / (k + rank)
+            entry["sources"].append(r.get("source"))
+    best = len(result_lists) / (k + 1)
+    for entry in fused.values():
+        entry["score"] = round(entry["score"] / best, 6) if best else 0.0
+    return sorted(fused.values(), key=lambda e: e["score"], reverse=True)
+
+
+FUSION_STRATEGIES = {
+    "rrf": fuse_rrf,
+    "weighted": fuse_weighted,
+}
+
+
+def init_fts_schema(conn: sqlite3.Connection) -> None:
+    """FTS5 keyword index plus the topic catalog (per-topic chunk count and bytes, kept in step with Chroma)."""
+    conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS rag_fts USING fts5(doc_id, topic, chunk_text)")
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS rag_topics (
+            topic TEXT PRIMARY KEY,
+            chunks_count INTEGER NOT NULL DEFAULT 0,
+            bytes INTEGER NOT NULL DEFAULT 0,
+            updated_at TEXT NOT NULL
+        )"""
+    )
+    conn.commit()
+
+
+def _content_doc_id(topic: str, sha1_hex: str) -> str:
+    return f"{topic}_{sha1_hex[:12]}"
+
+
+def _doc_base(topic: str, text: str, doc_id: str | None) -> str:
+    """Chunk id prefix for a document: the caller's doc_id, else derived from the content."""
+    return (doc_id or "").strip() or _content_doc_id(topic, hashlib.sha1(text.encode("utf-8")).hexdigest())
 
 
 def _build_chunk_ids(topic: str, text: str, doc_id: str | None, chunk_count: int) -> list[str]:
-    base = (doc_id or "").strip() or f"{topic}_{hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]}"
+    base = _doc_base(topic, text, doc_id)
     return [f"{base}_{i}" for i in range(max(0, int(chunk_count)))]
 
 
-def _embed_ollama(text: str, base_url: str) -> list[float]:
-    """Ollama embed endpoint. Returns 768-dim list or []."""
+def _chunk_text(text: str) -> list[Chunk]:
+    return chunk_text(text, RAG_CHUNKER, RAG_CHUNK_TOKENS, RAG_CHUNK_OVERLAP_TOKENS)
+
+
+def _get_embed_client() -> httpx.AsyncClient:
+    """Shared AsyncClient for Ollama embeds; recreated if the running loop changed (scripts, tests)."""
+    global _embed_client, _embed_client_loop
+    loop = asyncio.get_running_loop()
+    if _embed_client is None or _embed_client.is_closed or _embed_client_loop is not loop:
+        _embed_client = httpx.AsyncClient(
+            timeout=60,
+            limits=httpx.Limits(max_connections=EMBED_CONCURRENCY, max_keepalive_connections=EMBED_CONCURRENCY),
+        )
+        _embed_client_loop = loop
+    return _embed_client
+
+
+async def close_embed_client() -> None:
+    global _embed_client, _embed_client_loop
+    client, _embed_client, _embed_client_loop = _embed_client, None, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+async def _embed_ollama_batch(texts: list[str], base_url: str) -> list[list[float]]:
+    """One Ollama /api/embed call with a list input. Returns one 768-dim list (or []) per text."""
+    if not texts:
+        return []
     try:
-        with httpx.Client(timeout=60) as c:
-            r = c.post(
-                f"{base_url.rstrip('/')}/api/embed",
-                json={"model": "nomic-embed-text", "input": text},
-            )
-            if r.status_code != 200:
-                return []
-            data = r.json()
-            emb = data.get("embeddings", [data.get("embedding", [])])[0] if data else []
-            return emb if isinstance(emb, list) and len(emb) == EMBED_DIM else []
+        r = await _get_embed_client().post(
+            f"{base_url.rstrip('/')}/api/embed",
+            json={"model": EMBED_MODEL, "input": texts},
+        )
+        if r.status_code != 200:
+            return [[] for _ in texts]
+        data = r.json() or {}
+        embs = data.get("embeddings") or []
     except Exception as e:
         logger.debug("Ollama embed failed: %s", e)
-        return []
+        return [[] for _ in texts]
+    out: list[list[float]] = []
+    for i in range(len(texts)):
+        emb = embs[i] if i < len(embs) else []
+        out.append(emb if isinstance(emb, list) and len(emb) == EMBED_DIM else [])
+    return out
 
 
 def _ollama_embed_error(base_url: str) -> str:
@@ -82,106 +210,219 @@ def _ollama_diagnose(base_url: str) -> tuple[str, str]:
         return "unknown", str(e) or "Ollama request failed"
 
 
-async def _get_embedding_any(text: str) -> list[float]:
-    """Embed via Ollama (nomic-embed-text). Returns 768-dim list or []."""
+async def _get_embeddings_any(texts: list[str]) -> list[list[float]]:
+    """Embed many texts via Ollama in batches of EMBED_BATCH_SIZE, at most EMBED_CONCURRENCY requests at once.
+    Texts already in the embedding cache skip Ollama. Result is aligned with texts; failed entries are []."""
     from app.config import get_settings
+    from app.rag.embed_cache import get_embed_cache
     settings = get_settings()
     base_url = (settings.ollama_base_url or "").strip() or "http://localhost:11434"
-    return await asyncio.to_thread(_embed_ollama, text, base_url)
+    try:
+        cache = get_embed_cache()
+        cached = await asyncio.to_thread(cache.get_many, EMBED_MODEL, texts)
+    except Exception as e:
+        logger.debug("Embedding cache unavailable: %s", e)
+        cache, cached = None, [None] * len(texts)
+    missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+    batches = [missing[i : i + EMBED_BATCH_SIZE] for i in range(0, len(missing), EMBED_BATCH_SIZE)]
+    sem = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+    async def _run(batch: list[str]) -> list[list[float]]:
+        async with sem:
+            return await _embed_ollama_batch(batch, base_url)
+
+    results = await asyncio.gather(*(_run(b) for b in batches))
+    fresh = dict(zip(missing, (emb for batch in results for emb in batch)))
+    if cache is not None and fresh:
+        try:
+            await asyncio.to_thread(cache.put_many, EMBED_MODEL, list(fresh), list(fresh.values()))
+        except Exception as e:
+            logger.debug("Embedding cache write failed: %s", e)
+    return [v if v is not None else fresh.get(t, []) for t, v in zip(texts, cached)]
+
+
+async def _get_embedding_any(text: str) -> list[float]:
+    """Embed via Ollama (nomic-embed-text). Returns 768-dim list or []."""
+    return (await _get_embeddings_any([text]))[0]
 
 
 class RAGService:
-    def __init__(self) -> None:
-        # Defer chromadb import so backend can start on Python 3.14 (chromadb has pydantic compat issues)
-        import chromadb
-        from chromadb.config import Settings as ChromaSettings
-        self._client = chromadb.PersistentClient(
-            path=CHROMA_PATH,
-            settings=ChromaSettings(anonymized_telemetry=False),
-        )
-        self._coll = self._client.get_or_create_collection(
-            COLLECTION,
-            metadata={"hnsw:space": "cosine"},
-        )
+    def __init__(self, collection=None, fts_conn: sqlite3.Connection | None = None) -> None:
+        """Open the Chroma collection and FTS database, unless given (tests pass a fake collection and an
+        in-memory ``check_same_thread=False`` connection)."""
+        if collection is None:
+            # Defer chromadb import so backend can start on Python 3.14 (chromadb has pydantic compat issues)
+            import chromadb
+            from chromadb.config import Settings as ChromaSettings
+            self._client = chromadb.PersistentClient(
+                path=CHROMA_PATH,
+                settings=ChromaSettings(anonymized_telemetry=False),
+            )
+            collection = self._client.get_or_create_collection(
+                COLLECTION,
+                metadata={"hnsw:space": "cosine"},
+            )
+        self._coll = collection
         # Initialize SQLite FTS5 for keyword search
-        self._fts_conn = sqlite3.connect(FTS_DB_PATH)
-        self._fts_conn.execute(
-            "CREATE VIRTUAL TABLE IF NOT EXISTS rag_fts USING fts5(doc_id, topic, chunk_text)"
-        )
-        self._fts_conn.commit()
+        # Keyword search runs in a worker thread; the lock serializes it with writes from the loop.
+        self._fts_conn = fts_conn or sqlite3.connect(FTS_DB_PATH, check_same_thread=False)
+        self._fts_lock = threading.Lock()
+        self._query_cache = QueryCache()
+        init_fts_schema(self._fts_conn)
+        self._bootstrap_topic_catalog()
+
+    def _bootstrap_topic_catalog(self) -> None:
+        """Fill rag_topics from a one-time scan of Chroma for stores created before the catalog existed."""
+        try:
+            if self._fts_conn.execute("SELECT 1 FROM rag_topics LIMIT 1").fetchone():
+                return
+            n = self._coll.count()
+            if n == 0:
+                return
+            result = self._coll.get(include=["metadatas", "documents"], limit=n)
+        except Exception as e:
+            logger.warning("Could not build RAG topic catalog: %s", e)
+            return
+        by_topic: dict[str, list[int]] = {}
+        for meta, doc in zip(result.get("metadatas") or [], result.get("documents") or []):
+            t = ((meta or {}).get("topic") or "").strip() or "unknown"
+            entry = by_topic.setdefault(t, [0, 0])
+            entry[0] += 1
+            entry[1] += len((doc or "").encode("utf-8"))
+        with self._fts_lock:
+            self._fts_conn.executemany(
+                "INSERT OR REPLACE INTO rag_topics (topic, chunks_count, bytes, updated_at) VALUES (?, ?, ?, datetime('now'))",
+                [(t, c, b) for t, (c, b) in by_topic.items()],
+            )
+            self._fts_conn.commit()
 
     async def add(
         self,
         topic: str,
         text: str,
         doc_id: str | None = None,
-    ) -> None:
-        """Chunk and add text under a topic. Uses Ollama, then OpenAI, then Google for embeddings."""
+    ) -> int:
+        """Chunk and add text under a topic (embeddings via Ollama). Returns the number of chunks stored."""
         # Normalize topic to lowercase for case-insensitive matching
         topic = topic.lower()
-        chunks = [text[i : i + 500] for i in range(0, len(text), 500)] if len(text) > 500 else [text]
+        chunks = _chunk_text(text)
         if not chunks:
+            return 0
+        await self._store_chunks(topic, _doc_base(topic, text, doc_id), chunks)
+        return len(chunks)
+
+    async def add_many(self, records: list[tuple[str, str, str | None]]) -> list[int]:
+        """Add several ``(topic, text, doc_id)`` documents with one embed pass, Chroma upsert and FTS commit.
+        Returns the number of chunks stored per record. Records must not share a document id."""
+        chunked = await asyncio.to_thread(lambda: [_chunk_text(text) for _, text, _ in records])
+        docs = [
+            (topic.lower(), _doc_base(topic.lower(), text, doc_id), chunks, 0)
+            for (topic, text, doc_id), chunks in zip(records, chunked)
+            if chunks
+        ]
+        await self._store_documents(docs)
+        return [len(chunks) for chunks in chunked]
+
+    async def _store_chunks(self, topic: str, doc: str, chunks: list[Chunk], first_index: int = 0) -> None:
+        """Embed and upsert chunks of one document as ids ``{doc}_{first_index + i}``; FTS rows go in one transaction."""
+        await self._store_documents([(topic, doc, chunks, first_index)])
+
+    async def _store_documents(self, docs: list[tuple[str, str, list[Chunk], int]]) -> None:
+        """Store ``(topic, doc, chunks, first_index)`` entries together (see ``_store_chunks``)."""
+        ids: list[str] = []
+        texts: list[str] = []
+        metadatas: list[dict] = []
+        for topic, doc, chunks, first_index in docs:
+            for i, c in enumerate(chunks):
+                ids.append(f"{doc}_{first_index + i}")
+                texts.append(c.text)
+                # start/end are offsets into the source document so get_topic_content can undo the overlap.
+                metadatas.append({"topic": topic, "doc": doc, "start": c.start, "end": c.end})
+        if not ids:
             return
-        ids = _build_chunk_ids(topic, text, doc_id, len(chunks))
-        embeddings: list[list[float]] = []
-        for c in chunks:
-            emb = await _get_embedding_any(c)
-            if emb:
-                embeddings.append(emb)
-            else:
-                embeddings.append([0.0] * EMBED_DIM)
+        replaced = await self._stored_chunk_bytes(ids)
+        embeddings = [emb or [0.0] * EMBED_DIM for emb in await _get_embeddings_any(texts)]
         if embeddings:
             # Upsert prevents duplicate-id failures when users relearn or append to an existing topic.
-            self._coll.upsert(
+            await asyncio.to_thread(
+                self._coll.upsert,
                 ids=ids,
                 embeddings=embeddings,
-                documents=chunks,
-                metadatas=[{"topic": topic}] * len(ids),
+                documents=texts,
+                metadatas=metadatas,
             )
-        # Also add to FTS5 for keyword search
+        # Also add to FTS5 for keyword search, and bump the topic catalog by what these ids added or replaced
+        catalog: dict[str, list[int]] = {}
+        for chunk_id, text, meta in zip(ids, texts, metadatas):
+            entry = catalog.setdefault(meta["topic"], [0, 0])
+            entry[0] += chunk_id not in replaced
+            entry[1] += len(text.encode("utf-8")) - replaced.get(chunk_id, 0)
         try:
-            for chunk_id, chunk_text in zip(ids, chunks):
-                self._fts_conn.execute(
+            with self._fts_lock:
+                self._fts_conn.executemany(
                     "INSERT OR REPLACE INTO rag_fts (doc_id, topic, chunk_text) VALUES (?, ?, ?)",
-                    (chunk_id, topic, chunk_text),
+                    [(chunk_id, meta["topic"], text) for chunk_id, text, meta in zip(ids, texts, metadatas)],
                 )
-            self._fts_conn.commit()
+                self._fts_conn.executemany(
+                    """INSERT INTO rag_topics (topic, chunks_count, bytes, updated_at) VALUES (?, ?, ?, datetime('now'))
+                    ON CONFLICT(topic) DO UPDATE SET
+                        chunks_count = chunks_count + excluded.chunks_count,
+                        bytes = bytes + excluded.bytes,
+                        updated_at = excluded.updated_at""",
+                    [(topic, added, added_bytes) for topic, (added, added_bytes) in catalog.items()],
+                )
+                self._fts_conn.commit()
         except Exception as e:
             logger.debug("FTS insert failed: %s", e)
+        for topic in catalog:
+            self._query_cache.invalidate_topic(topic)
+
+    async def _stored_chunk_bytes(self, ids: list[str]) -> dict[str, int]:
+        """Sizes of chunks already stored under these ids (upsert replaces them, so the catalog must not double count)."""
+        try:
+            result = await asyncio.to_thread(self._coll.get, ids=ids, include=["documents"])
+        except Exception as e:
+            logger.debug("Chroma id lookup failed: %s", e)
+            return {}
+        return {
+            chunk_id: len((doc or "").encode("utf-8"))
+            for chunk_id, doc in zip(result.get("ids") or [], result.get("documents") or [])
+        }
 
     def list_topics(self) -> list[dict]:
-        """Return list of learned topics with chunk counts. Empty if nothing learned."""
+        """Return learned topics with chunk counts, stored bytes and last update, from the topic catalog."""
         try:
-            n = self._coll.count()
-            if n == 0:
-                return []
-            result = self._coll.get(include=["metadatas"], limit=max(n, 1))
-            raw = result.get("metadatas") or []
-            metadatas: list[dict] = []
-            for m in raw:
-                if isinstance(m, list):
-                    metadatas.extend(m)
-                elif m is not None:
-                    metadatas.append(m)
-            by_topic: dict[str, int] = {}
-            for m in metadatas:
-                if not isinstance(m, dict):
-                    continue
-                t = (m.get("topic") or "").strip() or "unknown"
-                by_topic[t] = by_topic.get(t, 0) + 1
-            return [{"topic": k, "chunks_count": v} for k, v in sorted(by_topic.items())]
+            with self._fts_lock:
+                rows = self._fts_conn.execute(
+                    "SELECT topic, chunks_count, bytes, updated_at FROM rag_topics WHERE chunks_count > 0 ORDER BY topic"
+                ).fetchall()
         except Exception:
             return []
+        return [{"topic": t, "chunks_count": c, "bytes": b, "updated_at": u} for t, c, b, u in rows]
 
     async def query(self, question: str, topic: str | None = None, k: int = 5) -> str:
-        """Hybrid search: vector similarity + keyword match, merged with weights."""
-        # 1) Vector search (existing)
-        vector_results = await self._query_vector(question, topic, k)
-        # 2) Keyword search (new FTS5)
-        keyword_results = self._query_keyword(question, topic, k)
-        # 3) Merge
-        merged = self._merge_hybrid(vector_results, keyword_results)
-        return "\n".join(merged[:k]) if merged else ""
+        """Hybrid search as text: top-k fused chunks joined by newlines."""
+        return "\n".join(r["text"] for r in await self.search(question, topic, k))
+
+    async def search(self, question: str, topic: str | None = None, k: int = 5) -> list[dict]:
+        """Hybrid search: vector similarity and FTS5 keyword match run concurrently, then fused with RAG_FUSION.
+        Returns up to k [{text, score (0-1), sources}] best first; repeated questions are served from the query cache."""
+        key = QueryCache.key(question, topic, k)
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            return cached
+        generation = self._query_cache.generation
+        vector_results, keyword_results = await asyncio.gather(
+            self._query_vector(question, topic, k),
+            asyncio.to_thread(self._query_keyword, question, topic, k),
+        )
+        fuse = FUSION_STRATEGIES.get(RAG_FUSION) or FUSION_STRATEGIES["rrf"]
+        results = fuse([(vector_results, VECTOR_WEIGHT), (keyword_results, KEYWORD_WEIGHT)])[:k]
+        self._query_cache.put(key, results, generation)
+        return results
+
+    def query_cache_stats(self) -> dict:
+        return self._query_cache.stats()
 
     async def _query_vector(self, question: str, topic: str | None, k: int) -> list[dict]:
         """Vector similarity search via ChromaDB. Returns list of {text, score}."""
@@ -193,7 +434,8 @@ class RAGService:
             n = self._coll.count()
             if n == 0:
                 return []
-            results = self._coll.query(
+            results = await asyncio.to_thread(
+                self._coll.query,
                 query_embeddings=[emb],
                 n_results=min(k, n),
                 where=where,
@@ -220,16 +462,17 @@ class RAGService:
             return []
         fts_query = " OR ".join(f'"{t}"' for t in terms[:10])  # Limit to 10 terms
         try:
-            if topic:
-                rows = self._fts_conn.execute(
-                    "SELECT chunk_text, rank FROM rag_fts WHERE rag_fts MATCH ? AND topic = ? ORDER BY rank LIMIT ?",
-                    (fts_query, topic.lower(), k),
-                ).fetchall()
-            else:
-                rows = self._fts_conn.execute(
-                    "SELECT chunk_text, rank FROM rag_fts WHERE rag_fts MATCH ? ORDER BY rank LIMIT ?",
-                    (fts_query, k),
-                ).fetchall()
+            with self._fts_lock:
+                if topic:
+                    rows = self._fts_conn.execute(
+                        "SELECT chunk_text, rank FROM rag_fts WHERE rag_fts MATCH ? AND topic = ? ORDER BY rank LIMIT ?",
+                        (fts_query, topic.lower(), k),
+                    ).fetchall()
+                else:
+                    rows = self._fts_conn.execute(
+                        "SELECT chunk_text, rank FROM rag_fts WHERE rag_fts MATCH ? ORDER BY rank LIMIT ?",
+                        (fts_query, k),
+                    ).fetchall()
         except Exception as e:
             logger.debug("FTS query failed: %s", e)
             return []
@@ -248,22 +491,8 @@ class RAGService:
         keyword_weight: float = 0.3,
     ) -> list[str]:
         """Merge vector and keyword results with weighted scoring. Deduplicate by text hash."""
-        scored: dict[str, float] = {}  # text_hash -> weighted_score
-        text_map: dict[str, str] = {}  # text_hash -> original text
-
-        for r in vector_results:
-            h = hashlib.md5(r["text"].encode()).hexdigest()
-            scored[h] = scored.get(h, 0) + r["score"] * vector_weight
-            text_map[h] = r["text"]
-
-        for r in keyword_results:
-            h = hashlib.md5(r["text"].encode()).hexdigest()
-            scored[h] = scored.get(h, 0) + r["score"] * keyword_weight
-            text_map[h] = r["text"]
-
-        # Sort by combined score descending
-        ranked = sorted(scored.items(), key=lambda x: x[1], reverse=True)
-        return [text_map[h] for h, _ in ranked]
+        fused = fuse_weighted([(vector_results, vector_weight), (keyword_results, keyword_weight)])
+        return [r["text"] for r in fused]
 
     def delete_topic(self, topic: str) -> int:
         """Delete all chunks for a given topic. Returns number of chunks deleted."""
@@ -280,24 +509,42 @@ class RAGService:
                 deleted_count = len(ids)
             # Also delete from FTS5
             try:
-                self._fts_conn.execute("DELETE FROM rag_fts WHERE topic = ?", (topic,))
-                self._fts_conn.commit()
+                with self._fts_lock:
+                    self._fts_conn.execute("DELETE FROM rag_fts WHERE topic = ?", (topic,))
+                    self._fts_conn.execute("DELETE FROM rag_topics WHERE topic = ?", (topic,))
+                    self._fts_conn.commit()
             except Exception as e:
                 logger.debug("FTS delete failed: %s", e)
             return deleted_count
         except Exception:
             return 0
+        finally:
+            self._query_cache.invalidate_topic(topic)
 
     def get_topic_content(self, topic: str) -> str:
-        """Get all content for a topic as a single text string."""
+        """Get all content for a topic as a single text string (one entry per source document, overlap removed)."""
         # Normalize topic to lowercase for case-insensitive matching
         topic = topic.lower()
         try:
-            result = self._coll.get(where={"topic": topic}, include=["documents"])
+            result = self._coll.get(where={"topic": topic}, include=["documents", "metadatas"])
             docs = result.get("documents") or []
-            return "\n\n".join(docs) if docs else ""
+            metas = result.get("metadatas") or [None] * len(docs)
         except Exception:
             return ""
+        # One section per source document in first-seen order; chunks stored before offsets existed stay as-is.
+        sections: list[str | list[tuple[int, int, str]]] = []
+        by_doc: dict[str, list[tuple[int, int, str]]] = {}
+        for text, meta in zip(docs, metas):
+            meta = meta or {}
+            if {"doc", "start", "end"} <= meta.keys():
+                pieces = by_doc.get(meta["doc"])
+                if pieces is None:
+                    pieces = by_doc[meta["doc"]] = []
+                    sections.append(pieces)
+                pieces.append((int(meta["start"]), int(meta["end"]), text))
+            else:
+                sections.append(text)
+        return "\n\n".join(s if isinstance(s, str) else stitch_chunks(s) for s in sections)
 
     async def update_topic(self, topic: str, new_content: str):
         """Replace all content for a topic with new content."""
@@ -335,6 +582,11 @@ def get_rag() -> RAGService:
     return _rag
 
 
+def get_query_cache_stats() -> dict | None:
+    """Query cache metrics, or None if the RAG store has not been opened yet."""
+    return _rag.query_cache_stats() if _rag is not None else None
+
+
 async def check_rag_status() -> dict:
     """Check if RAG is usable: ChromaDB/FTS OK and Ollama embedding works.
     Returns ok, message, provider, detail, ollama_url; when store fails still returns ollama check and ollama_url."""
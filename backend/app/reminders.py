@@ -216,9 +216,9 @@ async def reload_pending_reminders() -> None:
 
 
 def _fire_reminder(reminder_id: int) -> None:
-    """Run when reminder is due: send notification and mark sent."""
-    import asyncio
-    asyncio.run(_fire_reminder_async(reminder_id))
+    """Run when reminder is due: send notification and mark sent (on the API event loop)."""
+    from app.tasks.scheduler import run_on_main_loop
+    run_on_main_loop(_fire_reminder_async(reminder_id))
 
 
 def _format_reminder_message(stored_message: str) -> str:
@@ -208,15 +208,31 @@ async def get_chat_messages(
     request: Request,
     conversation_id: str = Query(..., description="Conversation ID"),
     limit: int = Query(50, ge=1, le=100),
+    before_id: int | None = Query(None, ge=1, description="Return messages older than this message id"),
+    after_id: int | None = Query(None, ge=0, description="Return messages newer than this message id"),
 ):
-    """Return recent messages for a conversation so clients can render the thread history."""
+    """Return a page of messages (oldest-first) so clients can render and lazily scroll the thread history.
+
+    Pass ``before_id=oldest_id`` from a previous page to load older messages, or
+    ``after_id=newest_id`` to catch up on newer ones.
+    """
     user_id = get_current_user_id(request)
     if not conversation_id.startswith(user_id + ":"):
         raise HTTPException(403, "Conversation does not belong to this user")
+    if before_id is not None and after_id is not None:
+        raise HTTPException(400, "Use either before_id or after_id, not both")
     db = get_db()
     await db.connect()
-    rows = await db.get_recent_messages(conversation_id, limit=limit)
-    return {"conversation_id": conversation_id, "messages": rows}
+    rows, has_more = await db.get_messages_page(
+        conversation_id, limit=limit, before_id=before_id, after_id=after_id
+    )
+    return {
+        "conversation_id": conversation_id,
+        "messages": rows,
+        "has_more": has_more,
+        "oldest_id": rows[0]["id"] if rows else None,
+        "newest_id": rows[-1]["id"] if rows else None,
+    }
 
 
 class ChatIn(BaseModel):
@@ -1,16 +1,25 @@
 """RAG: learn topic, ask about topic, list what was learned."""
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 
-from app.rag.service import get_rag, check_rag_status, check_ollama_at_url
+from app.rag.service import get_rag, check_rag_status, check_ollama_at_url, get_query_cache_stats
 
 router = APIRouter()
 
 
 @router.get("/rag/status")
 async def rag_status():
-    """Check if RAG is working (ChromaDB + at least one embedding provider)."""
-    return await check_rag_status()
+    """Check if RAG is working (ChromaDB + at least one embedding provider). Includes query cache hit-rate metrics."""
+    status = await check_rag_status()
+    status["query_cache"] = get_query_cache_stats()
+    return status
+
+
+@router.get("/rag/embed-cache")
+async def rag_embed_cache_stats():
+    """Embedding cache size and hit/miss counters since startup."""
+    from app.rag.embed_cache import get_embed_cache
+    return get_embed_cache().stats()
 
 
 @router.get("/rag/check-ollama")
@@ -42,6 +51,36 @@ async def rag_learn(body: LearnIn):
     return {"ok": True, "topic": body.topic}
 
 
+@router.post("/rag/ingest", status_code=202)
+async def rag_ingest(request: Request, topic: str | None = None, doc_id: str | None = None):
+    """Stream a large document (text body) or many documents (NDJSON body) into RAG as a background job.
+    The body is spooled to disk, so this returns as soon as the upload finishes; poll GET /rag/ingest/{job_id}."""
+    from app.rag.ingest import NDJSON_CONTENT_TYPES, IngestTooLarge, spool_upload, start_ingest_job
+
+    content_type = (request.headers.get("content-type") or "").split(";")[0].strip().lower()
+    fmt = "ndjson" if content_type in NDJSON_CONTENT_TYPES else "text"
+    topic = (topic or "").strip() or None
+    if fmt == "text" and not topic:
+        raise HTTPException(status_code=400, detail="topic is required for text uploads")
+    try:
+        spool, size = await spool_upload(request.stream())
+    except IngestTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    job = start_ingest_job(spool, size, fmt=fmt, topic=topic, doc_id=(doc_id or "").strip() or None)
+    return job.to_dict()
+
+
+@router.get("/rag/ingest/{job_id}")
+async def rag_ingest_status(job_id: str):
+    """Progress of a bulk ingest job."""
+    from app.rag.ingest import get_ingest_job
+
+    job = get_ingest_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingest job")
+    return job.to_dict()
+
+
 class AskIn(BaseModel):
     question: str
     topic: str | None = None
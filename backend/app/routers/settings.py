@@ -24,6 +24,7 @@ from app.model_policy import (
 from app.provider_flow import (
     DEFAULT_MAIN_PROVIDER,
     MAIN_PROVIDER_CHAIN,
+    PROVIDER_FLOW_MODES,
     normalize_main_provider,
 )
 from app.thinking_capabilities import get_thinking_options
@@ -41,6 +42,12 @@ MAIN_PROVIDER_LABELS = {
     "openrouter": "OpenRouter",
 }
 
+# Rolling call stats from provider_runtime_state shown in the provider-flow view.
+_PROVIDER_STATS_FIELDS = (
+    "calls", "error_rate", "latency_ewma_ms", "latency_p50_ms", "latency_p95_ms", "ttft_ewma_ms",
+    "hedge_wins", "hedge_losses", "last_call_at",
+)
+
 
 async def _ollama_reachable() -> bool:
     """Return True only if Ollama is running and responding at the configured base URL (and response looks like Ollama)."""
@@ -124,6 +131,10 @@ class FinalModeIn(BaseModel):
     final_mode: str  # off | strict
 
 
+class ProviderFlowModeIn(BaseModel):
+    mode: str  # fixed | adaptive
+
+
 class VisionSettingsIn(BaseModel):
     preprocess: bool
     provider_order: str
@@ -325,6 +336,7 @@ async def get_provider_flow(request: Request):
         auto_disabled = bool(state.get("auto_disabled", False))
         disabled_reason = str(state.get("disabled_reason") or "").strip()
         connected = bool(connected_map.get(provider, False))
+        stats = {k: state.get(k) for k in _PROVIDER_STATS_FIELDS if k in state}
         providers.append(
             {
                 "provider": provider,
@@ -337,15 +349,32 @@ async def get_provider_flow(request: Request):
                 "active": bool(connected and enabled and not auto_disabled),
                 "model": str(models.get(provider) or ""),
                 "default_model": str(DEFAULT_MODELS.get(provider) or ""),
+                "stats": stats,
             }
         )
     return {
         "default_provider": default_provider,
         "order": list(MAIN_PROVIDER_CHAIN),
         "providers": providers,
+        "mode": await db.get_user_provider_flow_mode(user_id),
     }
 
 
+@router.put("/settings/provider-flow/mode")
+@router.put("/api/settings/provider-flow/mode")
+async def set_provider_flow_mode(request: Request, body: ProviderFlowModeIn):
+    """fixed: fallbacks in chain order. adaptive: ordered by observed latency/errors, degraded ones skipped."""
+    require_admin(request)
+    user_id = get_current_user_id(request)
+    mode = (body.mode or "").strip().lower()
+    if mode not in PROVIDER_FLOW_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(PROVIDER_FLOW_MODES)}")
+    db = get_db()
+    await db.connect()
+    await db.set_user_provider_flow_mode(user_id, mode)
+    return {"mode": mode}
+
+
 @router.put("/settings/provider-flow/provider-enabled")
 @router.put("/api/settings/provider-flow/provider-enabled")
 async def set_provider_enabled(request: Request, body: ProviderEnabledIn):
@@ -966,7 +995,7 @@ async def get_skills(request: Request):
         files_available = files_available or bool(await db.get_allowed_paths(user_id))
     except Exception:
         pass
-    effective_exec_bins = await get_effective_exec_bins(db, user_id)
+    effective_exec_bins = await get_effective_exec_bins(db, user_id, skill_toggles=toggles)
     skills_available = {
         "files": files_available,
         "drive": False,  # OAuth not wired yet
@@ -1041,6 +1070,7 @@ async def set_skill_toggle(request: Request, body: SkillToggleIn):
     from app.workspace import discover_workspace_skills
 
     workspace_skills = discover_workspace_skills()
+    toggles = await db.get_all_skill_toggles(user_id)
     all_workspace_bins: set[str] = set()
     enabled_workspace_bins: set[str] = set()
     for ws in workspace_skills:
@@ -1048,7 +1078,7 @@ async def set_skill_toggle(request: Request, body: SkillToggleIn):
         if not ws_bins:
             continue
         all_workspace_bins |= ws_bins
-        if await db.get_skill_enabled(user_id, ws.name):
+        if toggles.get(ws.name, True):
             enabled_workspace_bins |= ws_bins
 
     extra = (await db.get_system_config(SYSTEM_CONFIG_EXEC_BINS_KEY)) or ""
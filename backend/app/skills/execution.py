@@ -0,0 +1,100 @@
+"""Pre-LLM skill execution stage: independent skills run concurrently.
+
+Each selected skill's ``execute()`` (weather, time, lyrics, Spotify, GitHub, gog, ...)
+does its own network or subprocess I/O, so they are started together. A skill
+only waits for the skills named in its ``depends_on`` (e.g. google_search waits
+for rag) and then sees their results in ``extra``.
+
+Every skill gets ``timeout_s``; one that runs over (or raises) is reported as
+"skipped" / "failed" and contributes nothing, instead of holding up the reply.
+Results are merged into ``extra`` in dependency order (``order_skills``).
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any
+
+from app.lib.skill import Skill
+
+logger = logging.getLogger(__name__)
+
+SKILL_STATUS_OK = "ok"
+SKILL_STATUS_EMPTY = "empty"
+SKILL_STATUS_SKIPPED = "skipped"
+SKILL_STATUS_FAILED = "failed"
+
+
+def order_skills(skills: list[Skill]) -> list[Skill]:
+    """Stable order with each skill after the selected skills it depends on (cycles are broken)."""
+    by_name = {skill.name: skill for skill in skills}
+    ordered: list[Skill] = []
+    visiting: set[str] = set()
+    done: set[str] = set()
+
+    def _visit(skill: Skill) -> None:
+        if skill.name in done or skill.name in visiting:
+            return
+        visiting.add(skill.name)
+        for dep in skill.depends_on:
+            if dep in by_name:
+                _visit(by_name[dep])
+        visiting.discard(skill.name)
+        done.add(skill.name)
+        ordered.append(skill)
+
+    for skill in skills:
+        _visit(skill)
+    return ordered
+
+
+async def execute_skills(
+    skills: list[Skill],
+    user_id: str,
+    text: str,
+    extra: dict[str, Any],
+    *,
+    timeout_s: float | None,
+) -> dict[str, str]:
+    """Run ``skills`` and merge their results into ``extra``. Returns ``{skill name: status}``."""
+    skills = order_skills(skills)
+    results: dict[str, dict[str, Any]] = {}
+    tasks: dict[str, asyncio.Task] = {}
+
+    async def _run(skill: Skill, deps: list[str]) -> str:
+        if deps:
+            await asyncio.gather(*(tasks[d] for d in deps))
+        view = dict(extra)
+        for dep in deps:
+            view.update(results.get(dep) or {})
+        try:
+            logger.info("Skill %s executing...", skill.name)
+            if timeout_s and timeout_s > 0:
+                result = await asyncio.wait_for(skill.execute(user_id, text, view), timeout=timeout_s)
+            else:
+                result = await skill.execute(user_id, text, view)
+        except asyncio.TimeoutError:
+            logger.warning("Skill %s timed out after %.1fs; skipped", skill.name, timeout_s)
+            return SKILL_STATUS_SKIPPED
+        except Exception as e:
+            logger.error("Skill %s execution failed: %s", skill.name, e, exc_info=True)
+            return SKILL_STATUS_FAILED
+        if not result:
+            logger.debug("Skill %s returned None", skill.name)
+            return SKILL_STATUS_EMPTY
+        logger.info("Skill %s returned data: %s", skill.name, list(result.keys()))
+        results[skill.name] = result
+        return SKILL_STATUS_OK
+
+    for skill in skills:
+        # Only skills started before this one can be waited on, so waits never form a cycle.
+        deps = [d for d in skill.depends_on if d in tasks]
+        tasks[skill.name] = asyncio.create_task(_run(skill, deps))
+    try:
+        statuses = dict(zip(tasks, await asyncio.gather(*tasks.values())))
+    finally:
+        for task in tasks.values():
+            task.cancel()
+    for skill in skills:
+        extra.update(results.get(skill.name) or {})
+    return statuses
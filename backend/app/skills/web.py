@@ -8,6 +8,11 @@ class GoogleSearchSkill(Skill):
     def name(self) -> str:
         return "google_search"
 
+    @property
+    def depends_on(self) -> tuple[str, ...]:
+        # Search is skipped when RAG already found strong local content (rag_found_content).
+        return ("rag",)
+
     def check_eligibility(self, text: str, user_id: str) -> bool:
         t = (text or "").strip().lower()
 
@@ -1,14 +1,23 @@
-"""APScheduler: learning jobs, reminders."""
+"""APScheduler: learning jobs, reminders.
+
+Jobs run in BackgroundScheduler threads; their async work is handed to the
+API's event loop with ``run_on_main_loop`` so it shares the app's DB
+connections instead of starting a throwaway loop per fire.
+"""
 from __future__ import annotations
 import asyncio
 import logging
 import time
+from typing import Any, Coroutine
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.date import DateTrigger
 
 logger = logging.getLogger(__name__)
 _scheduler: BackgroundScheduler | None = None
+_main_loop: asyncio.AbstractEventLoop | None = None
+# Tasks started by run_on_main_loop from the loop thread; held so they are not garbage-collected mid-run.
+_loop_tasks: set[asyncio.Task] = set()
 
 # Varied search queries so we don't repeat the same search; fills different angles.
 LEARN_QUERY_TEMPLATES = [
@@ -30,6 +39,45 @@ LEARN_QUERY_TEMPLATES = [
 ]
 
 
+def bind_main_loop(loop: asyncio.AbstractEventLoop | None) -> None:
+    """Register the API event loop that scheduler jobs should run their coroutines on (None to unbind)."""
+    global _main_loop
+    _main_loop = loop
+
+
+def _on_loop_task_done(task: asyncio.Task) -> None:
+    _loop_tasks.discard(task)
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        logger.warning("Scheduled coroutine %s failed: %s", task.get_coro().__qualname__, exc)
+
+
+def run_on_main_loop(coro: Coroutine[Any, Any, Any], *, wait: bool = True) -> Any:
+    """Run ``coro`` on the bound main loop from a scheduler thread.
+
+    - From another thread: submit with run_coroutine_threadsafe; block for the result when ``wait``.
+    - From the main loop itself (sync helper called by a route): schedule as a task, never block;
+      the task is kept referenced and its failure is logged.
+    - No bound/running main loop (scripts, tests): fall back to asyncio.run.
+    """
+    loop = _main_loop
+    if loop is None or loop.is_closed() or not loop.is_running():
+        return asyncio.run(coro)
+    try:
+        on_loop = asyncio.get_running_loop() is loop
+    except RuntimeError:
+        on_loop = False
+    if on_loop:
+        task = loop.create_task(coro)
+        _loop_tasks.add(task)
+        task.add_done_callback(_on_loop_task_done)
+        return None
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    return future.result() if wait else None
+
+
 def get_scheduler() -> BackgroundScheduler:
     global _scheduler
     if _scheduler is None:
@@ -47,7 +95,6 @@ def _run_learning_job_sync(
     channel_target: str,
 ) -> None:
     """Run learning loop for duration_minutes: varied web searches, add to RAG, then notify. Runs in scheduler thread."""
-    import asyncio
     from app.rag.service import get_rag
     from app.search_web import search_web
     from app.reminders import send_notification
@@ -73,7 +120,7 @@ def _run_learning_job_sync(
                         async def _add_chunk():
                             r = get_rag()
                             await r.add(topic, snippet[:4000], doc_id=doc_id)
-                        asyncio.run(_add_chunk())
+                        run_on_main_loop(_add_chunk())
                         added += 1
             except Exception as e:
                 logger.warning("Learn search/add failed for %s: %s", query[:50], e)
@@ -86,7 +133,7 @@ def _run_learning_job_sync(
     try:
         # Give DB a moment to settle/commit so the user can query immediately
         time.sleep(2)
-        asyncio.run(send_notification(channel, channel_target, msg))
+        run_on_main_loop(send_notification(channel, channel_target, msg))
     except Exception as e:
         logger.warning("Could not send learning-done notification: %s", e)
 
@@ -111,7 +158,7 @@ def schedule_learning_job(
                 if (s or "").strip():
                     await rag.add(topic, (s or "")[:5000], doc_id=f"{job_id}_src")
         try:
-            asyncio.run(_add_sources())
+            run_on_main_loop(_add_sources())
         except Exception as e:
             logger.warning("Could not add provided sources to RAG: %s", e)
     from datetime import datetime, timezone
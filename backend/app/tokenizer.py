@@ -0,0 +1,165 @@
+"""Token counting for context budgets.
+
+Budgets (history compaction, tool-loop compaction, tool-output caps, recent
+messages in the prompt) are in tokens of the model that will read the text.
+``get_tokenizer(model, provider)`` returns the best ``Tokenizer`` available
+offline for that model:
+
+- Tokenizers registered per provider (``TOKENIZERS`` / ``register_tokenizer``).
+  OpenAI-compatible GPT/o-series models use tiktoken when it is installed.
+- ``HeuristicTokenizer`` otherwise: one regex pass that prices Latin words,
+  digit runs, CJK characters, punctuation and indentation separately, so code,
+  JSON tool output and CJK text are not undercounted the way a word count is.
+
+A tokenizer also finds how much of a text fits in a token budget
+(``cut_index``), which callers use to truncate by tokens.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from functools import lru_cache
+from typing import Callable, Protocol
+
+try:
+    import tiktoken
+except ImportError:  # optional: heuristic counts are used instead
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+
+class Tokenizer(Protocol):
+    name: str
+
+    def count(self, text: str) -> int:
+        """Number of tokens in ``text``."""
+        ...
+
+    def cut_index(self, text: str, max_tokens: int) -> int:
+        """Largest char index ``i`` such that ``text[:i]`` fits in ``max_tokens``."""
+        ...
+
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef"  # kana, CJK ideographs, hangul, full-width forms
+_PIECE_RE = re.compile(
+    rf"(?P<cjk>[{_CJK}])"
+    r"|(?P<latin>[A-Za-z]+)"
+    r"|(?P<digits>\d+)"
+    rf"|(?P<word>(?:(?![{_CJK}])[^\W\d_])+)"
+    r"|(?P<newlines>\n+)"
+    r"|(?P<indent>[ \t]{2,})"
+    r"|(?P<space>\s)"
+    r"|(?P<punct>[^\w\s]+|_+)"
+)
+
+# Tokens per piece, by kind and length. BPE vocabularies keep common English words whole
+# (long ones split every ~6 chars), group digits in threes, spend about a token per CJK
+# character and per 2-3 letters of other scripts, and merge a single space into the next word.
+_PIECE_COST: dict[str, Callable[[int], int]] = {
+    "cjk": lambda n: 1,
+    "latin": lambda n: (n + 5) // 6,
+    "digits": lambda n: (n + 2) // 3,
+    "word": lambda n: (n + 1) // 2,
+    "newlines": lambda n: 1,
+    "indent": lambda n: (n + 3) // 4,
+    "space": lambda n: 0,
+    "punct": lambda n: (n + 1) // 2,
+}
+
+
+class HeuristicTokenizer:
+    """Fast offline estimate, used when no real tokenizer is available for a model."""
+
+    name = "heuristic"
+
+    def count(self, text: str) -> int:
+        return sum(_PIECE_COST[m.lastgroup](m.end() - m.start()) for m in _PIECE_RE.finditer(text))
+
+    def cut_index(self, text: str, max_tokens: int) -> int:
+        used = 0
+        for m in _PIECE_RE.finditer(text):
+            used += _PIECE_COST[m.lastgroup](m.end() - m.start())
+            if used > max_tokens:
+                return m.start()
+        return len(text)
+
+
+class TiktokenTokenizer:
+    """Exact counts for OpenAI models via tiktoken."""
+
+    def __init__(self, encoding) -> None:
+        self._encoding = encoding
+        self.name = f"tiktoken:{encoding.name}"
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def cut_index(self, text: str, max_tokens: int) -> int:
+        tokens = self._encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return len(text)
+        head = self._encoding.decode_bytes(tokens[: max(0, max_tokens)])
+        # A token boundary can fall inside a multi-byte character; drop the partial character.
+        return len(head.decode("utf-8", errors="ignore"))
+
+
+HEURISTIC = HeuristicTokenizer()
+
+TokenizerLoader = Callable[[str | None], "Tokenizer | None"]
+TOKENIZERS: dict[str, TokenizerLoader] = {}
+
+
+def register_tokenizer(provider: str, loader: TokenizerLoader) -> None:
+    """Use ``loader(model)`` for ``provider``'s models; it returns None when it cannot serve the model."""
+    TOKENIZERS[provider.strip().lower()] = loader
+    get_tokenizer.cache_clear()
+
+
+def _openai_tokenizer(model: str | None) -> Tokenizer | None:
+    if tiktoken is None or not model:
+        return None
+    m = model.strip().lower().rsplit("/", 1)[-1]  # openrouter ids look like "openai/gpt-4o"
+    if not m.startswith(("gpt-", "o1", "o3", "o4", "chatgpt-")):
+        return None
+    try:
+        encoding = tiktoken.encoding_for_model(m)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base" if m.startswith(("gpt-4o", "gpt-4.1", "gpt-5", "o")) else "cl100k_base")
+    return TiktokenTokenizer(encoding)
+
+
+@lru_cache(maxsize=64)
+def get_tokenizer(model: str | None = None, provider: str | None = None) -> Tokenizer:
+    """Tokenizer for ``model`` on ``provider``, falling back to the heuristic."""
+    loader = TOKENIZERS.get((provider or "").strip().lower())
+    if loader is not None:
+        try:
+            tokenizer = loader(model)
+        except Exception as e:
+            logger.warning("Tokenizer for %s/%s unavailable (%s); using heuristic", provider, model, e)
+            tokenizer = None
+        if tokenizer is not None:
+            return tokenizer
+    return HEURISTIC
+
+
+register_tokenizer("openai", _openai_tokenizer)
+register_tokenizer("openrouter", _openai_tokenizer)
+
+
+def count_tokens(text: str, *, model: str | None = None, provider: str | None = None) -> int:
+    if not text:
+        return 0
+    return get_tokenizer(model, provider).count(text)
+
+
+def truncate_to_tokens(
+    text: str,
+    max_tokens: int,
+    *,
+    model: str | None = None,
+    provider: str | None = None,
+) -> str:
+    """Longest prefix of ``text`` that fits in ``max_tokens``."""
+    return text[: get_tokenizer(model, provider).cut_index(text, max_tokens)]
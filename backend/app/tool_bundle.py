@@ -0,0 +1,202 @@
+"""Memoized tool-definition bundles offered to the model each turn.
+
+handle_message used to rebuild the ``tools`` list from a dozen
+``get_*_openai_def()`` calls (plus MCP ``get_tool_definitions()``) on every
+message. The list only depends on a handful of inputs, collected in
+``ToolBundleKey``: user role, exec security mode and allowed bins, enabled
+skills, a few per-turn switches (web mode, image keys, subagent channel,
+project conversation) and the MCP tool generation.
+
+``get_tool_bundle`` builds the bundle once per key and returns the cached
+``ToolBundle`` afterwards. A bundle carries the definitions as a
+``ToolDefinitions`` list whose ``digest`` is a stable hash of the canonical
+JSON, so providers can reuse work keyed by it (the Claude provider converts
+each bundle to Anthropic's tool format once), and the same tools in the same
+order produce the same request prefix for provider-side prompt caching.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+TOOL_BUNDLE_CACHE_SIZE = 64
+
+# Kept as an inline definition: only offered when the conversation belongs to a project folder.
+PROJECT_UPDATE_TOOL_DEF: dict[str, Any] = {
+    "type": "function",
+    "function": {
+        "name": "project_update",
+        "description": (
+            "Update the current project's context notes (project.md). "
+            "Call this when you learn important information about the project — goals, decisions, preferences, "
+            "key findings, or status changes. Keep entries concise. "
+            "Do NOT call this for every message — only when genuinely important context should be persisted "
+            "for future conversations in this project."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "action": {
+                    "type": "string",
+                    "enum": ["append", "replace_section", "read"],
+                    "description": "append: add a new entry. replace_section: replace a named section. read: read current project.md",
+                },
+                "section": {
+                    "type": "string",
+                    "description": "Section name (e.g., 'Summary', 'Decisions', 'Status', 'Open Questions'). Required for replace_section.",
+                },
+                "content": {
+                    "type": "string",
+                    "description": "Content to write. For append: a concise bullet point or paragraph. For replace_section: the full new section content.",
+                },
+            },
+            "required": ["action"],
+        },
+    },
+}
+
+
+class ToolDefinitions(list):
+    """OpenAI-style tool definitions plus the ``digest`` of their canonical JSON."""
+
+    digest: str = ""
+
+
+@dataclass(frozen=True)
+class ToolBundleKey:
+    is_admin: bool
+    exec_mode: str | None  # None when exec is not offered
+    exec_bins: tuple[str, ...]
+    enabled_skills: tuple[str, ...]
+    workspace_skills_enabled: bool
+    force_web: bool
+    image_gen: bool
+    subagents: bool
+    project_update: bool
+    mcp_generation: int
+
+
+@dataclass(frozen=True)
+class ToolBundle:
+    key: ToolBundleKey
+    tools: ToolDefinitions
+    names: frozenset[str]
+    schemas_json: str
+
+    @property
+    def digest(self) -> str:
+        return self.tools.digest
+
+
+_bundles: OrderedDict[ToolBundleKey, ToolBundle] = OrderedDict()
+
+
+def _build_definitions(key: ToolBundleKey, mcp_tool_defs: list[dict]) -> list[dict]:
+    enabled = set(key.enabled_skills)
+    tools: list[dict] = []
+    # Exec tool (Claw-style): expose based on exec security policy. Admin-only.
+    if key.exec_mode is not None:
+        from app.exec_tool import get_bash_tool_openai_def, get_exec_tool_openai_def
+        from app.process_tool import get_process_tool_openai_def
+
+        bins = set(key.exec_bins)
+        tools += get_exec_tool_openai_def(bins, security_mode=key.exec_mode)
+        tools += get_bash_tool_openai_def(bins, security_mode=key.exec_mode)
+        # Process tool companion for long-running exec sessions
+        tools += get_process_tool_openai_def()
+    # Coding compatibility tools: admin-only (read/write/edit with alias normalization).
+    if key.is_admin and (key.workspace_skills_enabled or "files" in enabled):
+        from app.apply_patch_compat_tool import get_apply_patch_compat_tool_openai_def
+        from app.coding_compat_tool import get_coding_compat_tools_openai_def
+
+        tools += get_coding_compat_tools_openai_def()
+        tools += get_apply_patch_compat_tool_openai_def()
+    # Web/memory tools: allowed for ALL users (web search, etc.)
+    if key.workspace_skills_enabled or key.force_web:
+        from app.message_compat_tool import get_message_compat_tool_openai_def
+        from app.openclaw_compat_tools import get_openclaw_web_memory_tools_openai_def
+
+        tools += get_openclaw_web_memory_tools_openai_def()
+        tools += get_message_compat_tool_openai_def()
+    if key.is_admin and "files" in enabled:
+        from app.files_tool import get_files_tools_openai_def
+
+        tools += get_files_tools_openai_def()
+    if key.is_admin and "reminders" in enabled:
+        from app.reminders_tool import get_reminders_tool_openai_def
+
+        tools += get_reminders_tool_openai_def()
+    if key.is_admin:
+        from app.cron_tool import get_cron_tool_openai_def
+
+        tools += get_cron_tool_openai_def()
+    if key.is_admin and "spotify" in enabled:
+        from app.spotify_tool import get_spotify_tools_openai_def
+
+        tools += get_spotify_tools_openai_def()
+    # Image generation tool — allowed for ALL users (when a Gemini or Hugging Face key is set)
+    if key.image_gen:
+        from app.image_gen_tool import get_image_gen_tool_openai_def
+
+        tools += get_image_gen_tool_openai_def()
+    # PDF / office document generation — allowed for ALL users
+    from app.office_tool import (
+        get_docx_tool_openai_def, get_pptx_tool_openai_def, get_xlsx_tool_openai_def,
+        is_docx_available, is_pptx_available, is_xlsx_available,
+    )
+    from app.pdf_tool import get_pdf_tool_openai_def, is_fitz_available
+
+    if is_fitz_available():
+        tools += get_pdf_tool_openai_def()
+    if is_pptx_available():
+        tools += get_pptx_tool_openai_def()
+    if is_docx_available():
+        tools += get_docx_tool_openai_def()
+    if is_xlsx_available():
+        tools += get_xlsx_tool_openai_def()
+    if key.is_admin and key.subagents:
+        from app.subagent_orchestrator import get_subagent_tools_openai_def
+
+        tools += get_subagent_tools_openai_def()
+    if key.project_update:
+        tools.append(PROJECT_UPDATE_TOOL_DEF)
+    return tools + list(mcp_tool_defs)
+
+
+def _tool_name(tool: dict) -> str:
+    fn = tool.get("function") if isinstance(tool, dict) else None
+    return str((fn or {}).get("name") or "").strip() if isinstance(fn, dict) else ""
+
+
+def make_tool_bundle(key: ToolBundleKey, mcp_tool_defs: list[dict] | None = None) -> ToolBundle:
+    """Build (without caching) the bundle for ``key``."""
+    definitions = _build_definitions(key, mcp_tool_defs or [])
+    schemas_json = json.dumps(definitions, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    tools = ToolDefinitions(definitions)
+    tools.digest = hashlib.sha256(schemas_json.encode("utf-8")).hexdigest()[:16]
+    names = frozenset(n for n in map(_tool_name, definitions) if n)
+    return ToolBundle(key=key, tools=tools, names=names, schemas_json=schemas_json)
+
+
+def get_tool_bundle(key: ToolBundleKey, mcp_tool_defs: list[dict] | None = None) -> ToolBundle:
+    """Cached bundle for ``key``. ``mcp_tool_defs`` must match ``key.mcp_generation``."""
+    bundle = _bundles.get(key)
+    if bundle is not None:
+        _bundles.move_to_end(key)
+        return bundle
+    bundle = make_tool_bundle(key, mcp_tool_defs)
+    _bundles[key] = bundle
+    while len(_bundles) > TOOL_BUNDLE_CACHE_SIZE:
+        _bundles.popitem(last=False)
+    logger.info("Built tool bundle %s: %d tools, %d schema chars", bundle.digest, len(bundle.tools), len(bundle.schemas_json))
+    return bundle
+
+
+def clear_tool_bundles() -> None:
+    _bundles.clear()
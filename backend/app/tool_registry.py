@@ -0,0 +1,160 @@
+"""Tool dispatch table for the handle_message tool loop.
+
+Each tool is a ``ToolHandler`` with three hooks:
+
+- ``parse(raw_args)``: raw model arguments (JSON string or dict) -> params dict.
+  Defaults to the already-decoded JSON object.
+- ``execute(call, params)``: run the tool and return its text output.
+- ``summarize(call, params)``: trace label for the reply's tool trace, or None.
+  Defaults to the plain tool label; ``action_label`` adds ``params["action"]``.
+
+``ToolRegistry`` maps tool names (plus optional name prefixes such as ``mcp_``)
+to handlers, so the loop does one dict lookup instead of walking an if/elif
+chain, and times every call. Timings are kept per tool name in-process
+(``tool_timing_stats``) for benchmarking.
+"""
+from __future__ import annotations
+
+import importlib
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from app.tool_call_parser import _build_tool_trace_label
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ToolCall:
+    """One tool call from the model, as seen by a handler."""
+
+    name: str
+    raw_args: Any
+    args: dict[str, Any]
+    index: int = 0
+    tool_call_id: str = ""
+
+
+def plain_label(call: ToolCall, params: dict[str, Any]) -> str | None:
+    return _build_tool_trace_label(call.name)
+
+
+def action_label(call: ToolCall, params: dict[str, Any]) -> str | None:
+    action = params.get("action") if isinstance(params, dict) else None
+    return _build_tool_trace_label(call.name, str(action or ""))
+
+
+def lazy_parser(module: str, attr: str) -> Callable[[Any], dict[str, Any]]:
+    """Argument parser looked up at call time (tool modules are imported lazily and patched in tests)."""
+
+    def _parse(raw_args: Any) -> dict[str, Any]:
+        return getattr(importlib.import_module(module), attr)(raw_args)
+
+    return _parse
+
+
+@dataclass
+class ToolHandler:
+    names: tuple[str, ...]
+    execute: Callable[[ToolCall, dict[str, Any]], Awaitable[str]]
+    parse: Callable[[Any], dict[str, Any]] | None = None
+    summarize: Callable[[ToolCall, dict[str, Any]], str | None] | None = plain_label
+    # False when the generic outcome tracking after the call is skipped (execute() records its
+    # own outcome with parsed params, or the tool is not tracked).
+    track_outcome: bool = True
+
+    def parse_args(self, call: ToolCall) -> dict[str, Any]:
+        if self.parse is None:
+            return call.args
+        return self.parse(call.raw_args)
+
+
+@dataclass
+class ToolResult:
+    output: str
+    params: dict[str, Any]
+    label: str | None
+    duration_ms: float
+
+
+@dataclass
+class _ToolTiming:
+    calls: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+
+_timings: dict[str, _ToolTiming] = {}
+
+
+def _record_timing(name: str, duration_ms: float, *, failed: bool) -> None:
+    timing = _timings.setdefault(name, _ToolTiming())
+    timing.calls += 1
+    timing.errors += int(failed)
+    timing.total_ms += duration_ms
+    timing.max_ms = max(timing.max_ms, duration_ms)
+
+
+def tool_timing_stats() -> dict[str, dict[str, float]]:
+    """Per-tool call counts and latency (ms) since process start."""
+    return {
+        name: {
+            "calls": t.calls,
+            "errors": t.errors,
+            "avg_ms": round(t.total_ms / t.calls, 1) if t.calls else 0.0,
+            "max_ms": round(t.max_ms, 1),
+        }
+        for name, t in sorted(_timings.items())
+    }
+
+
+def reset_tool_timing_stats() -> None:
+    _timings.clear()
+
+
+@dataclass
+class ToolRegistry:
+    _handlers: dict[str, ToolHandler] = field(default_factory=dict)
+    _prefixes: list[tuple[str, ToolHandler]] = field(default_factory=list)
+
+    def register(self, handler: ToolHandler, *, prefix: str | None = None) -> ToolHandler:
+        for name in handler.names:
+            if name in self._handlers:
+                raise ValueError(f"Tool '{name}' is already registered")
+            self._handlers[name] = handler
+        if prefix:
+            self._prefixes.append((prefix, handler))
+        return handler
+
+    def get(self, name: str) -> ToolHandler | None:
+        handler = self._handlers.get(name)
+        if handler is not None:
+            return handler
+        for prefix, prefixed in self._prefixes:
+            if name.startswith(prefix):
+                return prefixed
+        return None
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def names(self) -> list[str]:
+        return sorted(self._handlers)
+
+    async def dispatch(self, handler: ToolHandler, call: ToolCall) -> ToolResult:
+        """Parse, execute and summarize one call, timing the execute step."""
+        params = handler.parse_args(call)
+        started = time.perf_counter()
+        failed = True
+        try:
+            output = await handler.execute(call, params)
+            failed = False
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            _record_timing(call.name, duration_ms, failed=failed)
+            logger.debug("Tool %s took %.1fms", call.name, duration_ms)
+        label = handler.summarize(call, params) if handler.summarize else None
+        return ToolResult(output=output, params=params, label=label, duration_ms=duration_ms)
@@ -0,0 +1,94 @@
+"""Concurrent execution of the read-only tool calls in one tool round.
+
+Models often emit several ``web_search`` / ``web_fetch`` / ``read_file`` /
+``memory_search`` calls in a single assistant message. The tool loop in
+handle_message still walks the calls in order (loop detection, outcome
+tracking and the appended ``role: tool`` messages stay deterministic); this
+module only lets it start the read-only calls up front so their I/O overlaps.
+
+- ``is_read_only_tool_call`` decides which calls may run early: a fixed set of
+  side-effect-free tools, minus anything ``_is_likely_mutating_tool_call`` flags.
+- ``ReadOnlyToolBatch.start`` schedules a call under a per-turn concurrency cap;
+  ``run`` returns its result (or runs the call inline if it was never started).
+- ``close`` cancels calls the loop never consumed (e.g. blocked by loop detection).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.tool_call_parser import _is_likely_mutating_tool_call
+
+logger = logging.getLogger(__name__)
+
+READ_ONLY_TOOL_NAMES = frozenset({
+    "web_search",
+    "web_fetch",
+    "memory_search",
+    "memory_get",
+    "read_file",
+    "read",
+    "list_directory",
+})
+
+ToolCallFactory = Callable[[], Awaitable[str]]
+
+
+def parse_tool_call(tc: dict[str, Any]) -> tuple[str | None, Any, dict[str, Any]]:
+    """(name, raw arguments, arguments dict) of an OpenAI-style tool call."""
+    fn = (tc.get("function") or {}) if isinstance(tc.get("function"), dict) else {}
+    name = fn.get("name") or tc.get("function", {}).get("name")
+    args_str = fn.get("arguments") or "{}"
+    args_data: dict[str, Any] = {}
+    if isinstance(args_str, dict):
+        args_data = args_str
+    elif isinstance(args_str, str):
+        try:
+            parsed_args = json.loads(args_str)
+            if isinstance(parsed_args, dict):
+                args_data = parsed_args
+        except Exception:
+            args_data = {}
+    return name, args_str, args_data
+
+
+def is_read_only_tool_call(tool_name: str, args: dict[str, Any] | None = None) -> bool:
+    name = (tool_name or "").strip().lower()
+    return name in READ_ONLY_TOOL_NAMES and not _is_likely_mutating_tool_call(name, args)
+
+
+class ReadOnlyToolBatch:
+    """Read-only calls of one tool round, started early and consumed in call order."""
+
+    def __init__(self, max_concurrency: int) -> None:
+        self._semaphore = asyncio.Semaphore(max(1, int(max_concurrency)))
+        self._tasks: dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    async def _limited(self, factory: ToolCallFactory) -> str:
+        async with self._semaphore:
+            return await factory()
+
+    def start(self, key: Hashable, factory: ToolCallFactory) -> None:
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._limited(factory))
+
+    async def run(self, key: Hashable, factory: ToolCallFactory) -> str:
+        """Result of the call started under ``key``, or ``factory()`` run inline."""
+        task = self._tasks.pop(key, None)
+        if task is None:
+            return await factory()
+        return await task
+
+    async def close(self) -> None:
+        pending = list(self._tasks.values())
+        self._tasks.clear()
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.debug("Cancelled %d unused read-only tool call(s)", len(pending))
+            await asyncio.gather(*pending, return_exceptions=True)
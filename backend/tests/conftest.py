@@ -0,0 +1,49 @@
+"""Shared fixtures for the RAG service tests."""
+import sqlite3
+
+import pytest
+
+from app.rag.service import RAGService
+
+
+class FakeCollection:
+    """In-memory stand-in for the Chroma collection calls RAGService makes."""
+
+    def __init__(self):
+        self.rows = {}  # id -> (document, metadata)
+        self.upserts = []  # (ids, embeddings, documents, metadatas) per upsert call
+        self.full_scans = 0
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.upserts.append((ids, embeddings, documents, metadatas))
+        for i, d, m in zip(ids, documents, metadatas):
+            self.rows[i] = (d, m)
+
+    def count(self):
+        return len(self.rows)
+
+    def get(self, ids=None, where=None, include=None, limit=None):
+        if ids is not None:
+            found = [i for i in ids if i in self.rows]
+        elif where is not None:
+            found = [i for i, (_, m) in self.rows.items() if m.get("topic") == where["topic"]]
+        else:
+            self.full_scans += 1
+            found = list(self.rows)
+        return {
+            "ids": found,
+            "documents": [self.rows[i][0] for i in found],
+            "metadatas": [self.rows[i][1] for i in found],
+        }
+
+    def delete(self, ids):
+        for i in ids:
+            self.rows.pop(i, None)
+
+
+@pytest.fixture
+def rag_svc():
+    """RAGService over a FakeCollection and an in-memory FTS database."""
+    svc = RAGService(collection=FakeCollection(), fts_conn=sqlite3.connect(":memory:", check_same_thread=False))
+    yield svc
+    svc._fts_conn.close()
@@ -0,0 +1,77 @@
+"""In-process API key cache in app.keys."""
+import uuid
+
+import pytest
+
+from app import keys
+from app.db import get_db
+from app.providers import fallback
+
+
+class _CountingDb:
+    def __init__(self, stored):
+        self.stored = stored
+        self.loads = 0
+
+    async def connect(self):
+        return None
+
+    async def get_api_keys(self):
+        self.loads += 1
+        return dict(self.stored)
+
+    async def get_provider_runtime_states(self, user_id, providers):
+        return {}
+
+
+@pytest.fixture
+def counting_db(monkeypatch):
+    db = _CountingDb({"anthropic_api_key": "sk-ant", "openrouter_api_key": "sk-or"})
+    monkeypatch.setattr(keys, "get_db", lambda: db)
+    keys.reset_api_key_cache()
+    yield db
+    keys.reset_api_key_cache()
+
+
+@pytest.mark.asyncio
+async def test_lookups_hit_sqlite_once(counting_db):
+    assert await keys.get_api_key("anthropic_api_key") == "sk-ant"
+    assert await keys.get_api_key("openrouter_api_key") == "sk-or"
+    assert keys.get_api_key_sync("anthropic_api_key") == "sk-ant"
+    names = await fallback.get_available_fallback_providers(counting_db, "u", exclude_provider="claude")
+
+    assert "openrouter" in names and "claude" not in names
+    assert counting_db.loads == 1
+
+
+@pytest.mark.asyncio
+async def test_change_notification_updates_cache_and_listeners(counting_db, monkeypatch):
+    seen = []
+    monkeypatch.setattr(keys, "_listeners", [seen.append])
+    await keys.load_api_keys()
+
+    keys.notify_api_key_changed("anthropic_api_key", "sk-new")
+    keys.notify_api_key_changed("openrouter_api_key", "")
+
+    assert keys.get_stored_api_key_sync("anthropic_api_key") == "sk-new"
+    assert keys.get_stored_api_key_sync("openrouter_api_key") is None
+    assert seen == ["anthropic_api_key", "openrouter_api_key"]
+    assert counting_db.loads == 1
+
+
+@pytest.mark.asyncio
+async def test_set_stored_api_key_refreshes_cached_value():
+    # Test-only key name: never touches a key the developer has stored in the dev DB.
+    key_name = f"test_cache_key_{uuid.uuid4().hex[:8]}"
+    db = get_db()
+    await db.connect()
+    keys.reset_api_key_cache()
+    try:
+        await db.set_stored_api_key(key_name, "first")
+        assert await keys.get_api_key(key_name) == "first"
+
+        await db.set_stored_api_key(key_name, "second")
+        assert keys.get_api_key_sync(key_name) == "second"
+    finally:
+        await db.set_stored_api_key(key_name, "")
+    assert keys.get_stored_api_key_sync(key_name) is None
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.db import get_db
+import app.routers.chat as chat_router
+
+
+def _request(user_id: str):
+    return SimpleNamespace(state=SimpleNamespace(user_id=user_id, user_role="admin"))
+
+
+@pytest.mark.asyncio
+async def test_chat_messages_keyset_pages_back_and_forward():
+    db = get_db()
+    await db.connect()
+    user_id = f"test-paging-{uuid.uuid4().hex[:8]}"
+    cid = await db.create_new_conversation(user_id, "web")
+    for i in range(7):
+        await db.add_message(cid, "user", f"m{i}")
+    req = _request(user_id)
+
+    page = await chat_router.get_chat_messages(req, conversation_id=cid, limit=3, before_id=None, after_id=None)
+    assert [m["content"] for m in page["messages"]] == ["m4", "m5", "m6"]
+    assert page["has_more"] is True
+
+    page = await chat_router.get_chat_messages(req, conversation_id=cid, limit=3, before_id=page["oldest_id"], after_id=None)
+    assert [m["content"] for m in page["messages"]] == ["m1", "m2", "m3"]
+    assert page["has_more"] is True
+
+    page = await chat_router.get_chat_messages(req, conversation_id=cid, limit=3, before_id=page["oldest_id"], after_id=None)
+    assert [m["content"] for m in page["messages"]] == ["m0"]
+    assert page["has_more"] is False
+
+    page = await chat_router.get_chat_messages(req, conversation_id=cid, limit=4, before_id=None, after_id=page["newest_id"])
+    assert [m["content"] for m in page["messages"]] == ["m1", "m2", "m3", "m4"]
+    assert page["has_more"] is True
+
+
+@pytest.mark.asyncio
+async def test_chat_messages_rejects_both_cursors():
+    user_id = f"test-paging-{uuid.uuid4().hex[:8]}"
+    with pytest.raises(HTTPException) as exc:
+        await chat_router.get_chat_messages(
+            _request(user_id), conversation_id=f"{user_id}:web", limit=10, before_id=5, after_id=1
+        )
+    assert exc.value.status_code == 400
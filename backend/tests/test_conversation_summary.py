@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import uuid
+
+import pytest
+
+from app.db import get_db
+
+
+@pytest.mark.asyncio
+async def test_list_conversations_uses_maintained_summary_columns():
+    db = get_db()
+    await db.connect()
+    user_id = f"test-conv-summary-{uuid.uuid4().hex[:8]}"
+    empty = await db.create_new_conversation(user_id, "web")
+    older = await db.create_new_conversation(user_id, "web")
+    newer = await db.create_new_conversation(user_id, "web")
+    await db.add_message(older, "assistant", "hello there")
+    await db.add_message(older, "user", "x" * 120)
+    await db.add_message(older, "user", "second question")
+    await db.add_message(newer, "user", "newest")
+
+    convs = await db.list_conversations(user_id, "web")
+    assert empty not in [c["id"] for c in convs]
+    by_id = {c["id"]: c for c in convs}
+    assert by_id[older]["message_count"] == 3
+    assert by_id[older]["approx_tokens"] == (11 + 120 + 15) // 4
+    assert by_id[older]["title"] == "x" * 80 + "…"
+    assert by_id[newer]["title"] == "newest"
+
+    await db.truncate_conversation_messages(older, keep_count=1)
+    by_id = {c["id"]: c for c in await db.list_conversations(user_id, "web")}
+    assert by_id[older]["message_count"] == 1
+    assert by_id[older]["approx_tokens"] == 11 // 4
+    assert by_id[older]["title"] == "New conversation"
+
+    await db.truncate_conversation_messages(newer, keep_count=0)
+    ids = [c["id"] for c in await db.list_conversations(user_id, "web")]
+    assert ids == [older]
@@ -0,0 +1,80 @@
+"""Read/write routing for the SQLite connection pool."""
+
+import asyncio
+import os
+import tempfile
+
+import aiosqlite
+import pytest
+
+from app.db_pool import ReadResult, RoutedConnection, is_read_statement, open_readers
+
+
+def test_is_read_statement_classifies_by_leading_keyword():
+    assert is_read_statement("SELECT 1")
+    assert is_read_statement("  \n  select * from messages")
+    assert is_read_statement("-- comment\nSELECT id FROM t")
+    assert not is_read_statement("INSERT INTO t VALUES (1)")
+    assert not is_read_statement("PRAGMA table_info(t)")
+    assert not is_read_statement("WITH x AS (SELECT 1) DELETE FROM t")
+    assert not is_read_statement("SELECT last_insert_rowid()")
+
+
+@pytest.mark.asyncio
+async def test_routed_connection_reads_from_pool_and_sees_committed_writes():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "pool.db")
+        writer = await aiosqlite.connect(path)
+        writer.row_factory = aiosqlite.Row
+        await writer.execute("PRAGMA journal_mode = WAL")
+        await writer.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+        await writer.commit()
+        readers = await open_readers(path, 2)
+        assert len(readers) == 2
+        conn = RoutedConnection(writer, readers)
+        try:
+            await conn.execute("INSERT INTO t (v) VALUES ('a')")
+            # Uncommitted write: reads stay on the writer so the row is visible.
+            assert conn.in_transaction
+            cur = await conn.execute("SELECT COUNT(*) AS n FROM t")
+            assert not isinstance(cur, ReadResult)
+            assert (await cur.fetchone())["n"] == 1
+            await conn.commit()
+
+            cur = await conn.execute("SELECT v FROM t ORDER BY id")
+            assert isinstance(cur, ReadResult)
+            assert [r["v"] for r in await cur.fetchall()] == ["a"]
+
+            cur = await conn.execute("SELECT last_insert_rowid()")
+            assert not isinstance(cur, ReadResult)
+        finally:
+            await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_open_readers_skips_memory_database():
+    assert await open_readers(":memory:", 3) == []
+
+
+@pytest.mark.asyncio
+async def test_reads_skip_readers_whose_worker_thread_exited():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "pool.db")
+        writer = await aiosqlite.connect(path)
+        await writer.execute("PRAGMA journal_mode = WAL")
+        await writer.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+        await writer.commit()
+        readers = await open_readers(path, 2)
+        conn = RoutedConnection(writer, list(readers))
+        try:
+            await readers[0].close()  # worker thread exits, like after a closed event loop
+            for _ in range(3):
+                cur = await asyncio.wait_for(conn.execute("SELECT COUNT(*) FROM t"), timeout=2)
+                assert isinstance(cur, ReadResult)
+            assert conn.readers == [readers[1]]
+
+            await readers[1].close()
+            cur = await asyncio.wait_for(conn.execute("SELECT COUNT(*) FROM t"), timeout=2)
+            assert not isinstance(cur, ReadResult) and conn.readers == []
+        finally:
+            await conn.close()
@@ -104,3 +104,43 @@ def test_conversations_has_folder_id_column():
         cols = asyncio.run(_run())
         assert "folder_id" in cols
         assert "title" in cols
+
+
+def test_conversation_summary_columns_backfilled_for_existing_rows():
+    """Installs that predate the summary columns get them populated from messages."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, "test.db")
+
+        async def _run():
+            conn = await aiosqlite.connect(db_path)
+            conn.row_factory = aiosqlite.Row
+            try:
+                await conn.executescript("""
+                    CREATE TABLE conversations (
+                        id TEXT PRIMARY KEY, user_id TEXT NOT NULL, channel TEXT NOT NULL, created_at TEXT NOT NULL
+                    );
+                    CREATE TABLE messages (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT, conversation_id TEXT NOT NULL, role TEXT NOT NULL,
+                        content TEXT NOT NULL, provider_used TEXT, created_at TEXT NOT NULL
+                    );
+                    INSERT INTO conversations VALUES ('c1', 'u1', 'web', '2024-01-01 00:00:00');
+                    INSERT INTO messages (conversation_id, role, content, created_at)
+                        VALUES ('c1', 'assistant', 'hi', '2024-01-01 00:00:01'),
+                               ('c1', 'user', 'what is up', '2024-01-01 00:00:02');
+                """)
+                from app.db_schema import init_schema
+                await init_schema(conn, logging.getLogger("test"))
+                cursor = await conn.execute(
+                    "SELECT last_active_at, message_count, approx_chars, first_user_snippet FROM conversations WHERE id = 'c1'"
+                )
+                return dict(await cursor.fetchone())
+            finally:
+                await conn.close()
+
+        row = asyncio.run(_run())
+        assert row == {
+            "last_active_at": "2024-01-01 00:00:02",
+            "message_count": 2,
+            "approx_chars": 12,
+            "first_user_snippet": "what is up",
+        }
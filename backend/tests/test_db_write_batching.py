@@ -0,0 +1,202 @@
+"""Group-committed writes through app.db_writes.WriteBatcher."""
+
+import asyncio
+import os
+import tempfile
+
+import aiosqlite
+import pytest
+
+from app.db_pool import RoutedConnection
+from app.db_writes import WriteBatcher
+
+
+async def _open(path: str) -> RoutedConnection:
+    writer = await aiosqlite.connect(path)
+    writer.row_factory = aiosqlite.Row
+    await writer.execute("CREATE TABLE IF NOT EXISTS t (id INTEGER PRIMARY KEY, v TEXT UNIQUE)")
+    await writer.commit()
+    return RoutedConnection(writer)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_share_one_commit():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = await _open(os.path.join(tmpdir, "w.db"))
+        commits = 0
+        real_commit = conn.writer.commit
+
+        async def _counting_commit():
+            nonlocal commits
+            commits += 1
+            await real_commit()
+
+        conn.writer.commit = _counting_commit
+        batcher = WriteBatcher(conn, window_ms=20)
+        try:
+            await asyncio.gather(*(
+                batcher.submit([("INSERT INTO t (v) VALUES (?)", (f"v{i}",))], durable=True)
+                for i in range(10)
+            ))
+            assert commits == 1
+            cur = await conn.execute("SELECT COUNT(*) AS n FROM t")
+            assert (await cur.fetchone())["n"] == 10
+        finally:
+            await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_fire_and_forget_writes_are_applied_on_flush_and_durable_errors_raise():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = await _open(os.path.join(tmpdir, "w.db"))
+        batcher = WriteBatcher(conn, window_ms=10_000)
+        try:
+            await batcher.submit([("INSERT INTO t (v) VALUES (?)", ("a",))])
+            assert batcher.pending == 1
+            await batcher.flush()
+            assert batcher.pending == 0
+            cur = await conn.execute("SELECT v FROM t")
+            assert [r["v"] for r in await cur.fetchall()] == ["a"]
+
+            with pytest.raises(Exception):
+                await asyncio.wait_for(
+                    asyncio.gather(
+                        batcher.submit([("INSERT INTO t (v) VALUES (?)", ("a",))], durable=True),
+                        batcher.flush(),
+                    ),
+                    timeout=5,
+                )
+        finally:
+            await batcher.close()
+            await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_batcher_rebinds_after_its_loop_closed():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = await _open(os.path.join(tmpdir, "w.db"))
+        batcher = WriteBatcher(conn, window_ms=20)
+
+        async def _submit_and_exit():
+            # asyncio.run cancels the pending flush timer when this loop ends.
+            await batcher.submit([("INSERT INTO t (v) VALUES (?)", ("old",))])
+
+        try:
+            await asyncio.to_thread(asyncio.run, _submit_and_exit())
+            await asyncio.wait_for(
+                batcher.submit([("INSERT INTO t (v) VALUES (?)", ("new",))], durable=True),
+                timeout=2,
+            )
+            cur = await conn.execute("SELECT v FROM t ORDER BY v")
+            assert [r["v"] for r in await cur.fetchall()] == ["new", "old"]
+        finally:
+            await batcher.close()
+            await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_flush_waits_for_batch_already_in_flight():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = await _open(os.path.join(tmpdir, "w.db"))
+        batcher = WriteBatcher(conn, window_ms=10_000)
+        real_execute = conn.writer.execute
+
+        async def _slow_execute(sql, params=None):
+            if sql.startswith("INSERT"):
+                await asyncio.sleep(0.01)
+            return await real_execute(sql, params)
+
+        conn.writer.execute = _slow_execute
+        try:
+            for i in range(5):
+                await batcher.submit([("INSERT INTO t (v) VALUES (?)", (f"v{i}",))])
+            in_flight = asyncio.create_task(batcher.flush())
+            await asyncio.sleep(0.015)  # first rows applied, batch not yet committed
+            assert batcher.pending == 0
+            await batcher.flush()
+            cur = await conn.execute("SELECT COUNT(*) AS n FROM t")
+            assert (await cur.fetchone())["n"] == 5
+            await in_flight
+        finally:
+            await batcher.close()
+            await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_close_completes_in_flight_timer_flush():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = await _open(os.path.join(tmpdir, "w.db"))
+        batcher = WriteBatcher(conn, window_ms=1)
+        real_execute = conn.writer.execute
+
+        async def _slow_execute(sql, params=None):
+            if sql.startswith("INSERT"):
+                await asyncio.sleep(0.01)
+            return await real_execute(sql, params)
+
+        conn.writer.execute = _slow_execute
+        try:
+            durable = asyncio.create_task(
+                batcher.submit([("INSERT INTO t (v) VALUES (?)", ("d",))], durable=True)
+            )
+            for i in range(5):
+                await batcher.submit([("INSERT INTO t (v) VALUES (?)", (f"v{i}",))])
+            await asyncio.sleep(0.015)  # timer flush is mid-batch
+            await batcher.close()
+            await asyncio.wait_for(durable, timeout=2)
+            cur = await conn.execute("SELECT COUNT(*) AS n FROM t")
+            assert (await cur.fetchone())["n"] == 6
+        finally:
+            await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_failed_statement_rolls_back_only_its_own_write():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = await _open(os.path.join(tmpdir, "w.db"))
+        batcher = WriteBatcher(conn, window_ms=10_000)
+        try:
+            await batcher.submit([("INSERT INTO t (v) VALUES (?)", ("dup",))])
+            await batcher.submit([
+                ("INSERT INTO t (v) VALUES (?)", ("first-half",)),
+                ("INSERT INTO t (v) VALUES (?)", ("dup",)),  # UNIQUE violation
+            ])
+            await batcher.submit([("INSERT INTO t (v) VALUES (?)", ("after",))])
+            await batcher.flush()
+            cur = await conn.execute("SELECT v FROM t ORDER BY v")
+            assert [r["v"] for r in await cur.fetchall()] == ["after", "dup"]
+        finally:
+            await batcher.close()
+            await conn.close()
+
+
+@pytest.mark.asyncio
+async def test_other_writers_wait_for_an_in_flight_batch():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = await _open(os.path.join(tmpdir, "w.db"))
+        batcher = WriteBatcher(conn, window_ms=10_000)
+        real_execute = conn.writer.execute
+
+        async def _slow_execute(sql, params=None):
+            if sql.startswith("INSERT INTO t (v) VALUES (?)") and params and params[0].startswith("b"):
+                await asyncio.sleep(0.01)
+            return await real_execute(sql, params)
+
+        conn.writer.execute = _slow_execute
+
+        async def _unbatched_write_then_rollback():
+            await conn.execute("INSERT INTO t (v) VALUES (?)", ("other",))
+            await conn.rollback()
+
+        try:
+            for i in range(5):
+                await batcher.submit([("INSERT INTO t (v) VALUES (?)", (f"b{i}",))])
+            in_flight = asyncio.create_task(batcher.flush())
+            await asyncio.sleep(0.015)  # batch is mid-transaction
+            await asyncio.wait_for(_unbatched_write_then_rollback(), timeout=2)
+            await in_flight
+            cur = await conn.execute("SELECT v FROM t ORDER BY v")
+            assert [r["v"] for r in await cur.fetchall()] == [f"b{i}" for i in range(5)]
+        finally:
+            await batcher.close()
+            await conn.close()
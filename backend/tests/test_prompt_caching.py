@@ -0,0 +1,102 @@
+"""Stable/volatile system prompt split and Claude prompt-cache breakpoints."""
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+import app.db as db_module
+from app.context import build_context
+from app.db import get_db
+from app.providers.base import PromptContext, split_prompt_context
+from app.providers.claude import ClaudeProvider
+
+
+def test_prompt_context_keeps_its_stable_prefix_when_appended_to():
+    ctx = PromptContext.from_parts("stable\n", "volatile")
+    ctx += "\n\n[WEB MODE]"
+
+    assert isinstance(ctx, PromptContext)
+    assert split_prompt_context(ctx) == ("stable\n", "volatile\n\n[WEB MODE]")
+    assert split_prompt_context("plain") == ("", "plain")
+    assert split_prompt_context(None) == ("", "")
+
+
+@pytest.mark.asyncio
+async def test_build_context_puts_per_turn_state_after_the_stable_prefix():
+    db = get_db()
+    await db.connect()
+
+    first = await build_context(db, "cache-split-user", None, extra={}, skills_in_use=set())
+    second = await build_context(db, "cache-split-user", None, extra={}, skills_in_use={"files"})
+    stable, volatile = split_prompt_context(first)
+
+    assert stable and "[CRON]" in stable and "--- State (factual) ---" not in stable
+    assert "--- State (factual) ---" in volatile
+    assert split_prompt_context(second)[0] == stable  # routed sections only change the suffix
+    assert "[FILES]" in split_prompt_context(second)[1]
+
+
+def _fake_anthropic(calls, usage):
+    class _Messages:
+        async def create(self, **kwargs):
+            calls.append(kwargs)
+            return SimpleNamespace(content=[SimpleNamespace(type="text", text="ok")], usage=usage)
+
+    class _Client:
+        def __init__(self, **kwargs):
+            self.messages = _Messages()
+
+    return _Client
+
+
+@pytest.mark.asyncio
+async def test_claude_marks_cache_breakpoints_and_records_cache_tokens(monkeypatch):
+    calls = []
+    usage = SimpleNamespace(
+        input_tokens=50, output_tokens=7, cache_read_input_tokens=1200, cache_creation_input_tokens=300
+    )
+    recorded = AsyncMock()
+    monkeypatch.setattr(db_module, "get_db", lambda: SimpleNamespace(record_usage=recorded))
+    tools = [
+        {"type": "function", "function": {"name": "exec", "parameters": {}}},
+        {"type": "function", "function": {"name": "read", "parameters": {}}},
+    ]
+    messages = [
+        {"role": "user", "content": "list files"},
+        {"role": "assistant", "content": "", "tool_calls": [
+            {"id": "t1", "function": {"name": "exec", "arguments": "{}"}},
+        ]},
+        {"role": "tool", "tool_call_id": "t1", "content": "a.txt"},
+    ]
+
+    with patch("app.providers.claude.get_api_key", new=AsyncMock(return_value="k")), patch(
+        "app.providers.claude.AsyncAnthropic", _fake_anthropic(calls, usage)
+    ):
+        resp = await ClaudeProvider().chat(
+            messages, context=PromptContext.from_parts("workspace\n", "recent chat"), tools=tools
+        )
+
+    assert resp.content == "ok"
+    sent = calls[0]
+    assert [b["text"] for b in sent["system"]] == ["workspace\n", "recent chat"]
+    assert all(b["cache_control"] == {"type": "ephemeral"} for b in sent["system"])
+    assert "cache_control" not in sent["tools"][0] and sent["tools"][-1]["cache_control"]
+    assert sent["messages"][-1]["content"][-1]["cache_control"] == {"type": "ephemeral"}
+    assert "cache_control" not in str(sent["messages"][:-1])
+    recorded.assert_awaited_once_with(
+        "claude", "claude-3-5-sonnet-20241022", 50, 7, cache_read_tokens=1200, cache_write_tokens=300
+    )
+
+
+@pytest.mark.asyncio
+async def test_usage_stats_include_cache_tokens():
+    db = get_db()
+    await db.connect()
+    user_id = f"test-usage-cache-{uuid.uuid4().hex[:8]}"
+    await db.record_usage("claude", "sonnet", 10, 2, user_id=user_id, cache_read_tokens=900, cache_write_tokens=100)
+    await db.record_usage("claude", "sonnet", 10, 2, user_id=user_id, cache_read_tokens=1000, durable=True)
+
+    (row,) = await db.get_usage_stats(user_id=user_id, days=1)
+
+    assert (row["input_tokens"], row["cache_read_tokens"], row["cache_write_tokens"]) == (20, 1900, 100)
@@ -0,0 +1,156 @@
+"""Rolling provider call stats and the adaptive provider flow mode."""
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import keys
+from app.db import get_db
+from app.provider_flow import adaptive_provider_order, is_provider_degraded, update_call_stats
+from app.providers.base import BaseProvider, ProviderError, ProviderResponse
+from app.providers.fallback import chat_with_fallback, get_available_fallback_providers
+
+NOW = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+RECENT = (NOW - timedelta(seconds=30)).strftime("%Y-%m-%d %H:%M:%S")
+STALE = (NOW - timedelta(hours=2)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def test_update_call_stats_tracks_ewma_percentiles_and_errors():
+    stats = None
+    for latency in (100, 200, 300, 400, 1000):
+        stats = update_call_stats(stats, model="m", ok=True, latency_ms=latency, ttft_ms=latency / 2)
+    stats = update_call_stats(stats, model="m", ok=False, latency_ms=5)
+
+    assert stats["calls"] == 6
+    assert stats["latency_p50_ms"] == 300
+    assert stats["latency_p95_ms"] == 1000
+    assert json.loads(stats["latency_window"]) == [100, 200, 300, 400, 1000]  # failure latency ignored
+    assert 100 < stats["latency_ewma_ms"] < 1000
+    assert stats["ttft_ewma_ms"] == pytest.approx(stats["latency_ewma_ms"] / 2)
+    assert stats["error_rate"] == pytest.approx(0.3)
+
+    switched = update_call_stats(stats, model="other", ok=True, latency_ms=50)
+    assert switched["calls"] == 1 and switched["latency_p95_ms"] == 50
+
+
+def test_adaptive_order_prefers_fast_providers_and_sinks_degraded_ones():
+    states = {
+        "claude": {"calls": 10, "latency_ewma_ms": 4000, "error_rate": 0.0, "last_call_at": RECENT},
+        "google": {"calls": 10, "latency_ewma_ms": 800, "error_rate": 0.9, "last_call_at": RECENT},
+        "openrouter": {"calls": 10, "latency_ewma_ms": 1200, "error_rate": 0.0, "last_call_at": RECENT},
+        "ollama": {},
+    }
+
+    assert is_provider_degraded(states["google"], NOW)
+    assert not is_provider_degraded({**states["google"], "last_call_at": STALE}, NOW)
+    assert adaptive_provider_order(["claude", "google", "openrouter", "ollama"], states, NOW) == [
+        "openrouter", "ollama", "claude", "google",
+    ]
+
+
+class _StatesDb:
+    def __init__(self, states):
+        self.states = states
+
+    async def get_provider_runtime_states(self, user_id, providers):
+        return {p: self.states.get(p, {}) for p in providers}
+
+
+@pytest.mark.asyncio
+async def test_adaptive_fallbacks_skip_degraded_providers(monkeypatch):
+    monkeypatch.setattr(keys, "_stored_keys", {"anthropic_api_key": "a", "gemini_api_key": "g", "openrouter_api_key": "o"})
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    db = _StatesDb({
+        "google": {"calls": 5, "latency_ewma_ms": 300, "error_rate": 0.8, "last_call_at": now},
+        "openrouter": {"calls": 5, "latency_ewma_ms": 900, "error_rate": 0.0, "last_call_at": now},
+        "ollama": {"calls": 5, "latency_ewma_ms": 400, "error_rate": 0.0, "last_call_at": now},
+    })
+
+    fixed = await get_available_fallback_providers(db, "u", exclude_provider="claude")
+    adaptive = await get_available_fallback_providers(db, "u", exclude_provider="claude", flow_mode="adaptive")
+
+    assert fixed == ["google", "openrouter", "ollama"]
+    assert adaptive == ["ollama", "openrouter"]
+
+
+class _Provider(BaseProvider):
+    def __init__(self, name, error=None):
+        self._name = name
+        self.error = error
+
+    @property
+    def name(self):
+        return self._name
+
+    async def chat(self, messages, **kwargs):
+        if self.error:
+            return ProviderResponse(content="", error=self.error, error_message="down")
+        return ProviderResponse(content="ok")
+
+
+class _RecordingDb:
+    def __init__(self):
+        self.calls = []
+
+    async def get_provider_runtime_states(self, user_id, providers):
+        return {}
+
+    async def clear_provider_auto_disabled(self, user_id, provider):
+        pass
+
+    async def record_provider_call(self, user_id, provider, *, model, ok, latency_ms, ttft_ms):
+        self.calls.append((provider, model, ok, latency_ms is not None))
+
+
+@pytest.mark.asyncio
+async def test_chat_with_fallback_records_each_attempt(monkeypatch):
+    db = _RecordingDb()
+    fallback = _Provider("google")
+    monkeypatch.setattr("app.providers.registry.get_provider", lambda name: fallback)
+
+    resp, used = await chat_with_fallback(
+        _Provider("claude", error=ProviderError.TIMEOUT), [], ["google"],
+        model="claude-x", _fallback_models={"google": "gemini-x"}, _runtime_db=db, _runtime_user_id="u",
+    )
+
+    assert used is fallback
+    assert db.calls == [("claude", "claude-x", False, True), ("google", "gemini-x", True, True)]
+
+
+@pytest.mark.asyncio
+async def test_record_provider_call_persists_stats_in_runtime_state():
+    db = get_db()
+    await db.connect()
+    user_id = f"adaptive-stats-{uuid.uuid4().hex[:8]}"
+    for latency in (100, 300):
+        await db.record_provider_call(user_id, "ollama", model="llama", ok=True, latency_ms=latency, ttft_ms=40)
+    await db.record_provider_call(user_id, "ollama", model="llama", ok=False, latency_ms=None)
+
+    state = (await db.get_provider_runtime_states(user_id, ["ollama"]))["ollama"]
+
+    assert state["calls"] == 3 and state["stats_model"] == "llama"
+    assert state["latency_p95_ms"] == 300 and state["ttft_ewma_ms"] == 40
+    assert 0 < state["error_rate"] < 1
+    assert state["last_call_at"] and state["enabled"]
+
+    await db.set_user_provider_flow_mode(user_id, "adaptive")
+    assert (await db.get_user_settings_snapshot(user_id)).provider_flow_mode == "adaptive"
+    await db.set_user_provider_flow_mode(user_id, "bogus")
+    assert await db.get_user_provider_flow_mode(user_id) == "fixed"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_provider_calls_are_all_counted():
+    db = get_db()
+    await db.connect()
+    user_id = f"adaptive-concurrent-{uuid.uuid4().hex[:8]}"
+
+    await asyncio.gather(*(
+        db.record_provider_call(user_id, "groq", model="m", ok=True, latency_ms=50 + i)
+        for i in range(8)
+    ))
+
+    state = (await db.get_provider_runtime_states(user_id, ["groq"]))["groq"]
+    assert state["calls"] == 8
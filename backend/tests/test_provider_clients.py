@@ -0,0 +1,112 @@
+"""Pooled, long-lived LLM provider clients (app.providers.clients)."""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.providers import clients
+from app.providers.claude import ClaudeProvider
+
+
+class _FakeSdk:
+    created: list[dict] = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.closed = False
+        _FakeSdk.created.append(kwargs)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def _empty_pool():
+    clients._clients.clear()
+    clients._retired.clear()
+    _FakeSdk.created = []
+    yield
+    clients._clients.clear()
+    clients._retired.clear()
+
+
+@pytest.mark.asyncio
+async def test_clients_are_reused_per_key_and_endpoint():
+    a = clients.get_sdk_client("openai", _FakeSdk, api_key="k1")
+    b = clients.get_sdk_client("openai", _FakeSdk, api_key="k1")
+    c = clients.get_sdk_client("openai", _FakeSdk, api_key="k2")
+    d = clients.get_sdk_client("groq", _FakeSdk, api_key="k1", base_url="https://groq", timeout=30)
+
+    assert a is b
+    assert len({id(a), id(c), id(d)}) == 3
+    assert d.kwargs["base_url"] == "https://groq"
+    assert d.kwargs["timeout"] == 30
+    assert d.kwargs["http_client"] is not a.kwargs["http_client"]
+    await clients.close_provider_clients()
+
+
+@pytest.mark.asyncio
+async def test_key_change_invalidates_that_providers_clients_and_shutdown_closes_them():
+    claude = clients.get_sdk_client("claude", _FakeSdk, api_key="old")
+    openai = clients.get_sdk_client("openai", _FakeSdk, api_key="k")
+
+    assert clients.invalidate_clients_for_key("anthropic_api_key") == 1
+    assert clients.invalidate_clients_for_key("telegram_bot_token") == 0
+    assert clients.get_sdk_client("openai", _FakeSdk, api_key="k") is openai
+    assert not claude.closed  # may still be serving an in-flight request
+
+    await clients.close_provider_clients()
+
+    assert claude.closed and openai.closed
+    assert claude.kwargs["http_client"].is_closed
+    assert clients.pool_stats()["clients"] == 0
+
+
+@pytest.mark.asyncio
+async def test_retired_clients_close_once_their_requests_finish(monkeypatch):
+    monkeypatch.setattr(clients, "RETIRED_GRACE_S", 0.01)
+    busy = {True}
+    monkeypatch.setattr(clients, "_has_active_requests", lambda http: bool(busy))
+    old = clients.get_sdk_client("claude", _FakeSdk, api_key="old")
+
+    clients.invalidate_clients_for_key("anthropic_api_key")
+    await asyncio.sleep(0.05)
+    assert not old.closed and clients.pool_stats()["retired"] == 1
+
+    busy.clear()
+    await asyncio.sleep(0.05)
+    assert old.closed and old.kwargs["http_client"].is_closed
+    assert clients.pool_stats()["retired"] == 0
+
+
+def test_clients_are_rebuilt_on_a_new_event_loop():
+    async def _get():
+        return clients.get_sdk_client("openai", _FakeSdk, api_key="k")
+
+    first = asyncio.run(_get())
+    second = asyncio.run(_get())
+
+    assert first is not second
+    assert clients.pool_stats()["retired"] == 0  # the first loop is closed; nothing left to close
+
+
+@pytest.mark.asyncio
+async def test_claude_provider_reuses_one_client_across_calls():
+    class _Messages:
+        async def create(self, **kwargs):
+            return SimpleNamespace(content=[SimpleNamespace(type="text", text="ok")], usage=None)
+
+    class _Client(_FakeSdk):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            self.messages = _Messages()
+
+    with patch("app.providers.claude.get_api_key", new=AsyncMock(return_value="k")), patch(
+        "app.providers.claude.AsyncAnthropic", _Client
+    ):
+        for _ in range(3):
+            resp = await ClaudeProvider().chat([{"role": "user", "content": "hi"}])
+            assert resp.content == "ok"
+
+    assert len(_FakeSdk.created) == 1
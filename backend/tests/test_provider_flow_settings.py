@@ -54,6 +54,9 @@ class _DummyDB:
             )
         return out
 
+    async def get_user_provider_flow_mode(self, user_id: str) -> str:
+        return "fixed"
+
     async def get_all_provider_models(self, user_id: str) -> dict[str, str]:
         return dict(self.models)
 
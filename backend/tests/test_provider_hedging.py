@@ -0,0 +1,129 @@
+"""Opt-in hedged requests in app.providers.fallback.chat_with_fallback."""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.db import get_db
+from app.providers.base import BaseProvider, ProviderError, ProviderResponse
+from app.providers.fallback import chat_with_fallback
+
+
+class _SlowProvider(BaseProvider):
+    def __init__(self, name, delay, content="ok", error=None):
+        self._name = name
+        self.delay = delay
+        self.content = content
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    @property
+    def name(self):
+        return self._name
+
+    async def chat(self, messages, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            return ProviderResponse(content="", error=self.error, error_message="boom")
+        return ProviderResponse(content=self.content)
+
+
+class _RuntimeDb:
+    def __init__(self):
+        self.hedges = []
+        self.cleared = []
+
+    async def get_provider_runtime_states(self, user_id, providers):
+        return {}
+
+    async def clear_provider_auto_disabled(self, user_id, provider):
+        self.cleared.append(provider)
+
+    async def mark_provider_auto_disabled(self, user_id, provider, reason):
+        pass
+
+    async def record_provider_hedge_outcome(self, user_id, winner, loser):
+        self.hedges.append((winner, loser))
+
+
+def _registry(*providers):
+    by_name = {p.name: p for p in providers}
+    return patch("app.providers.registry.get_provider", side_effect=by_name.get)
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_loses_to_hedge_and_is_cancelled():
+    primary = _SlowProvider("claude", delay=5, content="late")
+    fallback = _SlowProvider("google", delay=0.01, content="fast")
+    db = _RuntimeDb()
+
+    with _registry(fallback):
+        resp, used = await asyncio.wait_for(
+            chat_with_fallback(
+                primary, [], ["google"], _hedge_after_s=0.05, _runtime_db=db, _runtime_user_id="u"
+            ),
+            timeout=2,
+        )
+        await asyncio.sleep(0)
+
+    assert (resp.content, used.name) == ("fast", "google")
+    assert primary.cancelled
+    assert db.hedges == [("google", "claude")]
+    assert db.cleared == ["google"]
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_never_starts_the_hedge():
+    primary = _SlowProvider("claude", delay=0, content="primary")
+    fallback = _SlowProvider("google", delay=0)
+    db = _RuntimeDb()
+
+    with _registry(fallback):
+        resp, used = await chat_with_fallback(
+            primary, [], ["google"], _hedge_after_s=0.5, _runtime_db=db, _runtime_user_id="u"
+        )
+
+    assert used is primary and resp.content == "primary"
+    assert fallback.calls == 0 and db.hedges == []
+
+
+@pytest.mark.asyncio
+async def test_failed_hedge_waits_for_primary_then_skips_it_in_serial_fallback():
+    primary = _SlowProvider("claude", delay=0.1, content="primary")
+    hedge = _SlowProvider("google", delay=0, error=ProviderError.TRANSIENT)
+    last = _SlowProvider("ollama", delay=0)
+
+    with _registry(hedge, last):
+        resp, used = await chat_with_fallback(primary, [], ["google", "ollama"], _hedge_after_s=0.01)
+
+    assert used is primary and resp.content == "primary"
+    assert hedge.calls == 1 and last.calls == 0
+
+    primary = _SlowProvider("claude", delay=0.1, error=ProviderError.TIMEOUT)
+    hedge = _SlowProvider("google", delay=0, error=ProviderError.TRANSIENT)
+    with _registry(hedge, last):
+        resp, used = await chat_with_fallback(primary, [], ["google", "ollama"], _hedge_after_s=0.01)
+
+    assert used is last
+    assert hedge.calls == 1 and last.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_outcome_is_counted_in_provider_runtime_state():
+    db = get_db()
+    await db.connect()
+    user_id = "hedge-test-user"
+    before = await db.get_provider_runtime_states(user_id, ["google", "claude"])
+
+    await db.record_provider_hedge_outcome(user_id, "google", "claude")
+    states = await db.get_provider_runtime_states(user_id, ["google", "claude"])
+
+    assert states["google"]["hedge_wins"] == before["google"]["hedge_wins"] + 1
+    assert states["claude"]["hedge_losses"] == before["claude"]["hedge_losses"] + 1
+    assert states["claude"]["enabled"] and not states["claude"]["auto_disabled"]
@@ -0,0 +1,102 @@
+"""Structure-aware RAG chunking with overlap and offsets."""
+import pytest
+
+from app.rag import chunking
+from app.rag import embed_cache
+from app.rag import service as rag_service
+from app.rag.chunking import chunk_text, count_tokens, stitch_chunks
+from app.rag.service import EMBED_DIM
+
+DOC = (
+    "# Intro\n"
+    "Python is a language. It is popular. Many people use it for data science and web apps.\n\n"
+    "```python\n"
+    "def double(x):\n"
+    "    return x * 2\n"
+    "```\n\n"
+    "## Details\n"
+    + " ".join(f"Sentence number {i} talks about something specific." for i in range(60))
+    + "\n"
+)
+
+
+def _chunks(text=DOC, max_tokens=60, overlap=15):
+    return chunk_text(text, "structured", max_tokens, overlap)
+
+
+def test_chunks_respect_token_budget_and_offsets():
+    chunks = _chunks()
+
+    assert len(chunks) > 2
+    for c in chunks:
+        assert count_tokens(c.text) <= 60
+        assert DOC[c.start : c.end] == c.text
+
+
+def test_sentences_and_code_blocks_are_not_cut():
+    chunks = _chunks()
+
+    code = "```python\ndef double(x):\n    return x * 2\n```"
+    assert any(code in c.text for c in chunks)
+    for c in chunks[1:]:
+        assert c.text.startswith(("## ", "Sentence number"))
+        assert c.text.rstrip().endswith(".")
+
+
+def test_heading_starts_new_chunk():
+    chunks = _chunks()
+
+    assert any(c.text.startswith("## Details") for c in chunks)
+    assert not any("## Details" in c.text and not c.text.startswith("## Details") for c in chunks)
+
+
+def test_consecutive_chunks_overlap_within_budget():
+    chunks = [c for c in _chunks() if c.text.startswith("Sentence")]
+
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt.start < prev.end
+        assert count_tokens(DOC[nxt.start : prev.end]) <= 15
+
+
+def test_stitch_rebuilds_document_without_duplication():
+    chunks = _chunks()
+
+    rebuilt = stitch_chunks([(c.start, c.end, c.text) for c in reversed(chunks)])
+
+    assert rebuilt == DOC.rstrip("\n")
+
+
+def test_oversize_unspaced_text_is_hard_split():
+    text = "x" * 3000
+    chunks = _chunks(text, max_tokens=100, overlap=0)
+
+    assert all(count_tokens(c.text) <= 100 for c in chunks)
+    assert "".join(c.text for c in chunks) == text
+
+
+def test_custom_chunker_registration_and_unknown_strategy_fallback(monkeypatch):
+    monkeypatch.setitem(chunking.CHUNKERS, "whole", lambda text, max_tokens, overlap: [chunking.Chunk(text, 0, len(text))])
+
+    assert len(chunk_text(DOC, "whole", 60, 15)) == 1
+    assert len(chunk_text(DOC, "nope", 60, 15)) == len(_chunks())
+
+
+@pytest.mark.asyncio
+async def test_get_topic_content_rebuilds_overlapping_chunks(rag_svc, tmp_path, monkeypatch):
+    cache = embed_cache.EmbeddingCache(str(tmp_path / "c.db"))
+    monkeypatch.setattr(embed_cache, "_cache", cache)
+
+    async def _fake_embeddings(texts):
+        return [[0.1] * EMBED_DIM for _ in texts]
+
+    monkeypatch.setattr(rag_service, "_get_embeddings_any", _fake_embeddings)
+    monkeypatch.setattr(rag_service, "RAG_CHUNK_TOKENS", 60)
+    monkeypatch.setattr(rag_service, "RAG_CHUNK_OVERLAP_TOKENS", 15)
+    svc = rag_svc
+    svc._coll.rows["legacy_0"] = ("Old unchunked note.", {"topic": "py"})
+
+    await svc.add("py", DOC, doc_id="guide")
+
+    content = svc.get_topic_content("py")
+    assert content == "Old unchunked note.\n\n" + DOC.rstrip("\n")
+    cache.close()
@@ -0,0 +1,89 @@
+"""Batched Ollama embeddings for RAGService.add."""
+import json
+
+import httpx
+import pytest
+
+from app.rag import embed_cache
+from app.rag import service as rag_service
+from app.rag.chunking import FIXED_CHUNK_CHARS
+from app.rag.service import EMBED_DIM
+
+
+@pytest.fixture(autouse=True)
+def _isolated_embed_cache(tmp_path, monkeypatch):
+    cache = embed_cache.EmbeddingCache(str(tmp_path / "embed_cache.db"))
+    monkeypatch.setattr(embed_cache, "_cache", cache)
+    yield cache
+    cache.close()
+
+
+@pytest.fixture(autouse=True)
+def _fixed_chunker(monkeypatch):
+    monkeypatch.setattr(rag_service, "RAG_CHUNKER", "fixed")
+
+
+def _mock_ollama(calls: list[list[str]], fail_on: int | None = None):
+    def handler(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)["input"]
+        calls.append(inputs)
+        if fail_on is not None and len(calls) == fail_on:
+            return httpx.Response(500, json={"error": "boom"})
+        return httpx.Response(200, json={"embeddings": [[float(len(t))] * EMBED_DIM for t in inputs]})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _distinct_chunks(n: int) -> str:
+    return "".join(chr(ord("a") + i) * FIXED_CHUNK_CHARS for i in range(n))
+
+
+@pytest.mark.asyncio
+async def test_add_embeds_chunks_in_batches(rag_svc, monkeypatch):
+    calls: list[list[str]] = []
+    client = _mock_ollama(calls)
+    monkeypatch.setattr(rag_service, "_get_embed_client", lambda: client)
+    monkeypatch.setattr(rag_service, "EMBED_BATCH_SIZE", 4)
+
+    svc = rag_svc
+    await svc.add("Topic", _distinct_chunks(10), doc_id="doc")
+
+    assert [len(c) for c in calls] == [4, 4, 2]
+    ids, embeddings, documents, metadatas = svc._coll.upserts[0]
+    assert ids == [f"doc_{i}" for i in range(10)]
+    assert len(embeddings) == len(documents) == 10
+    assert all(len(e) == EMBED_DIM for e in embeddings)
+    assert metadatas[1] == {"topic": "topic", "doc": "doc", "start": FIXED_CHUNK_CHARS, "end": 2 * FIXED_CHUNK_CHARS}
+    assert svc._fts_conn.execute("SELECT COUNT(*) FROM rag_fts").fetchone()[0] == 10
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_falls_back_to_zero_vectors(rag_svc, monkeypatch):
+    calls: list[list[str]] = []
+    client = _mock_ollama(calls, fail_on=1)
+    monkeypatch.setattr(rag_service, "_get_embed_client", lambda: client)
+    monkeypatch.setattr(rag_service, "EMBED_BATCH_SIZE", 2)
+    monkeypatch.setattr(rag_service, "EMBED_CONCURRENCY", 1)
+
+    svc = rag_svc
+    await svc.add("t", _distinct_chunks(3), doc_id="d")
+
+    _ids, embeddings, _docs, _meta = svc._coll.upserts[0]
+    assert embeddings[0] == [0.0] * EMBED_DIM
+    assert embeddings[1] == [0.0] * EMBED_DIM
+    assert embeddings[2] == [float(FIXED_CHUNK_CHARS)] * EMBED_DIM
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_single_embedding_uses_batch_path(monkeypatch):
+    calls: list[list[str]] = []
+    client = _mock_ollama(calls)
+    monkeypatch.setattr(rag_service, "_get_embed_client", lambda: client)
+
+    emb = await rag_service._get_embedding_any("hello")
+
+    assert calls == [["hello"]]
+    assert emb == [5.0] * EMBED_DIM
+    await client.aclose()
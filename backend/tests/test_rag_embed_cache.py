@@ -0,0 +1,100 @@
+"""Content-addressed embedding cache for RAG."""
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.rag import embed_cache
+from app.rag import service as rag_service
+from app.rag.embed_cache import EmbeddingCache
+from app.rag.service import EMBED_DIM
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    c = EmbeddingCache(str(tmp_path / "embed_cache.db"))
+    monkeypatch.setattr(embed_cache, "_cache", c)
+    yield c
+    c.close()
+
+
+@pytest.fixture
+def ollama_calls(monkeypatch):
+    calls: list[list[str]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)["input"]
+        calls.append(inputs)
+        return httpx.Response(200, json={"embeddings": [[float(len(t))] * EMBED_DIM for t in inputs]})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(rag_service, "_get_embed_client", lambda: client)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_repeated_texts_skip_ollama(cache, ollama_calls):
+    first = await rag_service._get_embeddings_any(["alpha", "beta", "alpha"])
+    second = await rag_service._get_embeddings_any(["beta", "gamma", "alpha"])
+
+    assert ollama_calls == [["alpha", "beta"], ["gamma"]]
+    assert first[0] == first[2] == [5.0] * EMBED_DIM
+    assert second[0] == [4.0] * EMBED_DIM
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["hits"] == 2
+    assert stats["misses"] == 4
+
+
+@pytest.mark.asyncio
+async def test_query_string_cached_across_calls(cache, ollama_calls):
+    await rag_service._get_embedding_any("what is python")
+    await rag_service._get_embedding_any("what is python")
+
+    assert ollama_calls == [["what is python"]]
+
+
+def test_cache_keyed_by_model(cache):
+    cache.put_many("model-a", ["x"], [[1.0, 2.0]])
+
+    assert cache.get_many("model-a", ["x"]) == [[1.0, 2.0]]
+    assert cache.get_many("model-b", ["x"]) == [None]
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path, monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(embed_cache, "time", SimpleNamespace(time=lambda: float(next(clock))))
+    c = EmbeddingCache(str(tmp_path / "lru.db"), max_entries=2)
+    try:
+        c.put_many("m", ["a"], [[1.0]])
+        c.put_many("m", ["b"], [[2.0]])
+        c.get_many("m", ["a"])  # a is now more recent than b
+        c.put_many("m", ["c"], [[3.0]])
+
+        assert c.get_many("m", ["a", "b", "c"]) == [[1.0], None, [3.0]]
+    finally:
+        c.close()
+
+
+def test_eviction_scan_only_runs_past_max_entries(tmp_path):
+    c = EmbeddingCache(str(tmp_path / "cap.db"), max_entries=3)
+    statements: list[str] = []
+    c._conn.set_trace_callback(statements.append)
+    try:
+        c.put_many("m", ["a", "b"], [[1.0], [2.0]])
+        c.put_many("m", ["c"], [[3.0]])
+        assert not any("DELETE" in sql for sql in statements)
+
+        c.put_many("m", ["d"], [[4.0]])
+        assert any("DELETE" in sql for sql in statements)
+        assert c.stats()["entries"] == 3
+        assert c.get_many("m", ["a"]) == [None]
+    finally:
+        c.close()
+
+
+def test_failed_embeddings_are_not_cached(cache):
+    cache.put_many("m", ["ok", "failed"], [[1.0], []])
+
+    assert cache.get_many("m", ["ok", "failed"]) == [[1.0], None]
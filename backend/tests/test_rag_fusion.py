@@ -0,0 +1,104 @@
+"""Concurrent hybrid retrieval and result fusion in RAGService.search."""
+import asyncio
+import json
+import threading
+
+import pytest
+
+from app.rag import service as rag_service
+from app.rag.service import RAGService, fuse_rrf, fuse_weighted
+
+
+def _hits(source, *texts, score=0.5):
+    return [{"text": t, "score": score, "source": source} for t in texts]
+
+
+def test_rrf_rewards_agreement_and_normalizes():
+    vector = _hits("vector", "a", "b", "c")
+    keyword = _hits("keyword", "b", "d")
+
+    fused = fuse_rrf([(vector, 0.7), (keyword, 0.3)])
+
+    assert [r["text"] for r in fused][:2] == ["b", "a"]
+    assert fused[0]["sources"] == ["vector", "keyword"]
+    assert all(0 < r["score"] <= 1 for r in fused)
+    top_both = fuse_rrf([(_hits("vector", "x"), 1.0), (_hits("keyword", "x"), 1.0)])
+    assert top_both[0]["score"] == 1.0
+
+
+def test_weighted_fusion_uses_scores_and_weights():
+    vector = [{"text": "a", "score": 0.9, "source": "vector"}]
+    keyword = [{"text": "b", "score": 0.9, "source": "keyword"}, {"text": "a", "score": 0.1, "source": "keyword"}]
+
+    fused = fuse_weighted([(vector, 0.7), (keyword, 0.3)])
+
+    assert [r["text"] for r in fused] == ["a", "b"]
+    assert fused[0]["score"] == pytest.approx(0.9 * 0.7 + 0.1 * 0.3)
+
+
+@pytest.fixture
+def svc(rag_svc):
+    rag_svc._fts_conn.executemany(
+        "INSERT INTO rag_fts VALUES (?, ?, ?)",
+        [("d_0", "py", "Python adapters are great"), ("d_1", "py", "Unrelated text")],
+    )
+    return rag_svc
+
+
+@pytest.mark.asyncio
+async def test_search_runs_vector_and_keyword_concurrently(svc, monkeypatch):
+    loop_thread = threading.get_ident()
+    keyword_started = threading.Event()
+    seen = {}
+
+    async def _vector(question, topic, k):
+        # Only completes once the keyword search has started in its worker thread.
+        for _ in range(100):
+            if keyword_started.is_set():
+                break
+            await asyncio.sleep(0.01)
+        seen["overlapped"] = keyword_started.is_set()
+        return _hits("vector", "Vector only chunk", "Python adapters are great", score=0.8)
+
+    original_keyword = RAGService._query_keyword
+
+    def _keyword(self, question, topic, k):
+        seen["keyword_thread"] = threading.get_ident()
+        keyword_started.set()
+        return original_keyword(self, question, topic, k)
+
+    monkeypatch.setattr(svc, "_query_vector", _vector)
+    monkeypatch.setattr(RAGService, "_query_keyword", _keyword)
+
+    results = await svc.search("python adapters", topic="py", k=2)
+
+    assert seen["overlapped"] is True
+    assert seen["keyword_thread"] != loop_thread
+    assert results[0]["text"] == "Python adapters are great"
+    assert set(results[0]["sources"]) == {"vector", "keyword"}
+    assert len(results) == 2
+    assert await svc.query("python adapters", topic="py", k=1) == "Python adapters are great"
+
+
+@pytest.mark.asyncio
+async def test_memory_search_compat_uses_fused_scores(monkeypatch, tmp_path):
+    from app.config import get_settings
+    from app.openclaw_compat_tools import run_memory_search_compat
+
+    class _FakeRag:
+        async def search(self, question, topic=None, k=5):
+            return [
+                {"text": "high", "score": 0.83, "sources": ["vector", "keyword"]},
+                {"text": "low", "score": 0.2, "sources": ["keyword"]},
+            ]
+
+    monkeypatch.setenv("ASTA_WORKSPACE_DIR", str(tmp_path))
+    get_settings.cache_clear()
+    monkeypatch.setattr(rag_service, "get_rag", lambda: _FakeRag())
+    try:
+        raw = await run_memory_search_compat({"query": "nothing local", "minScore": 0.5}, user_id="default")
+    finally:
+        get_settings.cache_clear()
+
+    payload = json.loads(raw)
+    assert [(r["snippet"], r["score"]) for r in payload["results"]] == [("high", 0.83)]
@@ -0,0 +1,176 @@
+"""Streaming bulk ingest for RAG."""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.rag import ingest
+from app.rag import service as rag_service
+from app.rag.chunking import stitch_chunks
+from app.routers import rag as rag_router
+
+
+class _FakeRag:
+    def __init__(self):
+        self.stored = []
+        self.added = []
+        self.batches = []
+
+    async def _store_chunks(self, topic, doc, chunks, first_index=0):
+        await asyncio.sleep(0)
+        self.stored.append((topic, doc, first_index, chunks))
+
+    async def add_many(self, records):
+        await asyncio.sleep(0)
+        self.batches.append(len(records))
+        self.added.extend(records)
+        return [1] * len(records)
+
+
+def _request(body: bytes, content_type="text/plain", piece=1000):
+    async def _stream():
+        for i in range(0, len(body), piece):
+            yield body[i : i + piece]
+
+    return SimpleNamespace(headers={"content-type": content_type}, stream=_stream)
+
+
+async def _wait(job_id):
+    for _ in range(200):
+        job = ingest.get_ingest_job(job_id)
+        if job.status in ("done", "error"):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("ingest job did not finish")
+
+
+@pytest.fixture
+def fake_rag(monkeypatch):
+    rag = _FakeRag()
+    monkeypatch.setattr(rag_service, "get_rag", lambda: rag)
+    monkeypatch.setattr(ingest, "INGEST_SEGMENT_CHARS", 2000)
+    monkeypatch.setattr(rag_service, "RAG_CHUNK_TOKENS", 64)
+    return rag
+
+
+@pytest.mark.asyncio
+async def test_text_upload_is_ingested_incrementally_with_document_offsets(fake_rag):
+    doc = "\n\n".join(f"Paragraph {i}. " + "Some words about the manual. " * 5 for i in range(80))
+
+    job = await rag_router.rag_ingest(_request(doc.encode()), topic="Manual", doc_id="man")
+    assert job["status"] in ("queued", "running")
+    finished = await _wait(job["job_id"])
+
+    assert finished.status == "done"
+    assert finished.bytes_done == finished.bytes_total == len(doc.encode())
+    assert len(fake_rag.stored) > 1  # one upsert per segment, not one for the whole body
+    indexes = [first for _, _, first, _ in fake_rag.stored]
+    counts = [len(chunks) for *_, chunks in fake_rag.stored]
+    assert indexes == [sum(counts[:i]) for i in range(len(counts))]
+    assert {(t, d) for t, d, _, _ in fake_rag.stored} == {("manual", "man")}
+    pieces = [(c.start, c.end, c.text) for *_, chunks in fake_rag.stored for c in chunks]
+    assert all(doc[s:e] == t for s, e, t in pieces)
+    assert stitch_chunks(pieces) == doc
+    status = await rag_router.rag_ingest_status(job["job_id"])
+    assert status["progress"] == 1.0
+    assert status["chunks_done"] == sum(counts)
+
+
+@pytest.mark.asyncio
+async def test_ndjson_upload_adds_each_record_and_reports_bad_lines(fake_rag):
+    lines = [
+        json.dumps({"topic": "a", "text": "first doc", "doc_id": "d1"}),
+        "not json",
+        json.dumps({"text": "uses default topic"}),
+        json.dumps({"topic": "a"}),
+    ]
+    body = ("\n".join(lines) + "\n").encode()
+
+    job = await rag_router.rag_ingest(_request(body, "application/x-ndjson; charset=utf-8"), topic="fallback")
+    finished = await _wait(job["job_id"])
+
+    assert finished.status == "done"
+    assert fake_rag.added == [("a", "first doc", "d1"), ("fallback", "uses default topic", None)]
+    assert fake_rag.batches == [2]
+    assert finished.documents_done == 2
+    assert len(finished.errors) == 2
+    assert finished.errors[0].startswith("line 2:")
+
+
+@pytest.mark.asyncio
+async def test_ndjson_failing_record_does_not_abandon_the_rest(fake_rag):
+    real_add_many = fake_rag.add_many
+
+    async def _add_many(records):
+        if any(text == "boom" for _, text, _ in records):
+            raise RuntimeError("embed failed")
+        return await real_add_many(records)
+
+    fake_rag.add_many = _add_many
+    lines = [
+        json.dumps({"topic": "a", "text": "numeric id", "doc_id": 5}),
+        json.dumps({"topic": "a", "text": "boom"}),
+        json.dumps({"topic": "a", "text": "last"}),
+    ]
+    body = ("\n".join(lines) + "\n").encode()
+
+    job = await rag_router.rag_ingest(_request(body, "application/x-ndjson"), topic=None)
+    finished = await _wait(job["job_id"])
+
+    assert finished.status == "done"
+    assert fake_rag.added == [("a", "numeric id", "5"), ("a", "last", None)]
+    assert finished.errors == ["line 2: embed failed"]
+    assert finished.documents_done == 2
+
+
+@pytest.mark.asyncio
+async def test_ndjson_records_are_stored_in_batches(fake_rag, monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_NDJSON_BATCH_RECORDS", 4)
+    lines = [json.dumps({"topic": "a", "text": f"doc {i}"}) for i in range(6)]
+    # Same document again: stored after the batch holding its first version.
+    lines.insert(2, json.dumps({"topic": "a", "text": "doc 0"}))
+    body = ("\n".join(lines) + "\n").encode()
+
+    job = await rag_router.rag_ingest(_request(body, "application/x-ndjson"), topic=None)
+    finished = await _wait(job["job_id"])
+
+    assert finished.status == "done" and finished.documents_done == 7
+    assert fake_rag.batches == [2, 4, 1]
+    assert [text for _, text, _ in fake_rag.added] == ["doc 0", "doc 1", "doc 0", "doc 2", "doc 3", "doc 4", "doc 5"]
+
+
+@pytest.mark.asyncio
+async def test_text_upload_without_doc_id_gets_content_derived_id(fake_rag):
+    body = b"Same manual text.\n\nSecond paragraph."
+
+    for _ in range(2):
+        job = await rag_router.rag_ingest(_request(body), topic="Manual")
+        assert (await _wait(job["job_id"])).status == "done"
+
+    docs = {doc for _, doc, _, _ in fake_rag.stored}
+    assert docs == {rag_service._doc_base("manual", body.decode(), None)}
+
+
+@pytest.mark.asyncio
+async def test_text_upload_requires_topic():
+    with pytest.raises(HTTPException) as exc:
+        await rag_router.rag_ingest(_request(b"hello"), topic=None)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_oversize_upload_rejected(monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_MAX_BYTES", 10)
+
+    with pytest.raises(HTTPException) as exc:
+        await rag_router.rag_ingest(_request(b"x" * 50, piece=5), topic="t")
+    assert exc.value.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_unknown_job_is_404():
+    with pytest.raises(HTTPException) as exc:
+        await rag_router.rag_ingest_status("missing")
+    assert exc.value.status_code == 404
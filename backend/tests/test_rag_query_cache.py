@@ -0,0 +1,120 @@
+"""RAG query result cache with topic-scoped invalidation."""
+from types import SimpleNamespace
+
+import pytest
+
+from app.rag import query_cache
+from app.rag import service as rag_service
+from app.rag.query_cache import QueryCache
+from app.rag.service import EMBED_DIM
+
+
+def test_key_normalizes_question_and_topic():
+    assert QueryCache.key("  What is   PYTHON ", "Py", 5) == QueryCache.key("what is python", "py", 5)
+    assert QueryCache.key("q", None, 5) != QueryCache.key("q", None, 3)
+
+
+def test_ttl_expiry_and_lru_eviction(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(query_cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    cache = QueryCache(max_entries=2, ttl_s=10)
+    a, b, c = (QueryCache.key(q, None, 5) for q in "abc")
+
+    cache.put(a, [{"text": "A"}], cache.generation)
+    cache.put(b, [{"text": "B"}], cache.generation)
+    assert cache.get(a) == [{"text": "A"}]  # a becomes most recent
+    cache.put(c, [{"text": "C"}], cache.generation)
+    assert cache.get(b) is None
+    now[0] = 11
+    assert cache.get(a) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_invalidate_topic_drops_topic_and_global_entries():
+    cache = QueryCache()
+    py, js, everything = QueryCache.key("q", "py", 5), QueryCache.key("q", "js", 5), QueryCache.key("q", None, 5)
+    for key in (py, js, everything):
+        cache.put(key, [{"text": "x"}], cache.generation)
+
+    cache.invalidate_topic("PY")
+
+    assert cache.get(py) is None
+    assert cache.get(everything) is None
+    assert cache.get(js) == [{"text": "x"}]
+
+
+def test_results_computed_before_invalidation_are_not_cached():
+    cache = QueryCache()
+    key = QueryCache.key("q", "py", 5)
+    started_at = cache.generation
+
+    cache.invalidate_topic("py")
+    cache.put(key, [{"text": "stale"}], started_at)
+
+    assert cache.get(key) is None
+
+
+def test_cached_results_are_copies():
+    cache = QueryCache()
+    key = QueryCache.key("q", None, 5)
+    cache.put(key, [{"text": "x", "score": 1.0}], cache.generation)
+
+    cache.get(key)[0]["score"] = 0.0
+
+    assert cache.get(key)[0]["score"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_search_is_cached_until_topic_changes(rag_svc, monkeypatch):
+    svc = rag_svc
+    calls = []
+
+    async def _vector(question, topic, k):
+        calls.append(question)
+        return [{"text": f"answer {len(calls)}", "score": 0.9, "source": "vector"}]
+
+    async def _fake_embeddings(texts):
+        return [[0.1] * EMBED_DIM for _ in texts]
+
+    monkeypatch.setattr(svc, "_query_vector", _vector)
+    monkeypatch.setattr(rag_service, "_get_embeddings_any", _fake_embeddings)
+
+    first = await svc.search("What is Python?", topic="py")
+    second = await svc.search("what is  python?", topic="PY")
+    assert first == second
+    assert len(calls) == 1
+
+    await svc.add("js", "JavaScript notes")
+    await svc.search("what is python?", topic="py")
+    assert len(calls) == 1
+
+    await svc.add("py", "Python notes")
+    third = await svc.search("what is python?", topic="py")
+    assert len(calls) == 2
+    assert third[0]["text"] == "answer 2"
+
+    svc.delete_topic("py")
+    await svc.search("what is python?", topic="py")
+    assert len(calls) == 3
+    stats = svc.query_cache_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 3
+    assert stats["hit_rate"] == 0.4
+
+
+@pytest.mark.asyncio
+async def test_rag_status_reports_query_cache(rag_svc, monkeypatch):
+    from app.routers import rag as rag_router
+
+    async def _fake_status():
+        return {"ok": True}
+
+    monkeypatch.setattr(rag_router, "check_rag_status", _fake_status)
+    monkeypatch.setattr(rag_service, "_rag", rag_svc)
+
+    status = await rag_router.rag_status()
+
+    assert status["ok"] is True
+    assert status["query_cache"]["hits"] == 0
+    assert "hit_rate" in status["query_cache"]
@@ -0,0 +1,80 @@
+"""Topic catalog (rag_topics) maintained by RAGService writes."""
+import pytest
+
+from app.rag import service as rag_service
+from app.rag.service import EMBED_DIM
+
+
+@pytest.fixture
+def svc(rag_svc, monkeypatch):
+    async def _fake_embeddings(texts):
+        return [[0.1] * EMBED_DIM for _ in texts]
+
+    monkeypatch.setattr(rag_service, "_get_embeddings_any", _fake_embeddings)
+    monkeypatch.setattr(rag_service, "RAG_CHUNKER", "fixed")
+    return rag_svc
+
+
+def _catalog(svc):
+    return {t["topic"]: (t["chunks_count"], t["bytes"]) for t in svc.list_topics()}
+
+
+@pytest.mark.asyncio
+async def test_add_and_relearn_keep_counts_exact(svc):
+    await svc.add("Python", "a" * 1200, doc_id="guide")
+    assert _catalog(svc) == {"python": (3, 1200)}
+
+    # Same ids are upserted in place: bytes change, chunk count does not.
+    await svc.add("python", "b" * 700, doc_id="guide")
+    assert _catalog(svc) == {"python": (3, 700 + 200)}
+
+    await svc.add("python", "new doc", doc_id="other")
+    await svc.add("js", "closures")
+    assert _catalog(svc) == {"python": (4, 907), "js": (1, 8)}
+    assert svc._coll.full_scans == 0
+    assert svc.list_topics()[0]["updated_at"]
+
+
+@pytest.mark.asyncio
+async def test_delete_and_update_topic_maintain_catalog(svc):
+    await svc.add("python", "a" * 1200, doc_id="guide")
+    await svc.add("js", "closures")
+
+    assert svc.delete_topic("JS") == 1
+    assert _catalog(svc) == {"python": (3, 1200)}
+
+    await svc.update_topic("python", "short")
+    assert _catalog(svc) == {"python": (1, 5)}
+    assert len(svc._coll.rows) == 1
+
+
+def test_catalog_bootstraps_from_existing_store(svc):
+    svc._coll.rows = {
+        "a_0": ("hello", {"topic": "greetings"}),
+        "a_1": ("hi", {"topic": "greetings"}),
+        "b_0": ("orphan", {}),
+    }
+
+    svc._bootstrap_topic_catalog()
+    svc._bootstrap_topic_catalog()  # no-op once the catalog has rows
+
+    assert _catalog(svc) == {"greetings": (2, 7), "unknown": (1, 6)}
+    assert svc._coll.full_scans == 1
+
+
+@pytest.mark.asyncio
+async def test_add_many_stores_documents_of_several_topics_together(svc, monkeypatch):
+    calls = []
+
+    async def _fake_embeddings(texts):
+        calls.append(len(texts))
+        return [[0.1] * EMBED_DIM for _ in texts]
+
+    monkeypatch.setattr(rag_service, "_get_embeddings_any", _fake_embeddings)
+    await svc.add("python", "a" * 600, doc_id="guide")
+
+    counts = await svc.add_many([("Python", "b" * 600, "guide"), ("js", "closures", None)])
+
+    assert counts == [2, 1]
+    assert calls == [2, 3]  # one embed pass for the whole batch
+    assert _catalog(svc) == {"python": (2, 600), "js": (1, 8)}
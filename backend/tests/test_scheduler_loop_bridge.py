@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.tasks import scheduler
+
+
+@pytest.fixture(autouse=True)
+def _unbind_loop():
+    yield
+    scheduler.bind_main_loop(None)
+
+
+async def _whoami():
+    return threading.get_ident(), asyncio.get_running_loop()
+
+
+def test_run_on_main_loop_without_bound_loop_uses_fresh_loop():
+    scheduler.bind_main_loop(None)
+    thread_id, _loop = scheduler.run_on_main_loop(_whoami())
+    assert thread_id == threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_run_on_main_loop_from_worker_thread_runs_on_bound_loop():
+    loop = asyncio.get_running_loop()
+    scheduler.bind_main_loop(loop)
+
+    result = await asyncio.to_thread(scheduler.run_on_main_loop, _whoami())
+
+    assert result == (threading.get_ident(), loop)
+
+
+@pytest.mark.asyncio
+async def test_run_on_main_loop_on_loop_thread_schedules_without_blocking():
+    scheduler.bind_main_loop(asyncio.get_running_loop())
+    ran = asyncio.Event()
+
+    async def _mark():
+        ran.set()
+
+    assert scheduler.run_on_main_loop(_mark()) is None
+    await asyncio.wait_for(ran.wait(), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_run_on_main_loop_on_loop_thread_logs_task_failure(caplog):
+    scheduler.bind_main_loop(asyncio.get_running_loop())
+
+    async def _boom():
+        raise RuntimeError("rag down")
+
+    assert scheduler.run_on_main_loop(_boom()) is None
+    assert len(scheduler._loop_tasks) == 1
+    await asyncio.gather(*scheduler._loop_tasks, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert not scheduler._loop_tasks
+    assert "rag down" in caplog.text
+
+
+def test_run_on_main_loop_on_uvloop_thread_does_not_block():
+    uvloop = pytest.importorskip("uvloop")
+    ran = []
+
+    async def _mark():
+        ran.append(True)
+
+    async def _main():
+        scheduler.bind_main_loop(asyncio.get_running_loop())
+        assert scheduler.run_on_main_loop(_mark()) is None
+        await asyncio.sleep(0.01)
+
+    # A blocking call would deadlock the loop, so run it on a daemon thread and bound the wait.
+    worker = threading.Thread(target=uvloop.run, args=(_main(),), daemon=True)
+    worker.start()
+    worker.join(timeout=2)
+    assert not worker.is_alive()
+    assert ran == [True]
@@ -0,0 +1,91 @@
+"""Concurrent skill execution stage (app.skills.execution)."""
+import asyncio
+
+import pytest
+
+from app.lib.skill import Skill
+from app.skills.execution import execute_skills, order_skills
+from app.skills.registry import get_skill_by_name
+
+
+class _FakeSkill(Skill):
+    def __init__(self, name, result=None, delay=0.0, depends_on=(), error=None):
+        self._name = name
+        self.result = result
+        self.delay = delay
+        self._depends_on = tuple(depends_on)
+        self.error = error
+        self.seen_extra = None
+        self.started_at = None
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def depends_on(self):
+        return self._depends_on
+
+    def check_eligibility(self, text, user_id):
+        return True
+
+    async def execute(self, user_id, text, extra):
+        self.started_at = asyncio.get_running_loop().time()
+        self.seen_extra = dict(extra)
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_google_search_depends_on_rag():
+    search, rag = get_skill_by_name("google_search"), get_skill_by_name("rag")
+    assert search.depends_on == ("rag",)
+    assert [s.name for s in order_skills([search, rag])] == ["rag", "google_search"]
+
+
+@pytest.mark.asyncio
+async def test_independent_skills_overlap_and_dependents_see_results():
+    weather = _FakeSkill("weather", {"weather": "sunny"}, delay=0.1)
+    clock = _FakeSkill("time", {"time": "noon"}, delay=0.1)
+    rag = _FakeSkill("rag", {"rag_found_content": True}, delay=0.02)
+    search = _FakeSkill("google_search", {"search_results": []}, depends_on=("rag",))
+    extra = {"location": "Oslo"}
+    loop = asyncio.get_running_loop()
+
+    started = loop.time()
+    statuses = await execute_skills([search, weather, clock, rag], "u", "hi", extra, timeout_s=2)
+
+    assert loop.time() - started < 0.18  # not 0.1 + 0.1 + 0.02 in series
+    assert statuses == {"weather": "ok", "time": "ok", "rag": "ok", "google_search": "ok"}
+    assert search.seen_extra == {"location": "Oslo", "rag_found_content": True}
+    assert search.started_at >= rag.started_at + 0.02
+    assert extra == {
+        "location": "Oslo", "rag_found_content": True, "search_results": [], "weather": "sunny", "time": "noon",
+    }
+
+
+@pytest.mark.asyncio
+async def test_slow_or_failing_skills_are_skipped_without_blocking_others():
+    slow = _FakeSkill("lyrics", {"lyrics": "la"}, delay=5)
+    broken = _FakeSkill("github", error=RuntimeError("boom"))
+    empty = _FakeSkill("spotify", None)
+    fast = _FakeSkill("weather", {"weather": "rain"})
+    extra = {}
+
+    statuses = await asyncio.wait_for(
+        execute_skills([slow, broken, empty, fast], "u", "hi", extra, timeout_s=0.05), timeout=1
+    )
+
+    assert statuses == {"lyrics": "skipped", "github": "failed", "spotify": "empty", "weather": "ok"}
+    assert extra == {"weather": "rain"}
+
+
+@pytest.mark.asyncio
+async def test_dependency_cycles_do_not_deadlock():
+    a = _FakeSkill("a", {"a": 1}, depends_on=("b",))
+    b = _FakeSkill("b", {"b": 2}, depends_on=("a",))
+
+    statuses = await asyncio.wait_for(execute_skills([a, b], "u", "hi", {}, timeout_s=1), timeout=1)
+
+    assert statuses == {"a": "ok", "b": "ok"}
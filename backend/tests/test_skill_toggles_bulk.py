@@ -0,0 +1,71 @@
+"""Per-turn skill toggle lookups: one bulk query regardless of skill count."""
+from __future__ import annotations
+
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+import app.context as context_module
+from app.db import get_db
+from app.skills.markdown_skill import MarkdownSkill
+from app.skills.registry import get_all_skills
+from app.workspace import ResolvedSkill
+
+
+class _CountingDb:
+    """Delegates to the real Db and counts every coroutine call by method name."""
+
+    def __init__(self, db):
+        self._db = db
+        self.calls: Counter[str] = Counter()
+
+    def __getattr__(self, name):
+        attr = getattr(self._db, name)
+        if not callable(attr):
+            return attr
+
+        async def _wrapped(*args, **kwargs):
+            self.calls[name] += 1
+            return await attr(*args, **kwargs)
+
+        return _wrapped
+
+
+def _mk_markdown_skill(name: str) -> MarkdownSkill:
+    return MarkdownSkill(
+        ResolvedSkill(
+            name=name,
+            description=f"{name} description",
+            file_path=Path(f"/tmp/{name}/SKILL.md"),
+            base_dir=Path(f"/tmp/{name}"),
+            source="workspace",
+        )
+    )
+
+
+@pytest.mark.asyncio
+async def test_build_context_uses_one_toggle_query_for_many_workspace_skills(monkeypatch):
+    builtins = [s for s in get_all_skills() if not isinstance(s, MarkdownSkill)]
+    workspace = [_mk_markdown_skill(f"ws-skill-{i:02d}") for i in range(60)]
+    monkeypatch.setattr("app.skills.registry.get_all_skills", lambda: builtins + workspace)
+
+    real_db = get_db()
+    await real_db.connect()
+    user_id = "test-skill-toggles-bulk"
+    await real_db.set_skill_enabled(user_id, "ws-skill-07", False)
+    db = _CountingDb(real_db)
+
+    ctx = await context_module.build_context(db, user_id, None, extra={}, skills_in_use=set())
+
+    assert db.calls["get_skill_enabled"] == 0
+    assert db.calls["get_all_skill_toggles"] == 1
+    assert "<name>ws-skill-00</name>" in ctx
+    assert "<name>ws-skill-07</name>" not in ctx
+
+    # Handler path: the turn's toggle map is passed in, so no toggle query at all.
+    db.calls.clear()
+    toggles = await real_db.get_all_skill_toggles(user_id)
+    await context_module.build_context(db, user_id, None, extra={}, skills_in_use=set(), skill_toggles=toggles)
+    assert db.calls["get_skill_enabled"] == 0
+    assert db.calls["get_all_skill_toggles"] == 0
@@ -0,0 +1,122 @@
+"""Token counting (app.tokenizer) and the token budgets built on it."""
+import json
+
+import pytest
+
+from app.adaptive_paging import compute_page_tokens, fit_page_chars
+from app.compaction import compact_tool_rounds_to_budget, estimate_messages_tokens
+from app.tokenizer import (
+    HEURISTIC,
+    TOKENIZERS,
+    count_tokens,
+    get_tokenizer,
+    register_tokenizer,
+    truncate_to_tokens,
+)
+
+
+class _CharTokenizer:
+    """One token per character."""
+
+    name = "chars"
+
+    def count(self, text):
+        return len(text)
+
+    def cut_index(self, text, max_tokens):
+        return min(len(text), max_tokens)
+
+
+@pytest.fixture
+def fake_provider_tokenizer():
+    register_tokenizer("fake", lambda model: _CharTokenizer() if model == "char-model" else None)
+    yield
+    TOKENIZERS.pop("fake", None)
+    get_tokenizer.cache_clear()
+
+
+def test_heuristic_prices_code_json_and_cjk_above_a_word_count():
+    samples = [
+        '{"id": 12345, "items": [{"name": "x", "ok": true}], "next": null}',
+        "    def load(self, path):\n        return json.loads(open(path).read())\n",
+        "今日は良い天気ですね。明日は東京に行きます。",
+    ]
+    for text in samples:
+        assert count_tokens(text) > len(text.split()) * 1.3
+
+    prose = "This is a moderately long sentence with several words in it."
+    assert 10 < count_tokens(prose) < 20
+    assert count_tokens("") == 0
+
+
+def test_cut_index_is_the_longest_prefix_within_budget():
+    text = "alpha beta gamma delta " * 50
+
+    head = truncate_to_tokens(text, 40)
+
+    assert count_tokens(head) <= 40 < count_tokens(text[: len(head) + 6])
+    assert truncate_to_tokens("short", 100) == "short"
+
+
+def test_registered_tokenizer_is_used_for_its_models_only(fake_provider_tokenizer):
+    assert get_tokenizer("char-model", "fake").name == "chars"
+    assert count_tokens("hello world", model="char-model", provider="fake") == 11
+    assert get_tokenizer("other", "fake") is HEURISTIC
+    assert get_tokenizer("char-model", "groq") is HEURISTIC
+
+
+def test_failing_tokenizer_falls_back_to_heuristic():
+    def _broken(model):
+        raise OSError("no vocab")
+
+    register_tokenizer("broken", _broken)
+    try:
+        assert get_tokenizer("m", "broken") is HEURISTIC
+    finally:
+        TOKENIZERS.pop("broken", None)
+        get_tokenizer.cache_clear()
+
+
+def test_messages_count_tool_call_arguments():
+    call = {"id": "1", "type": "function", "function": {"name": "exec", "arguments": json.dumps({"command": "ls -la " * 40})}}
+    bare = [{"role": "assistant", "content": ""}]
+
+    assert estimate_messages_tokens([{**bare[0], "tool_calls": [call]}]) > estimate_messages_tokens(bare) + 100
+
+
+def test_tool_output_page_is_cut_in_model_tokens(fake_provider_tokenizer):
+    budget = compute_page_tokens("char-model", "fake")
+
+    assert fit_page_chars("x" * (budget * 3), "char-model", "fake") == budget
+    assert fit_page_chars("short output", "llama-3.1-8b-instant", "groq") == len("short output")
+
+
+def test_tool_output_budget_fits_small_context_windows():
+    assert compute_page_tokens("llama-3.1-8b-instant", "groq") == int(8_192 * 0.20)
+    assert compute_page_tokens("phi3:mini", "ollama") < 4_096
+    assert compute_page_tokens(context_tokens=1_000) == 512
+    assert compute_page_tokens("claude-sonnet-4", "claude") == 40_000
+    assert compute_page_tokens("unknown-model") == 12_500
+
+
+def _tool_round(i: int, result: str) -> list[dict]:
+    call = {"id": f"c{i}", "type": "function", "function": {"name": "read_file", "arguments": json.dumps({"path": f"f{i}.py"})}}
+    return [
+        {"role": "assistant", "content": "", "tool_calls": [call]},
+        {"role": "tool", "tool_call_id": f"c{i}", "content": result},
+    ]
+
+
+def test_tool_rounds_compact_only_when_over_the_models_budget():
+    messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "refactor it"}]
+    for i in range(10):
+        messages += _tool_round(i, "def handler(request):\n    return response\n" * 150)
+
+    # phi3:mini has a 4k window: ten rounds of code output do not fit.
+    compacted, did_compact = compact_tool_rounds_to_budget(messages, "phi3:mini", "ollama")
+    assert did_compact
+    assert estimate_messages_tokens(compacted, "phi3:mini", "ollama") < estimate_messages_tokens(messages, "phi3:mini", "ollama")
+    assert "[COMPACTED:" in compacted[1]["content"]
+
+    unchanged, did_compact = compact_tool_rounds_to_budget(messages, "claude-sonnet-4", "claude")
+    assert unchanged is messages and not did_compact
@@ -0,0 +1,81 @@
+"""Memoized tool-definition bundles (app.tool_bundle)."""
+from dataclasses import replace
+from unittest.mock import patch
+
+import pytest
+
+import app.cron_tool as cron_tool
+from app.providers.claude import ClaudeProvider
+from app.tool_bundle import ToolBundleKey, clear_tool_bundles, get_tool_bundle, make_tool_bundle
+
+_MCP_DEF = {
+    "type": "function",
+    "function": {"name": "mcp_gh_search", "description": "", "parameters": {"type": "object", "properties": {}}},
+}
+
+
+def _key(**overrides):
+    base = dict(
+        is_admin=True,
+        exec_mode="allowlist",
+        exec_bins=("git", "ls"),
+        enabled_skills=("files", "reminders"),
+        workspace_skills_enabled=False,
+        force_web=False,
+        image_gen=False,
+        subagents=True,
+        project_update=False,
+        mcp_generation=0,
+    )
+    base.update(overrides)
+    return ToolBundleKey(**base)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    clear_tool_bundles()
+    yield
+    clear_tool_bundles()
+
+
+def test_bundle_is_built_once_per_key():
+    with patch.object(cron_tool, "get_cron_tool_openai_def", wraps=cron_tool.get_cron_tool_openai_def) as cron_def:
+        first = get_tool_bundle(_key())
+        again = get_tool_bundle(_key())
+
+    assert again is first
+    assert cron_def.call_count == 1
+    assert {"exec", "bash", "process", "read_file", "reminders", "cron", "sessions_spawn"} <= first.names
+    assert "web_search" not in first.names and "project_update" not in first.names
+
+
+def test_digest_is_stable_and_tracks_the_definitions():
+    bundle = get_tool_bundle(_key())
+
+    assert make_tool_bundle(_key()).digest == bundle.digest
+    assert bundle.tools.digest == bundle.digest and len(bundle.digest) == 16
+    assert get_tool_bundle(_key(exec_bins=("git",))).digest != bundle.digest
+
+    guest = get_tool_bundle(_key(is_admin=False, exec_mode=None, exec_bins=(), project_update=True))
+    assert "exec" not in guest.names and "cron" not in guest.names
+    assert "project_update" in guest.names
+
+
+def test_new_mcp_generation_rebuilds_with_current_definitions():
+    before = get_tool_bundle(_key())
+    after = get_tool_bundle(_key(mcp_generation=1), [_MCP_DEF])
+
+    assert "mcp_gh_search" in after.names and "mcp_gh_search" not in before.names
+    assert after.tools[-1] == _MCP_DEF
+
+
+def test_claude_converts_each_bundle_once():
+    bundle = get_tool_bundle(_key())
+
+    converted = ClaudeProvider._to_anthropic_tools(bundle.tools)
+
+    assert ClaudeProvider._to_anthropic_tools(bundle.tools) is converted
+    assert converted[-1]["cache_control"] == {"type": "ephemeral"}
+    assert [t["name"] for t in converted] == [t["function"]["name"] for t in bundle.tools]
+    other = get_tool_bundle(replace(_key(), enabled_skills=("files",)))
+    assert ClaudeProvider._to_anthropic_tools(other.tools) is not converted
@@ -0,0 +1,110 @@
+"""Tool dispatch table (app.tool_registry) and its use in the handle_message tool loop."""
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.handler import handle_message
+from app.providers.base import ProviderResponse
+from app.tool_registry import (
+    ToolCall,
+    ToolHandler,
+    ToolRegistry,
+    action_label,
+    lazy_parser,
+    reset_tool_timing_stats,
+    tool_timing_stats,
+)
+
+
+async def _echo(call, params):
+    return f"{call.name}:{params}"
+
+
+def test_lookup_by_name_and_prefix():
+    registry = ToolRegistry()
+    files = registry.register(ToolHandler(("read_file", "write_file"), _echo))
+    mcp = registry.register(ToolHandler((), _echo), prefix="mcp_")
+
+    assert registry.get("write_file") is files
+    assert registry.get("mcp_github_search") is mcp
+    assert registry.get("exec") is None and "exec" not in registry
+    with pytest.raises(ValueError):
+        registry.register(ToolHandler(("read_file",), _echo))
+
+
+def test_lazy_parser_resolves_the_module_function_at_call_time():
+    parse = lazy_parser("app.reminders_tool", "parse_reminders_tool_args")
+
+    with patch("app.reminders_tool.parse_reminders_tool_args", return_value={"action": "list"}) as fake:
+        assert parse('{"action": "add"}') == {"action": "list"}
+    fake.assert_called_once_with('{"action": "add"}')
+
+
+@pytest.mark.asyncio
+async def test_dispatch_parses_summarizes_and_times_each_call():
+    reset_tool_timing_stats()
+    registry = ToolRegistry()
+    handler = registry.register(
+        ToolHandler(("reminders",), _echo, parse=lambda raw: json.loads(raw), summarize=action_label)
+    )
+
+    result = await registry.dispatch(handler, ToolCall(name="reminders", raw_args='{"action": "add"}', args={}))
+
+    assert result.output == "reminders:{'action': 'add'}"
+    assert result.label == "Reminders (add)"
+    assert result.duration_ms >= 0
+
+    async def _boom(call, params):
+        raise RuntimeError("down")
+
+    failing = registry.register(ToolHandler(("cron",), _boom))
+    with pytest.raises(RuntimeError):
+        await registry.dispatch(failing, ToolCall(name="cron", raw_args="{}", args={}))
+
+    stats = tool_timing_stats()
+    assert stats["reminders"]["calls"] == 1 and stats["reminders"]["errors"] == 0
+    assert stats["cron"] == {**stats["cron"], "calls": 1, "errors": 1}
+
+
+class _DummyProvider:
+    name = "openai"
+
+    def __init__(self):
+        self.followups = []
+
+    async def chat(self, messages, **kwargs):
+        self.followups.append(list(messages))
+        return ProviderResponse(content="Done.")
+
+
+async def _fake_compact_history(messages, provider, context=None, max_tokens=None):
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_tools_not_offered_this_turn_are_not_dispatched():
+    provider = _DummyProvider()
+    run_command = AsyncMock(return_value=("", "", True))
+
+    async def _fake_chat_with_fallback(primary, messages, fallback_names, **kwargs):
+        call = {"id": "x1", "type": "function", "function": {"name": "exec", "arguments": '{"command": "ls"}'}}
+        return ProviderResponse(content="", tool_calls=[call]), primary
+
+    with (
+        patch("app.handler.get_provider", return_value=provider),
+        patch("app.compaction.compact_history", side_effect=_fake_compact_history),
+        patch("app.providers.fallback.chat_with_fallback", side_effect=_fake_chat_with_fallback),
+        patch("app.exec_tool.run_allowlisted_command", run_command),
+    ):
+        await handle_message(
+            user_id="test-tool-registry-guest",
+            channel="web",
+            text="list my files",
+            provider_name="openai",
+            user_role="user",
+        )
+
+    run_command.assert_not_awaited()
+    (tool_message,) = [m for m in provider.followups[0] if m.get("role") == "tool"]
+    assert tool_message["content"] == "Error: Tool 'exec' not available (not in registry)"
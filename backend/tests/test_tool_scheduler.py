@@ -0,0 +1,176 @@
+"""Concurrent read-only tool calls within one tool round."""
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.handler import handle_message
+from app.providers.base import ProviderResponse
+from app.tool_scheduler import ReadOnlyToolBatch, is_read_only_tool_call
+
+
+def test_read_only_classification():
+    assert is_read_only_tool_call("web_search", {"query": "x"})
+    assert is_read_only_tool_call("READ_FILE")
+    assert not is_read_only_tool_call("write_file", {"path": "a"})
+    assert not is_read_only_tool_call("exec", {"command": "ls"})
+    assert not is_read_only_tool_call("spotify", {"action": "search"})  # not in the read-only set
+
+
+@pytest.mark.asyncio
+async def test_batch_caps_concurrency_and_returns_results_by_key():
+    active = peak = 0
+
+    def _call(value):
+        async def _run():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return value
+        return _run
+
+    batch = ReadOnlyToolBatch(2)
+    for i in range(4):
+        batch.start(i, _call(f"r{i}"))
+
+    assert [await batch.run(i, _call("inline")) for i in range(4)] == ["r0", "r1", "r2", "r3"]
+    assert peak == 2
+    assert await batch.run(9, _call("inline")) == "inline"
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_unconsumed_calls():
+    cancelled = asyncio.Event()
+
+    async def _slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    batch = ReadOnlyToolBatch(4)
+    batch.start("a", _slow)
+    await asyncio.sleep(0)
+    await batch.close()
+
+    assert cancelled.is_set() and len(batch) == 0
+
+
+class _DummyProvider:
+    name = "openai"
+
+    def __init__(self):
+        self.followups = []
+
+    async def chat(self, messages, **kwargs):
+        self.followups.append(list(messages))
+        return ProviderResponse(content="Done.")
+
+
+async def _fake_compact_history(messages, provider, context=None, max_tokens=None):
+    return messages
+
+
+def _search_call(call_id, query):
+    return {
+        "id": call_id,
+        "type": "function",
+        "function": {"name": "web_search", "arguments": json.dumps({"query": query})},
+    }
+
+
+@pytest.mark.asyncio
+async def test_handle_message_runs_web_searches_concurrently_in_call_order():
+    provider = _DummyProvider()
+    active = peak = 0
+
+    async def _fake_chat_with_fallback(primary, messages, fallback_names, **kwargs):
+        calls = [_search_call("s1", "slow"), _search_call("s2", "fast")]
+        return ProviderResponse(content="", tool_calls=calls), primary
+
+    async def _fake_web_search(params):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05 if params["query"] == "slow" else 0.01)
+        active -= 1
+        return f"results for {params['query']}"
+
+    with (
+        patch("app.handler.get_provider", return_value=provider),
+        patch("app.compaction.compact_history", side_effect=_fake_compact_history),
+        patch("app.providers.fallback.chat_with_fallback", side_effect=_fake_chat_with_fallback),
+        patch("app.openclaw_compat_tools.run_web_search_compat", side_effect=_fake_web_search),
+    ):
+        await handle_message(
+            user_id="test-tool-scheduler",
+            channel="web",
+            text="compare two things online",
+            provider_name="openai",
+        )
+
+    tool_messages = [m for m in provider.followups[0] if m.get("role") == "tool"]
+    assert [(m["tool_call_id"], m["content"]) for m in tool_messages] == [
+        ("s1", "results for slow"),
+        ("s2", "results for fast"),
+    ]
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_handle_message_starts_reads_after_a_mutating_call_only_once_it_ran():
+    provider = _DummyProvider()
+    events = []
+    active = peak = 0
+
+    async def _fake_chat_with_fallback(primary, messages, fallback_names, **kwargs):
+        calls = [
+            _search_call("s1", "before"),
+            {
+                "id": "r1",
+                "type": "function",
+                "function": {"name": "reminders", "arguments": json.dumps({"action": "list"})},
+            },
+            _search_call("s2", "after-a"),
+            _search_call("s3", "after-b"),
+        ]
+        return ProviderResponse(content="", tool_calls=calls), primary
+
+    async def _fake_web_search(params):
+        nonlocal active, peak
+        events.append(f"search {params['query']}")
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return f"results for {params['query']}"
+
+    async def _fake_reminders(params, **kwargs):
+        events.append("reminders start")
+        await asyncio.sleep(0.01)
+        events.append("reminders end")
+        return "[]"
+
+    with (
+        patch("app.handler.get_provider", return_value=provider),
+        patch("app.compaction.compact_history", side_effect=_fake_compact_history),
+        patch("app.providers.fallback.chat_with_fallback", side_effect=_fake_chat_with_fallback),
+        patch("app.openclaw_compat_tools.run_web_search_compat", side_effect=_fake_web_search),
+        patch("app.reminders_tool.run_reminders_tool", side_effect=_fake_reminders),
+    ):
+        await handle_message(
+            user_id="test-tool-scheduler",
+            channel="web",
+            text="look something up, check my reminders, then look up more",
+            provider_name="openai",
+        )
+
+    assert events[:3] == ["search before", "reminders start", "reminders end"]
+    assert sorted(events[3:]) == ["search after-a", "search after-b"]
+    tool_ids = [m["tool_call_id"] for m in provider.followups[0] if m.get("role") == "tool"]
+    assert tool_ids == ["s1", "r1", "s2", "s3"]
+    assert peak == 2
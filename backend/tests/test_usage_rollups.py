@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.db import get_db
+
+
+@pytest.mark.asyncio
+async def test_record_usage_maintains_rollups_and_stats_read_them():
+    db = get_db()
+    await db.connect()
+    user_id = f"test-usage-{uuid.uuid4().hex[:8]}"
+    await db.record_usage("openai", "gpt-4o", 10, 5, user_id=user_id)
+    await db.record_usage("openai", "gpt-4o", 20, 7, user_id=user_id)
+    await db.record_usage("claude", "sonnet", 1, 1, user_id=user_id, durable=True)
+
+    stats = {r["provider"]: r for r in await db.get_usage_stats(user_id=user_id, days=365)}
+    assert stats["openai"]["input_tokens"] == 30
+    assert stats["openai"]["output_tokens"] == 12
+    assert stats["openai"]["calls"] == 2
+    assert stats["claude"]["calls"] == 1
+    assert list(stats) == ["openai", "claude"]
+
+    cur = await db._conn.execute(
+        "SELECT granularity, SUM(calls) AS calls FROM usage_rollups WHERE user_id = ? GROUP BY granularity",
+        (user_id,),
+    )
+    assert {r["granularity"]: r["calls"] for r in await cur.fetchall()} == {"day": 3, "hour": 3}
+
+
+@pytest.mark.asyncio
+async def test_compact_usage_stats_keeps_daily_totals():
+    db = get_db()
+    await db.connect()
+    user_id = f"test-usage-compact-{uuid.uuid4().hex[:8]}"
+    old = datetime.now(timezone.utc) - timedelta(days=120)
+    await db._conn.execute(
+        "INSERT INTO usage_stats (user_id, provider, model, input_tokens, output_tokens, created_at) VALUES (?, 'openai', '', 4, 4, ?)",
+        (user_id, old.isoformat()),
+    )
+    for granularity, bucket in (("hour", old.strftime("%Y-%m-%d %H:00")), ("day", old.strftime("%Y-%m-%d"))):
+        await db._conn.execute(
+            """INSERT INTO usage_rollups (user_id, granularity, bucket, provider, model, input_tokens, output_tokens, calls, last_used)
+               VALUES (?, ?, ?, 'openai', '', 4, 4, 1, ?)""",
+            (user_id, granularity, bucket, old.isoformat()),
+        )
+    await db._conn.commit()
+
+    result = await db.compact_usage_stats()
+    assert result["raw_deleted"] >= 1
+    assert result["hourly_deleted"] >= 1
+    stats = await db.get_usage_stats(user_id=user_id, days=365)
+    assert stats[0]["calls"] == 1
+    assert await db.get_usage_stats(user_id=user_id, days=30) == []
+
+
+@pytest.mark.asyncio
+async def test_default_user_migration_merges_rollup_rows(tmp_path):
+    import logging
+    from unittest.mock import patch
+
+    import aiosqlite
+
+    from app.db_schema import _migrate_default_to_admin, init_schema
+
+    admin_id = uuid.UUID("00000000-0000-0000-0000-00000000ad01")
+    conn = await aiosqlite.connect(str(tmp_path / "migrate.db"))
+    conn.row_factory = aiosqlite.Row
+    try:
+        await init_schema(conn, logging.getLogger(__name__))
+        await conn.execute("DELETE FROM users")
+        await conn.execute(
+            "INSERT INTO conversations (id, user_id, channel, created_at) VALUES ('default:web:1', 'default', 'web', '2025-01-01')"
+        )
+        rollup = """INSERT INTO usage_rollups (user_id, granularity, bucket, provider, model, input_tokens, output_tokens, calls, last_used)
+                    VALUES (?, 'day', '2025-01-01', 'openai', 'gpt-4o', ?, 1, ?, ?)"""
+        await conn.execute(rollup, ("default", 10, 2, "2025-01-01T10:00"))
+        await conn.execute(rollup, (str(admin_id), 5, 1, "2025-01-01T12:00"))
+        await conn.commit()
+
+        with patch("uuid.uuid4", return_value=admin_id), patch.dict("os.environ", {"ASTA_ADMIN_PASSWORD": "pw"}):
+            await _migrate_default_to_admin(conn, logging.getLogger(__name__))
+
+        cur = await conn.execute("SELECT user_id, input_tokens, calls, last_used FROM usage_rollups")
+        assert [tuple(r) for r in await cur.fetchall()] == [(str(admin_id), 15, 3, "2025-01-01T12:00")]
+    finally:
+        await conn.close()
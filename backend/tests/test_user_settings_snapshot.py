@@ -0,0 +1,48 @@
+import uuid
+
+import pytest
+
+from app.db import get_db
+from app.provider_flow import DEFAULT_MAIN_PROVIDER
+
+
+@pytest.mark.asyncio
+async def test_settings_snapshot_defaults_for_unknown_user():
+    db = get_db()
+    await db.connect()
+    user_id = f"test-snapshot-defaults-{uuid.uuid4().hex[:8]}"
+
+    snap = await db.get_user_settings_snapshot(user_id)
+    assert snap.mood == "normal"
+    assert snap.default_ai == DEFAULT_MAIN_PROVIDER
+    assert snap.thinking_level == "off"
+    assert snap.reasoning_mode == "off"
+    assert snap.final_mode == "off"
+    assert snap.provider_model("claude") is None
+    assert snap.skill_enabled("time") is True
+
+
+@pytest.mark.asyncio
+async def test_settings_snapshot_is_cached_and_invalidated_by_setters():
+    db = get_db()
+    await db.connect()
+    user_id = f"test-snapshot-cache-{uuid.uuid4().hex[:8]}"
+
+    await db.set_user_thinking_level(user_id, "high")
+    await db.set_user_provider_model(user_id, "openai", "gpt-4o-mini")
+    await db.set_skill_enabled(user_id, "time", False)
+    snap = await db.get_user_settings_snapshot(user_id)
+    assert snap.thinking_level == "high"
+    assert snap.provider_model("openai") == "gpt-4o-mini"
+    assert snap.skill_enabled("time") is False
+    assert snap.skill_enabled("weather") is True
+    assert await db.get_user_settings_snapshot(user_id) is snap
+
+    await db.set_user_reasoning_mode(user_id, "stream")
+    snap2 = await db.get_user_settings_snapshot(user_id)
+    assert snap2 is not snap
+    assert snap2.reasoning_mode == "stream"
+    assert snap2.thinking_level == "high"
+
+    await db.set_skill_enabled(user_id, "time", True)
+    assert (await db.get_user_settings_snapshot(user_id)).skill_enabled("time") is True
@@ -31,6 +31,8 @@ def _vision_settings_stub(**overrides):
         "asta_vision_openrouter_model": "google/gemma-3-27b-it:free,nvidia/nemotron-nano-12b-v2-vl:free,google/gemma-3-12b-it:free,openrouter/auto",
         "exec_security": "deny",
         "workspace_path": None,
+        "asta_skill_timeout_s": 8.0,
+        "asta_tool_concurrency": 4,
     }
     base.update(overrides)
     return SimpleNamespace(**base)
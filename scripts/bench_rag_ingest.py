@@ -0,0 +1,85 @@
+"""Benchmark RAG embedding for ~1 MB of text: one chunk per request vs batched /api/embed,
+then a re-ingest served from the embedding cache.
+
+Usage (from repo root):
+  python scripts/bench_rag_ingest.py                 # simulated Ollama, 20 ms per request + 0.2 ms per input
+  python scripts/bench_rag_ingest.py --ollama http://localhost:11434
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../backend")))
+
+import httpx
+
+from app.rag import embed_cache
+from app.rag import service as rag_service
+
+
+def _simulated_client(rtt_ms: float, per_input_ms: float) -> httpx.AsyncClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)["input"]
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        await asyncio.sleep((rtt_ms + per_input_ms * len(inputs)) / 1000)
+        return httpx.Response(200, json={"embeddings": [[0.1] * rag_service.EMBED_DIM for _ in inputs]})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _fresh_cache(tmpdir: str, name: str) -> None:
+    embed_cache._cache = embed_cache.EmbeddingCache(os.path.join(tmpdir, f"{name}.db"))
+
+
+async def _embed(chunks: list[str], batch_size: int, concurrency: int) -> tuple[float, int]:
+    rag_service.EMBED_BATCH_SIZE = batch_size
+    rag_service.EMBED_CONCURRENCY = concurrency
+    start = time.perf_counter()
+    embs = await rag_service._get_embeddings_any(chunks)
+    return time.perf_counter() - start, sum(1 for e in embs if e)
+
+
+async def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ollama", help="Real Ollama base URL (default: simulated server)")
+    ap.add_argument("--size-kb", type=int, default=1024)
+    ap.add_argument("--batch-size", type=int, default=rag_service.EMBED_BATCH_SIZE)
+    ap.add_argument("--concurrency", type=int, default=rag_service.EMBED_CONCURRENCY)
+    ap.add_argument("--rtt-ms", type=float, default=20.0)
+    ap.add_argument("--per-input-ms", type=float, default=0.2)
+    args = ap.parse_args()
+
+    if args.ollama:
+        os.environ["OLLAMA_BASE_URL"] = args.ollama
+    else:
+        client = _simulated_client(args.rtt_ms, args.per_input_ms)
+        rag_service._get_embed_client = lambda: client
+
+    # Distinct chunks so neither the cache nor batch dedup hides round trips.
+    text = "".join(f"Paragraph {i}: the quick brown fox jumps over the lazy dog. " for i in range(args.size_kb * 20))
+    text = text[: args.size_kb * 1024]
+    chunks = [c.text for c in rag_service._chunk_text(text)]
+    print(f"{len(text) / 1024:.0f} KB -> {len(chunks)} {rag_service.RAG_CHUNKER} chunks")
+    tmpdir = tempfile.mkdtemp(prefix="asta-bench-")
+
+    _fresh_cache(tmpdir, "before")
+    before, ok_before = await _embed(chunks, 1, 1)
+    print(f"one chunk per request:            {before:7.2f}s  ({ok_before}/{len(chunks)} embedded)")
+    _fresh_cache(tmpdir, "after")
+    after, ok_after = await _embed(chunks, args.batch_size, args.concurrency)
+    print(
+        f"batch={args.batch_size:<3} concurrency={args.concurrency:<3}       {after:7.2f}s  "
+        f"({ok_after}/{len(chunks)} embedded)  speedup x{before / after if after else float('inf'):.1f}"
+    )
+    warm, ok_warm = await _embed(chunks, args.batch_size, args.concurrency)
+    print(f"re-ingest (embedding cache warm): {warm:7.2f}s  ({ok_warm}/{len(chunks)} embedded)  {embed_cache._cache.stats()}")
+    await rag_service.close_embed_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())